@@ -4,7 +4,7 @@ Exemplo conceitual da futura API REST para Podcast Cuts
 Demonstra como seria a estrutura da API que receberia o payload JSON
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 import json
 import threading
@@ -15,6 +15,7 @@ from typing import Dict, Any
 # Importa módulos do sistema atual
 from modules.config import process_payload_config
 from modules.llm_utils import save_error_log
+from modules import metrics, tracing
 
 app = Flask(__name__)
 CORS(app)
@@ -43,6 +44,13 @@ class PodcastCutsAPI:
                 "version": "1.0.0"
             })
         
+        @app.route('/metrics', methods=['GET'])
+        def prometheus_metrics():
+            """Métricas de throughput no formato de texto do Prometheus"""
+            pending = sum(1 for job in jobs_db.values() if job["status"] in ("pending", "processing"))
+            metrics.QUEUE_DEPTH.set(pending, queue="jobs")
+            return Response(metrics.render(), mimetype=metrics.CONTENT_TYPE)
+        
         @app.route('/api/v1/process', methods=['POST'])
         def process_videos():
             """
@@ -221,7 +229,9 @@ class PodcastCutsAPI:
                     
                     # Simula tempo de processamento
                     import time
-                    time.sleep(2)  # Simula processamento
+                    with tracing.span("episode", url=video_cfg["input_url"]):
+                        time.sleep(2)  # Simula processamento
+                    metrics.EPISODES.inc(status="ok")
                     
                     # Adiciona resultado
                     job["results"].append({
@@ -232,6 +242,7 @@ class PodcastCutsAPI:
                     })
                     
                 except Exception as e:
+                    metrics.EPISODES.inc(status="error")
                     job["errors"].append({
                         "video_url": video_cfg["input_url"],
                         "error": str(e)
@@ -264,6 +275,7 @@ if __name__ == "__main__":
     print("   • GET  /api/v1/jobs - Lista todos os jobs")
     print("   • GET  /api/v1/templates - Templates disponíveis")
     print("   • GET  /api/v1/health - Health check")
+    print("   • GET  /metrics - Métricas Prometheus")
     
     print("\n📝 EXEMPLO DE PAYLOAD:")
     example_payload = {
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark de tempo de import dos scripts de entrada (python -X importtime)
+
+Uso: python benchmarks/import_time.py [--budget-ms 500]
+
+Falha (exit code 1) se algum script passar do orçamento de tempo ou importar
+um módulo pesado (MoviePy, yt_dlp, OpenAI, faster-whisper...) logo no início.
+Serve como guarda contra regressões no startup de status/listagem/upload.
+"""
+import argparse
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Scripts que devem iniciar rápido
+ENTRY_MODULES = ["check_status", "list_clips", "upload_clips", "main"]
+
+# Módulos que não podem ser importados no startup desses scripts
+HEAVY_MODULES = [
+    "moviepy", "cv2", "yt_dlp", "faster_whisper", "ctranslate2", "openai",
+    "googleapiclient", "google_auth_oauthlib", "torch", "requests",
+]
+
+def measure(module: str) -> dict:
+    """Importa o módulo num processo limpo e retorna tempo total e módulos carregados"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    total_us = None
+    imported = set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = [p.strip() for p in line[len("import time:"):].split("|")]
+        if not parts[1].isdigit():
+            continue  # cabeçalho
+        name = parts[2]
+        imported.add(name.strip().split(".")[0])
+        if name == module:
+            total_us = int(parts[1])
+    return {
+        "ok": proc.returncode == 0,
+        "error": proc.stderr.strip().splitlines()[-1] if proc.returncode else None,
+        "ms": (total_us or 0) / 1000,
+        "heavy": sorted(imported & set(HEAVY_MODULES)),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Guarda de regressão do tempo de import")
+    parser.add_argument("--budget-ms", type=float, default=500.0,
+                        help="Tempo máximo de import por script (padrão: 500ms)")
+    args = parser.parse_args()
+
+    print("⏱️ TEMPO DE IMPORT DOS SCRIPTS")
+    print("=" * 50)
+    failed = False
+    for module in ENTRY_MODULES:
+        result = measure(module)
+        if not result["ok"]:
+            print(f"   ❌ {module}: falha no import ({result['error']})")
+            failed = True
+            continue
+        status = "✅"
+        if result["ms"] > args.budget_ms or result["heavy"]:
+            status = "❌"
+            failed = True
+        print(f"   {status} {module}: {result['ms']:.1f}ms")
+        if result["heavy"]:
+            print(f"      Módulos pesados no startup: {', '.join(result['heavy'])}")
+
+    print("=" * 50)
+    if failed:
+        print("❌ Regressão de startup detectada")
+        sys.exit(1)
+    print(f"✅ Todos os scripts abaixo de {args.budget_ms:.0f}ms e sem imports pesados")
+
+if __name__ == "__main__":
+    main()
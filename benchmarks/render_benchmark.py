@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Benchmark de throughput do render (editor.make_clip)
+
+Uso:
+    python benchmarks/render_benchmark.py                    # roda e compara com o baseline
+    python benchmarks/render_benchmark.py --save-baseline    # grava o resultado como baseline
+    python benchmarks/render_benchmark.py --formats vertical --duration 10
+    python benchmarks/render_benchmark.py --profile          # pilhas collapsed em profiles/
+
+Gera entradas sintéticas localmente (FFmpeg testsrc + sine) nos formatos
+horizontal, vertical e quadrado, com transcrição sintética, e mede o make_clip.
+Não usa rede nem GPU. O resultado (JSON) traz frames/s, pico de memória e
+segundos por minuto de saída; regressões acima da tolerância em relação ao
+baseline fazem o script sair com código 1.
+
+O MoviePy é preguiçoso: decode, resize e composição só acontecem quando um
+frame é pedido, ou seja, dentro do encode. Por isso cada caso traz:
+- construction_seconds: tempo de montagem do grafo em cada etapa (o "encode"
+  aqui é o render inteiro)
+- frame_ms: ms por frame puxando PROBE_FRAMES frames pelo clip intermediário
+  de cada etapa (acumulado: "resize" inclui decode, subclip e speed)
+- frame_ms_delta: custo próprio de cada etapa da cadeia (diferença para a
+  etapa anterior); "template" é medido isolado
+
+Ducking: o caso "ducking" mede o duck_music (modules/audio_ducking.py) num
+buffer de DUCKING_SECONDS s de música e fala e o compara com o render de um
+corte do mesmo tamanho estimado pelos s/min de cada formato; passar de
+DUCKING_MAX_SHARE do render (1%) também faz o script sair com código 1.
+
+Baseline: não há um versionado, porque os números dependem da máquina. Na
+máquina de referência rode `--save-baseline` e versione
+benchmarks/render_baseline.json; o arquivo guarda a máquina que o gerou e a
+comparação avisa quando a máquina atual é outra.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+BASELINE_PATH = Path(__file__).resolve().parent / "render_baseline.json"
+
+FORMATS = {
+    "horizontal": (1920, 1080),
+    "vertical": (1080, 1920),
+    "square": (1080, 1080),
+}
+
+FPS = 30
+CONTENT_SPEED = 1.25
+PROBE_FRAMES = 30
+PROBE_CHAIN = ("subclip", "speed", "resize", "composite")
+
+DUCKING_SECONDS = 90
+DUCKING_REPEATS = 5
+DUCKING_MAX_SHARE = 0.01
+
+SAMPLE_SENTENCES = [
+    "Isso é muito importante para entender o contexto.",
+    "Ninguém esperava que a história terminasse assim!",
+    "Olha, eu sempre falo: o segredo é a consistência.",
+    "E foi aí que tudo mudou, de verdade.",
+    "Você já parou para pensar nisso?",
+]
+
+def make_synthetic_video(path: Path, size: tuple, duration: float):
+    """Gera vídeo de teste (testsrc) com tom senoidal, sem rede"""
+    from modules.video_optimizer import get_ffmpeg_binary
+    width, height = size
+    subprocess.run([
+        get_ffmpeg_binary(), "-hide_banner", "-y", "-loglevel", "error",
+        "-f", "lavfi", "-i", f"testsrc=size={width}x{height}:rate={FPS}",
+        "-f", "lavfi", "-i", "sine=frequency=440:sample_rate=44100",
+        "-t", str(duration),
+        "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p",
+        "-c:a", "aac", "-shortest", str(path),
+    ], check=True)
+
+def make_synthetic_transcript(duration: float, segment_seconds: float = 3.0) -> list:
+    """Transcrição sintética cobrindo todo o vídeo"""
+    transcript = []
+    start = 0.0
+    i = 0
+    while start < duration:
+        end = min(start + segment_seconds, duration)
+        transcript.append({"start": start, "end": end, "text": SAMPLE_SENTENCES[i % len(SAMPLE_SENTENCES)]})
+        start = end
+        i += 1
+    return transcript
+
+def peak_rss_mb() -> float:
+    """Pico de memória residente (processo + filhos, ex: FFmpeg) em MB"""
+    try:
+        import resource
+    except ImportError:  # Windows
+        try:
+            import psutil
+            return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+        except Exception:
+            return None
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024  # bytes no macOS, KB no Linux
+    self_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    child_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(self_rss, child_rss) / scale
+
+def machine_info() -> dict:
+    return {"platform": platform.platform(), "machine": platform.machine(),
+            "processor": platform.processor(), "cpus": os.cpu_count(), "python": platform.python_version()}
+
+def frame_probe(frame_ms: dict, frames: int = PROBE_FRAMES):
+    """stage_probe do make_clip: ms por frame puxando `frames` frames sequenciais do clip da etapa"""
+    def probe(stage: str, clip):
+        n = max(1, min(frames, int(clip.duration * FPS) - 1))
+        started = time.perf_counter()
+        for i in range(n):
+            clip.get_frame(i / FPS)
+        frame_ms[stage] = round((time.perf_counter() - started) * 1000 / n, 2)
+    return probe
+
+def run_case(name: str, size: tuple, duration: float, work_dir: Path, optimization_config: dict) -> dict:
+    from modules import editor, profiler
+
+    source = work_dir / f"{name}.mp4"
+    make_synthetic_video(source, size, duration)
+    transcript = make_synthetic_transcript(duration)
+    highlight = {"idx": 0, "hook": f"bench {name}", "question": "Qual a sua opinião sobre isso?"}
+
+    timings = {}
+    frame_ms = {}
+    started = time.perf_counter()
+    with profiler.profile_clip(f"bench_{name}"):
+        outfile = editor.make_clip(
+            str(source), highlight, transcript, str(work_dir / "out"), None, optimization_config,
+            content_speed=CONTENT_SPEED, preserve_pitch=True,
+            cutting_duration=duration / CONTENT_SPEED, crop_mode="fit",
+            stage_timings=timings, stage_probe=frame_probe(frame_ms),
+        )
+    # O tempo dos probes fica fora do total (stage_timings já o exclui)
+    total = sum(timings.values())
+
+    frame_ms_delta, previous = {}, 0.0
+    for stage in PROBE_CHAIN:
+        if stage in frame_ms:
+            frame_ms_delta[stage] = round(max(0.0, frame_ms[stage] - previous), 2)
+            previous = frame_ms[stage]
+    if "template" in frame_ms:
+        frame_ms_delta["template"] = frame_ms["template"]
+
+    output_seconds = duration / CONTENT_SPEED
+    frames = int(output_seconds * FPS)
+    return {
+        "input": f"{size[0]}x{size[1]}",
+        "output_seconds": round(output_seconds, 2),
+        "frames": frames,
+        "construction_seconds": {stage: round(seconds, 3) for stage, seconds in timings.items()},
+        "frame_ms": frame_ms,
+        "frame_ms_delta": frame_ms_delta,
+        "total_seconds": round(total, 3),
+        "fps": round(frames / total, 2),
+        "encode_fps": round(frames / timings["encode"], 2) if timings.get("encode") else None,
+        "seconds_per_output_minute": round(total * 60 / output_seconds, 2),
+        "peak_rss_mb": peak_rss_mb(),
+        "output_bytes": Path(outfile).stat().st_size,
+    }
+
+def ducking_case(cases: dict, seconds: float = DUCKING_SECONDS, repeats: int = DUCKING_REPEATS) -> dict:
+    """Tempo do duck_music num buffer de `seconds` s e a fração do render de um corte do mesmo tamanho"""
+    import numpy as np
+    from modules.audio_ducking import duck_music
+    from modules.outro_assets import MUSIC_FPS
+
+    rng = np.random.default_rng(0)
+    n = int(seconds * MUSIC_FPS)
+    music = rng.uniform(-0.5, 0.5, (n, 2)).astype(np.float32)
+    # Fala sintética: 2 s de ruído alternando com 0,5 s de silêncio
+    speech = rng.uniform(-0.3, 0.3, (n, 2)).astype(np.float32)
+    speech[(np.arange(n) / MUSIC_FPS) % 2.5 >= 2.0] = 0.0
+    parts = [(speech, MUSIC_FPS, 0.0)]
+
+    best = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        duck_music(music, MUSIC_FPS, parts, volume=0.1)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+
+    render_share = {}
+    for name, case in cases.items():
+        render_seconds = case["seconds_per_output_minute"] * seconds / 60
+        render_share[name] = round(best / render_seconds, 5)
+    return {"buffer_seconds": seconds, "ms": round(best * 1000, 2), "render_share": render_share,
+            "max_share": DUCKING_MAX_SHARE}
+
+def ducking_over_budget(results: dict) -> list:
+    ducking = results.get("ducking") or {}
+    return [f"ducking: {share:.2%} do render de {name} > {ducking['max_share']:.0%}"
+            for name, share in ducking.get("render_share", {}).items() if share > ducking["max_share"]]
+
+def compare_with_baseline(results: dict, baseline: dict, tolerance: float) -> list:
+    """Retorna a lista de regressões (fps menor ou s/min maior que o baseline além da tolerância)"""
+    regressions = []
+    for name, current in results["cases"].items():
+        base = baseline.get("cases", {}).get(name)
+        if not base:
+            continue
+        if current["fps"] < base["fps"] * (1 - tolerance):
+            regressions.append(f"{name}: fps {current['fps']} < baseline {base['fps']}")
+        if current["seconds_per_output_minute"] > base["seconds_per_output_minute"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: s/min {current['seconds_per_output_minute']} > baseline {base['seconds_per_output_minute']}"
+            )
+    return regressions
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark de throughput do make_clip")
+    parser.add_argument("--formats", nargs="+", choices=list(FORMATS), default=list(FORMATS))
+    parser.add_argument("--duration", type=float, default=20.0, help="Duração da entrada sintética (s)")
+    parser.add_argument("--quality", default="balanced", choices=["fast", "balanced", "high"])
+    parser.add_argument("--output", help="Arquivo JSON de saída (padrão: stdout)")
+    parser.add_argument("--baseline", default=str(BASELINE_PATH))
+    parser.add_argument("--save-baseline", action="store_true", help="Grava o resultado como novo baseline")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Tolerância de regressão (0.10 = 10%%)")
+    parser.add_argument("--profile", action="store_true",
+                        help="Perfila cada caso (pilhas collapsed + chamadas de make_frame em profiles/)")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+
+    from modules import moviepy_patch, profiler
+    moviepy_patch.apply_all_patches()
+    if args.profile:
+        profiler.enable()
+
+    # Sem GPU: o benchmark precisa ser reproduzível em qualquer máquina
+    optimization_config = {"use_gpu": False, "quality": args.quality, "enable_parallel": True}
+
+    results = {"duration": args.duration, "quality": args.quality, "machine": machine_info(), "cases": {}}
+    with tempfile.TemporaryDirectory(prefix="render_bench_") as tmp:
+        for name in args.formats:
+            print(f"⏱️ Benchmark: {name}", file=sys.stderr)
+            results["cases"][name] = run_case(name, FORMATS[name], args.duration, Path(tmp), optimization_config)
+    print(f"⏱️ Benchmark: ducking ({DUCKING_SECONDS}s)", file=sys.stderr)
+    results["ducking"] = ducking_case(results["cases"])
+
+    report = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(report, encoding="utf-8")
+    else:
+        print(report)
+
+    # O orçamento do ducking vale com ou sem baseline
+    regressions = ducking_over_budget(results)
+
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        Path(args.baseline).write_text(report, encoding="utf-8")
+        print(f"✅ Baseline salvo em {args.baseline}", file=sys.stderr)
+    elif not baseline_path.exists():
+        print("ℹ️ Nenhum baseline encontrado: na máquina de referência rode --save-baseline "
+              f"e versione {baseline_path.name}", file=sys.stderr)
+    else:
+        baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+        if baseline.get("duration") != args.duration or baseline.get("quality") != args.quality:
+            print("⚠️ Baseline gerado com outra duração/qualidade; comparação pode não ser justa", file=sys.stderr)
+        if baseline.get("machine") and baseline["machine"] != results["machine"]:
+            print(f"⚠️ Baseline gerado em outra máquina ({baseline['machine'].get('processor') or baseline['machine'].get('platform')})",
+                  file=sys.stderr)
+        regressions += compare_with_baseline(results, baseline, args.tolerance)
+        if not regressions:
+            print("✅ Sem regressões em relação ao baseline", file=sys.stderr)
+    if regressions:
+        print("❌ Regressões de performance:", file=sys.stderr)
+        for regression in regressions:
+            print(f"   • {regression}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
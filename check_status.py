@@ -6,15 +6,17 @@ python check_status.py
 
 import os
 from pathlib import Path
-from modules.config import load_cfg
-from modules.editor import load_checkpoint, load_upload_checkpoint
+from modules.config import load_cfg, get_system_configuration
+from modules import catalog, publish_queue, state_db
+from datetime import datetime
+from modules.storage import load_checkpoint, list_episode_journals, pending_uploads
 
 def check_processing_status():
     """Verifica status do processamento"""
     print("🔍 VERIFICANDO STATUS DO SISTEMA")
     print("=" * 50)
     
-    cfg = load_cfg()
+    cfg = get_system_configuration(load_cfg())
     clips_dir = Path(cfg["paths"]["clips"])
     
     if not clips_dir.exists():
@@ -33,51 +35,58 @@ def check_processing_status():
     else:
         print("✅ Nenhum checkpoint de processamento encontrado")
     
-    # Verifica checkpoint de upload
-    upload_checkpoint = load_upload_checkpoint(cfg["paths"]["clips"])
-    if upload_checkpoint:
-        print("\n📤 CHECKPOINT DE UPLOAD ENCONTRADO")
-        print(f"   • Cortes gerados: {upload_checkpoint['total_clips']}")
-        print(f"   • URL: {upload_checkpoint['episode_url']}")
+    # Verifica journals de episódios em andamento
+    journals = list_episode_journals(cfg["paths"]["clips"])
+    for journal in journals:
+        print("\n🔄 EPISÓDIO EM ANDAMENTO (journal)")
+        print(f"   • Vídeo: {Path(journal['video_path']).name}")
+        print(f"   • Cortes concluídos: {journal['done']}/{len(journal['highlights'])}")
+        print(f"   • URL: {journal.get('episode_url', 'N/A')}")
+        print("   • Ação: Execute 'python main.py <URL>' para continuar")
+    
+    # Cortes pendentes de upload em todos os diretórios (consulta no banco)
+    pending = pending_uploads(cfg["paths"]["clips"])
+    if pending:
+        print("\n📤 CORTES PENDENTES DE UPLOAD")
+        print(f"   • Cortes pendentes: {len(pending)}")
+        print(f"   • Episódios: {len({clip['video_dir'] for clip in pending})}")
         print("   • Status: Cortes prontos para upload")
         print("   • Ação: Execute 'python upload_clips.py' para fazer upload")
         
         # Lista os cortes
         print("\n📋 Cortes prontos:")
-        for i, clip in enumerate(upload_checkpoint['generated_clips'], 1):
+        for i, clip in enumerate(pending, 1):
             clip_path = Path(clip['clip_path'])
             exists = "✅" if clip_path.exists() else "❌"
-            print(f"   {i}. {exists} {clip_path.name} - {clip['hook']}")
+            print(f"   {i}. {exists} {Path(clip['video_dir']).name}/{clip_path.name} - {clip['hook']}")
     else:
-        print("\n✅ Nenhum checkpoint de upload encontrado")
+        print("\n✅ Nenhum corte pendente de upload")
+    
+    # Fila de publicação (horários agendados)
+    if state_db.db_path(cfg["paths"]["clips"]).exists():
+        queued = publish_queue.pending_count(cfg["paths"]["clips"])
+        upcoming = publish_queue.next_due(cfg["paths"]["clips"])
+        if queued:
+            print(f"\n🗓️ FILA DE PUBLICAÇÃO: {queued} cortes agendados")
+            if upcoming:
+                print(f"   • Próxima publicação: {datetime.fromtimestamp(upcoming):%Y-%m-%d %H:%M}")
     
-    # Lista diretórios de vídeos processados
+    # Resumo por vídeo a partir do catálogo indexado (sem varrer diretórios)
     print("\n📁 DIRETÓRIOS DE VÍDEOS PROCESSADOS:")
-    video_dirs = [d for d in clips_dir.iterdir() if d.is_dir()]
-    
-    if video_dirs:
-        for video_dir in video_dirs:
-            print(f"   📂 {video_dir.name}")
-            
-            # Conta arquivos
-            mp4_files = list(video_dir.glob("*.mp4"))
-            metadata_files = list(video_dir.glob("*metadata*"))
-            
-            print(f"      • Vídeos: {len(mp4_files)}")
-            print(f"      • Metadados: {len(metadata_files)}")
-            
-            # Lista alguns arquivos
-            for mp4_file in mp4_files[:3]:  # Mostra apenas os 3 primeiros
-                print(f"      - {mp4_file.name}")
-            
-            if len(mp4_files) > 3:
-                print(f"      ... e mais {len(mp4_files) - 3} arquivos")
+    videos = catalog.summary(cfg["paths"]["clips"])
+    
+    if videos:
+        for video in videos:
+            print(f"   📂 {Path(video['video_dir']).name}")
+            print(f"      • Vídeos: {video['clips']} ({video['pending']} pendentes de upload)")
+            print(f"      • Tamanho: {video['size'] / 1024 / 1024:.1f} MB, duração total: {video['duration'] / 60:.1f} min")
     else:
-        print("   ℹ️ Nenhum vídeo processado encontrado")
+        print("   ℹ️ Nenhum vídeo no catálogo")
+        print("   Execute 'python list_clips.py --rebuild' para indexar cortes existentes")
 
 def show_speed_config():
     """Mostra configuração de velocidade"""
-    cfg = load_cfg()
+    cfg = load_cfg().get("pattern_video_configuration", {})
     content_speed = cfg.get("content_speed", 1.25)
     preserve_pitch = cfg.get("preserve_pitch", True)
     video_duration = cfg.get("video_duration", 61)
@@ -120,9 +129,9 @@ def show_next_steps():
     print("\n🎯 PRÓXIMOS PASSOS:")
     print("=" * 30)
     
-    cfg = load_cfg()
-    processing_checkpoint = load_checkpoint(cfg["paths"]["clips"])
-    upload_checkpoint = load_upload_checkpoint(cfg["paths"]["clips"])
+    cfg = get_system_configuration(load_cfg())
+    processing_checkpoint = load_checkpoint(cfg["paths"]["clips"]) or list_episode_journals(cfg["paths"]["clips"])
+    upload_checkpoint = pending_uploads(cfg["paths"]["clips"])
     
     if processing_checkpoint:
         print("1. 🔄 Continuar processamento:")
@@ -132,7 +141,7 @@ def show_next_steps():
     elif upload_checkpoint:
         print("1. 📤 Fazer upload dos cortes:")
         print("   python upload_clips.py")
-        print("   (Respeita delays configurados)")
+        print("   (Publica pela fila nos horários agendados)")
         
     else:
         print("1. 🎬 Iniciar novo processamento:")
@@ -1,52 +1,72 @@
 #!/usr/bin/env python3
 """
-Script utilitário para listar todos os vídeos processados e seus metadados
-Uso: python list_clips.py
+Script utilitário para listar todos os vídeos processados e seus cortes
+Uso: python list_clips.py [--pending] [--video NOME] [--sort name|date|size|duration] [--rebuild]
+
+Lê o catálogo indexado (clips/pipeline.db); --rebuild refaz o índice
+varrendo clips/ em paralelo.
 """
-import json
+import argparse
 from pathlib import Path
-from modules.editor import list_video_clips
-from modules.config import load_cfg
+from modules import catalog
+from modules.config import load_cfg, get_system_configuration
+
+def format_duration(seconds) -> str:
+    if seconds is None:
+        return "--:--"
+    return f"{int(seconds // 60):02d}:{int(seconds % 60):02d}"
 
 def main():
-    cfg = load_cfg()
+    parser = argparse.ArgumentParser(description="Lista os cortes do catálogo")
+    parser.add_argument("--rebuild", action="store_true", help="Refaz o catálogo varrendo clips/ em paralelo")
+    parser.add_argument("--workers", type=int, default=None, help="Threads usadas no --rebuild")
+    parser.add_argument("--pending", action="store_true", help="Só cortes ainda não enviados")
+    parser.add_argument("--video", default=None, help="Filtra pelo nome do diretório do vídeo")
+    parser.add_argument("--sort", choices=sorted(catalog.SORT_COLUMNS), default="name")
+    parser.add_argument("--limit", type=int, default=None)
+    args = parser.parse_args()
+
+    cfg = get_system_configuration(load_cfg())
     clips_dir = cfg["paths"]["clips"]
-    
+    if not Path(clips_dir).exists():
+        print(f"Diretório {clips_dir} não encontrado")
+        return
+
+    if args.rebuild:
+        print("🔄 Reconstruindo catálogo...")
+        total = catalog.rebuild(clips_dir, args.workers)
+        print(f"✅ {total} cortes indexados")
+
     print("📁 Listando vídeos processados e seus cortes:")
     print("=" * 60)
-    
-    clips_info = list_video_clips(clips_dir)
-    
-    if not clips_info:
-        print("Nenhum vídeo processado encontrado.")
+
+    clips = catalog.query(clips_dir, video=args.video, uploaded=False if args.pending else None,
+                          sort=args.sort, limit=args.limit)
+
+    if not clips:
+        print("Nenhum corte no catálogo.")
+        print("   Execute 'python list_clips.py --rebuild' para indexar cortes existentes")
         return
-    
-    for video_name, info in clips_info.items():
-        print(f"\n🎬 Vídeo: {video_name}")
-        print(f"📂 Diretório: {info['video_dir']}")
-        
-        if info['clips']:
-            print(f"🎥 Cortes ({len(info['clips'])}):")
-            for clip in info['clips']:
-                print(f"   • {clip}")
-        
-        if info['metadata_files']:
-            print(f"📄 Metadados ({len(info['metadata_files'])}):")
-            for metadata in info['metadata_files']:
-                print(f"   • {metadata}")
-                
-                # Tenta carregar e mostrar informações básicas do metadata
-                try:
-                    metadata_path = Path(info['video_dir']) / metadata
-                    with open(metadata_path, 'r', encoding='utf-8') as f:
-                        metadata_data = json.load(f)
-                    
-                    print(f"     Título: {metadata_data.get('title', 'N/A')}")
-                    print(f"     Tags: {', '.join(metadata_data.get('tags', []))}")
-                except Exception as e:
-                    print(f"     Erro ao carregar metadata: {e}")
-        
-        print("-" * 40)
+
+    current_dir = None
+    for clip in clips:
+        if args.sort == "name" and clip["video_dir"] != current_dir:
+            if current_dir is not None:
+                print("-" * 40)
+            current_dir = clip["video_dir"]
+            print(f"\n🎬 Vídeo: {Path(current_dir).name}")
+            print(f"📂 Diretório: {current_dir}")
+
+        status = f"✅ {clip['video_id'] or 'enviado'}" if clip["uploaded"] else "⏳ pendente"
+        size_mb = (clip["size"] or 0) / 1024 / 1024
+        name = clip["file_name"] if args.sort == "name" else f"{Path(clip['video_dir']).name}/{clip['file_name']}"
+        print(f"   • {name} [{format_duration(clip['duration'])}, {size_mb:.1f} MB] {status}")
+        print(f"     Hook: {clip['hook']}")
+        if clip["tags"]:
+            print(f"     Tags: {', '.join(clip['tags'])}")
+
+    print("-" * 40)
+    print(f"Total: {len(clips)} cortes")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
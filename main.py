@@ -3,24 +3,42 @@
 Pipeline de geração de cortes: python main.py
 Processa múltiplos vídeos baseado na configuração do config.json
 Gera todos os cortes e salva checkpoint para upload posterior
+
+Modo diferido (backfills noturnos): python main.py --batch
+Baixa e transcreve todos os episódios, envia a seleção de highlights de todos
+em um único lote da Batch API e, quando o lote termina, renderiza cada episódio.
 """
-import sys, json, os
+import sys, json, os, argparse, hashlib
 from dotenv import load_dotenv
-from modules import downloader, transcriber, highlighter, editor, moviepy_patch, moviepy_config, outro_appender
-from modules.llm_utils import print_llm_report, save_cost_log, save_error_log
-from modules.config import load_cfg, process_payload_config
-from upload_clips import run_uploads
-
-from pathlib import WindowsPath
+from modules import highlighter, storage, state_db, tracing, metrics, profiler
+from modules.llm_utils import print_llm_report, save_cost_log, save_error_log, prefetch_usd_brl, LLMBatch
+from modules.config import load_cfg, process_payload_config, get_system_configuration
 
-# Aplica os patches do MoviePy
-moviepy_patch.apply_all_patches()
+from pathlib import Path, WindowsPath
 
 load_dotenv()
 
-def process_single_video(episode_url: str, cfg: dict):
+# MoviePy, yt_dlp e faster-whisper são importados só quando a etapa correspondente
+# roda: um resume que apenas faz upload não paga o custo desses imports.
+_render_ready = False
+
+def get_render_modules():
+    """Importa editor/outro_appender e aplica os patches do MoviePy uma única vez"""
+    global _render_ready
+    from modules import editor, outro_appender
+    if not _render_ready:
+        from modules import moviepy_patch, moviepy_config
+        moviepy_patch.apply_all_patches()
+        _render_ready = True
+    return editor, outro_appender
+
+def process_single_video(episode_url: str, cfg: dict, prepared: dict = None):
     """
     Processa um único vídeo com a configuração fornecida
+
+    prepared: estado já obtido fora desta função (modo batch) com as chaves
+              video_path, transcript, video_info e highlights; pula download,
+              transcrição e seleção de highlights
     """
     print(f"\n🎬 Processando vídeo: {episode_url}")
     print(f"   • Tags: {cfg.get('tags', [])}")
@@ -28,36 +46,73 @@ def process_single_video(episode_url: str, cfg: dict):
     print(f"   • Velocidade: {cfg.get('content_speed', 1.25)}x")
     print(f"   • Duração: {cfg.get('video_duration', 61)}s")
 
-    # Tenta carregar checkpoint com validação da URL do episódio
-    checkpoint = editor.validate_checkpoint_for_episode(cfg["paths"]["clips"], episode_url)
-    if checkpoint:
+    # Retoma pelo journal do episódio (transcrição, highlights e etapas já concluídas)
+    clips_dir = cfg["paths"]["clips"]
+    journal = None
+    checkpoint = None
+    journal = storage.load_episode_journal(clips_dir, episode_url)
+    if prepared:
+        # Dados do lote; do journal (se houver) só as etapas já concluídas
+        video_path = prepared["video_path"]
+        transcript = prepared["transcript"]
+        video_info = prepared.get("video_info", {})
+        hls = prepared["highlights"]
+    elif not journal:
+        # Checkpoint antigo (clips/checkpoint.json, um único highlight)
+        checkpoint = storage.validate_checkpoint_for_episode(clips_dir, episode_url)
+    if journal and not prepared:
+        video_path = journal["video_path"]
+        transcript = journal["transcript"]
+        video_info = journal.get("video_info", {})
+        hls = journal["highlights"]
+    elif checkpoint:
         video_path = checkpoint["video_path"]
         transcript = checkpoint["transcript"]
         video_info = checkpoint.get("video_info", {})
         hls = [checkpoint["highlight"]]
         print(f"🔄 Continuando processamento a partir do checkpoint")
     
-    if not checkpoint:
+    if not journal and not checkpoint and not prepared:
+        from modules import downloader, transcriber
         print("Baixando episódio…")
-        video, video_info = downloader.download(episode_url, cfg["paths"]["raw"])
+        with tracing.span("download", url=episode_url):
+            video, video_info = downloader.download(episode_url, cfg["paths"]["raw"])
         video_path = str(video)
         
         print(f"Vídeo: {video_info.get('title', 'N/A')}")
         print(f"Canal: {video_info.get('channel', 'N/A')}")
 
         print("Transcrevendo…")
-        transcript = transcriber.transcribe(video_path, cfg["whisper_size"])
+        with tracing.span("asr", model=cfg["whisper_size"], media_seconds=video_info.get("duration")):
+            transcript = transcriber.transcribe(video_path, cfg["whisper_size"])
 
         print("Selecionando highlights…")
-        hls = highlighter.find_highlights(transcript, video_info, cfg["highlights"])
+        with tracing.span("llm.highlights", n=cfg["highlights"]):
+            hls = highlighter.find_highlights(transcript, video_info, cfg["highlights"])
+
+    editor, outro_appender = get_render_modules()
+
+    # Transcrição e highlights vão para o journal uma única vez; se os highlights
+    # mudaram, o journal é recriado e as etapas antigas não valem mais
+    restarted = storage.start_episode_journal(clips_dir, episode_url, video_path, transcript, video_info, hls)
+    journal_stages = journal["stages"] if journal and not restarted else {}
+    if journal_stages:
+        done = sum(1 for h in hls if "done" in journal_stages.get(h["idx"], {}))
+        print(f"🔄 Retomando pelo journal do episódio: {done}/{len(hls)} cortes já concluídos")
 
     # Lista para armazenar informações dos cortes gerados
     generated_clips = []
 
     for h in hls:
+        stages = journal_stages.get(h["idx"], {})
+        if "done" in stages and Path(stages["done"]["clip"]["clip_path"]).exists():
+            clip_info = stages["done"]["clip"]
+            print(f"\n⏭️ Corte já concluído: {h['hook']}")
+            video_dir = Path(clip_info["clip_path"]).parent
+            generated_clips.append(clip_info)
+            continue
+
         print(f"\nGerando corte: {h['hook']}")
-        # Salva checkpoint antes de processar cada highlight, incluindo a URL do episódio
-        editor.save_checkpoint(cfg["paths"]["clips"], video_path, h, transcript, video_info, episode_url)
         
         # Configurações de otimização
         optimization_config = cfg.get("video_optimization", {
@@ -65,32 +120,52 @@ def process_single_video(episode_url: str, cfg: dict):
             "quality": "balanced",
             "enable_parallel": True
         })
-        
-        clip_path = editor.make_clip(
-            video_path, 
-            h, 
-            transcript, 
-            cfg["paths"]["clips"], 
-            video_info,
-            optimization_config,
-            cfg.get("content_speed", 1.25),
-            cfg.get("preserve_pitch", True),
-            cfg.get("video_duration", 61),
-            cfg.get("crop_mode", "fit")
-        )
+
+        rendered = stages.get("render")
+        if rendered and Path(rendered["clip_path"]).exists():
+            # O render terminou antes da interrupção; só falta outro/metadados
+            clip_path = Path(rendered["clip_path"])
+            single_pass_outro = rendered.get("outro_path")
+            print(f"⏭️ Render já concluído: {clip_path.name}")
+        else:
+            # Passada única: o outro é sorteado aqui e renderizado junto com o corte
+            single_pass_outro = None
+            if cfg.get("append_outro", True) and optimization_config.get("outro_single_pass", False):
+                try:
+                    single_pass_outro = outro_appender.OutroAppender().get_random_outro()
+                except FileNotFoundError as e:
+                    print(f"⚠️ {e}; o corte será gerado sem outro")
+            
+            with tracing.span("make_clip", idx=h["idx"]), profiler.profile_clip(f"clip_{h['idx']}"):
+                clip_path = editor.make_clip(
+                    video_path, 
+                    h, 
+                    transcript, 
+                    cfg["paths"]["clips"], 
+                    video_info,
+                    optimization_config,
+                    cfg.get("content_speed", 1.25),
+                    cfg.get("preserve_pitch", True),
+                    cfg.get("video_duration", 61),
+                    cfg.get("crop_mode", "fit"),
+                    outro_path=single_pass_outro
+                )
+            storage.record_highlight_stage(clips_dir, episode_url, h["idx"], "render",
+                                           clip_path=str(clip_path), outro_path=single_pass_outro)
         
         # Salva os metadados do corte
         video_dir = clip_path.parent
         clip_filename = clip_path.name
         all_tags = h.get('tags', []) + cfg.get("tags", [])
-        editor.save_clip_metadata(video_dir, clip_filename, h, video_info, episode_url, all_tags)
+        storage.save_clip_metadata(video_dir, clip_filename, h, video_info, episode_url, all_tags)
 
         # Anexa outro ao corte se configurado
         final_clip_path = clip_path
-        if cfg.get("append_outro", True):  # Por padrão, anexa outro
+        if cfg.get("append_outro", True) and not single_pass_outro:  # Por padrão, anexa outro
             try:
                 print("🎬 Anexando outro ao corte...")
-                final_clip_path = outro_appender.append_outro(str(clip_path), optimization_config)
+                with tracing.span("outro"):
+                    final_clip_path = outro_appender.append_outro(str(clip_path), optimization_config)
                 print(f"✅ Outro anexado: {final_clip_path}")
             except Exception as e:
                 print(f"⚠️ Erro ao anexar outro: {e}")
@@ -107,14 +182,17 @@ def process_single_video(episode_url: str, cfg: dict):
             "episode_url": episode_url
         }
         generated_clips.append(clip_info)
+        storage.record_highlight_stage(clips_dir, episode_url, h["idx"], "done", clip=clip_info)
         
         print(f"✅ Corte gerado: {final_clip_path}")
     
     # Salva checkpoint de conclusão com todos os cortes gerados
-    editor.save_upload_checkpoint(str(video_dir), episode_url, generated_clips)
+    storage.save_upload_checkpoint(clips_dir, str(video_dir), episode_url, generated_clips)
     
-    # Limpa o checkpoint de processamento
-    editor.clear_checkpoint(cfg["paths"]["clips"])
+    # Limpa o journal (e o checkpoint antigo, se a execução veio dele)
+    storage.clear_episode_journal(clips_dir, episode_url)
+    if checkpoint:
+        storage.clear_checkpoint(clips_dir)
     
     print(f"\n🎉 Processamento do vídeo concluído!")
     print(f"   • {len(generated_clips)} cortes gerados")
@@ -122,7 +200,121 @@ def process_single_video(episode_url: str, cfg: dict):
     
     return generated_clips
 
-def run():
+def config_identity(video_cfg: dict) -> str:
+    """Hash da configuração do vídeo (identifica a config no lote mesmo se a lista for reordenada)"""
+    raw = json.dumps(video_cfg, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
+
+def find_batch_config(video_configs: list, extra: dict) -> dict:
+    """
+    Configuração de um episódio do lote: a mesma URL com o mesmo hash; se a
+    config mudou desde o envio, a atual da mesma URL (com aviso)
+    """
+    candidates = [c for c in video_configs if c["input_url"] == extra["episode_url"]]
+    for video_cfg in candidates:
+        if config_identity(video_cfg) == extra.get("config_id"):
+            return video_cfg
+    if not candidates:
+        raise ValueError(f"Episódio do lote não está mais no config.json: {extra['episode_url']}")
+    print("⚠️ Configuração do episódio mudou desde o envio do lote; usando a atual")
+    return candidates[0]
+
+def prepare_batch(video_configs: list, batch_dir: str) -> LLMBatch:
+    """
+    Baixa e transcreve todos os episódios e enfileira a seleção de highlights
+    de cada um em um único lote
+    """
+    from modules import downloader, transcriber
+    batch = LLMBatch(batch_dir)
+    for i, video_cfg in enumerate(video_configs, 1):
+        episode_url = video_cfg["input_url"]
+        try:
+            print(f"\n📹 Preparando vídeo {i}/{len(video_configs)}: {episode_url}")
+            with tracing.span("download", url=episode_url):
+                video, video_info = downloader.download(episode_url, video_cfg["paths"]["raw"])
+            print("Transcrevendo…")
+            with tracing.span("asr", model=video_cfg["whisper_size"], media_seconds=video_info.get("duration")):
+                transcript = transcriber.transcribe(str(video), video_cfg["whisper_size"])
+
+            custom_id = f"ep{i}-{video_info.get('id') or i}"
+            highlighter.find_highlights(
+                transcript, video_info, video_cfg["highlights"], batch=batch, custom_id=custom_id
+            )
+            batch.set_extra(custom_id, {
+                "episode_url": episode_url,
+                "video_path": str(video),
+                "video_info": video_info,
+                "transcript": transcript,
+                "config_id": config_identity(video_cfg),
+            })
+        except Exception:
+            import traceback
+            print(f"❌ Erro ao preparar vídeo {i}")
+            save_error_log(traceback.format_exc(), episode_url)
+    return batch
+
+def run_batch(video_configs: list, system_cfg: dict) -> list:
+    """
+    Modo diferido: todas as requisições de highlights vão em um lote da Batch API.
+    Se já existe um lote enviado e não concluído, retoma o polling dele e
+    processa só os episódios que ainda não terminaram.
+    """
+    batch_cfg = system_cfg.get("llm_batch", {})
+    batch_dir = batch_cfg.get("dir", "batches")
+
+    LLMBatch.discard_unsubmitted(batch_dir)
+    batch = LLMBatch.find_pending(batch_dir)
+    if batch:
+        print(f"🔄 Retomando lote pendente: {batch.batch_id}")
+    else:
+        batch = prepare_batch(video_configs, batch_dir)
+        if not batch.entries:
+            print("⚠️ Nenhum episódio preparado para o lote")
+            return []
+        batch.submit()
+
+    with tracing.span("llm.batch_wait", batch_id=batch.batch_id):
+        results = batch.wait(
+            poll_interval=batch_cfg.get("poll_interval", 60),
+            timeout=batch_cfg.get("timeout", 24 * 3600),
+        )
+
+    all_generated_clips = []
+    for custom_id, content in results.items():
+        extra = batch.entries[custom_id]["extra"]
+        episode_url = extra["episode_url"]
+        if custom_id in batch.consumed:
+            continue
+        try:
+            video_cfg = find_batch_config(video_configs, extra)
+            if state_db.episode_done_since(video_cfg["paths"]["clips"], episode_url, batch.submitted_at or ""):
+                # Concluído numa execução anterior que caiu antes de marcar o lote
+                print(f"⏭️ Episódio já concluído: {episode_url}")
+                batch.mark_consumed(custom_id)
+                continue
+            # Sem resposta no lote, o reparo refaz a seleção de forma síncrona
+            messages = highlighter.build_highlight_messages(
+                extra["transcript"], extra["video_info"], video_cfg["highlights"]
+            )
+            with tracing.span("llm.highlights", n=video_cfg["highlights"]):
+                hls = highlighter.parse_highlights(
+                    content, extra["transcript"], video_cfg["highlights"], messages
+                )
+            prepared = {**extra, "highlights": hls}
+            with tracing.span("episode", url=episode_url):
+                all_generated_clips.extend(process_single_video(episode_url, video_cfg, prepared))
+            batch.mark_consumed(custom_id)
+            metrics.EPISODES.inc(status="ok")
+        except Exception as e:
+            metrics.EPISODES.inc(status="error")
+            import traceback
+            print(f"❌ Erro ao renderizar {episode_url}: {e}")
+            save_error_log(traceback.format_exc(), episode_url)
+
+    batch.close()
+    return all_generated_clips
+
+def run(use_batch: bool = False):
     """
     Processa todos os vídeos configurados no payload
     """
@@ -136,41 +328,100 @@ def run():
     print("=" * 60)
     
     all_generated_clips = []
+
+    # Com upload_mode, os cortes de cada episódio entram na fila de publicação
+    # assim que ficam prontos e o agendador publica enquanto o resto renderiza
+    scheduler = None
+    system_cfg = get_system_configuration(payload)
+    if system_cfg.get("upload_mode", False):
+        from upload_clips import start_scheduler, upload_delay
+        from modules import publish_queue
+        scheduler = start_scheduler(system_cfg)
+
+    def publish(clips: list, cfg: dict):
+        if scheduler and clips:
+            added = publish_queue.enqueue(cfg["paths"]["clips"], clips, upload_delay(cfg))
+            print(f"📤 {added} cortes agendados na fila de publicação")
+            scheduler.notify()
+
+    if use_batch:
+        print("📦 Modo batch: highlights serão selecionados em lote (resultado diferido)")
+        all_generated_clips = run_batch(video_configs, system_cfg)
+        publish(all_generated_clips, system_cfg)
+        video_configs_to_process = []
+    else:
+        video_configs_to_process = video_configs
     
-    for i, video_cfg in enumerate(video_configs, 1):
+    for i, video_cfg in enumerate(video_configs_to_process, 1):
+        metrics.QUEUE_DEPTH.set(len(video_configs_to_process) - i + 1, queue="episodes")
         try:
             print(f"\n📹 Vídeo {i}/{len(video_configs)}")
             print("-" * 40)
             
             episode_url = video_cfg["input_url"]
-            generated_clips = process_single_video(episode_url, video_cfg)
+            with tracing.span("episode", url=episode_url):
+                generated_clips = process_single_video(episode_url, video_cfg)
             all_generated_clips.extend(generated_clips)
+            metrics.EPISODES.inc(status="ok")
+            publish(generated_clips, video_cfg)
             
         except Exception as e:
+            metrics.EPISODES.inc(status="error")
             import traceback
             print(f"❌ Erro ao processar vídeo {i}: {e}")
             save_error_log(traceback.format_exc(), video_cfg.get("input_url", "URL_DESCONHECIDA"))
             continue
+    metrics.QUEUE_DEPTH.set(0, queue="episodes")
     
     print(f"\n🎉 Processamento completo!")
     print(f"   • Total de vídeos processados: {len(video_configs)}")
     print(f"   • Total de cortes gerados: {len(all_generated_clips)}")
-    print(f"   • Execute 'python upload_clips.py' para fazer upload")
 
-    # Executa uploads se configurado
-    if payload.get("system_configuration", {}).get("upload_mode", False):
-        print("\n📤 Iniciando uploads...")
-        run_uploads()
+    if not scheduler:
+        print(f"   • Execute 'python upload_clips.py' para fazer upload")
+        return
+
+    # Espera as publicações agendadas (a fila é persistente: interromper é seguro)
+    print("\n📤 Aguardando a fila de publicação...")
+    try:
+        scheduler.wait_idle()
+    except KeyboardInterrupt:
+        print("\n⏸️ Interrompido - rode 'python upload_clips.py' para continuar a fila")
+    finally:
+        scheduler.stop()
+    print(f"   • Uploads realizados: {scheduler.uploaded} | Falhas: {scheduler.failed}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Pipeline de geração de cortes")
+    parser.add_argument("--batch", action="store_true",
+                        help="Seleciona highlights via Batch API (modo diferido, mais barato)")
+    parser.add_argument("--chrome-trace", metavar="ARQUIVO",
+                        help="Exporta o trace da execução no formato Chrome/Perfetto")
+    parser.add_argument("--metrics-port", type=int, metavar="PORTA",
+                        help="Expõe métricas Prometheus em http://127.0.0.1:PORTA/metrics")
+    parser.add_argument("--profile", action="store_true",
+                        help="Perfila o render de cada corte (pilhas collapsed em profiles/)")
+    return parser.parse_args()
 
 if __name__ == "__main__":
+    args = parse_args()
+    prefetch_usd_brl()
+    tracing.start_run("main")
+    if args.metrics_port:
+        metrics.start_metrics_server(args.metrics_port)
+    if args.profile:
+        profiler.enable()
     try:
-        run()
+        run(use_batch=args.batch)
     except Exception as e:
         import traceback
         save_error_log(traceback.format_exc(), "ERRO_GERAL")
         print("Erro durante o processamento. Veja logs/erros.log para detalhes.")
     finally:
         print_llm_report()
+        tracing.print_trace_summary()
+        if args.chrome_trace:
+            tracing.export_chrome_trace(args.chrome_trace)
         save_cost_log("PROCESSAMENTO_MULTIPLO")
 
 import warnings
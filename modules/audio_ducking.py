@@ -0,0 +1,127 @@
+# modules/audio_ducking.py
+"""
+Ducking da música de fundo guiado pela fala (sidechain), vetorizado.
+
+1. Envelope RMS da fala em janelas curtas (view com strides, sem cópia)
+2. Cada janela passa pela curva de um compressor (limiar + ratio, joelho
+   duro), a mesma do sidechaincompress do FFmpeg: a redução da música em dB
+   é (1 - 1/ratio) x o quanto a fala passa do limiar
+3. Ataque e release por médias móveis causais: a curta abaixa a música
+   rápido quando a fala começa, a longa a devolve devagar quando termina
+4. O ganho por janela é interpolado para a taxa da música e aplicado
+   com uma única multiplicação de arrays
+
+A fala vem de PCM já decodificado (o WAV acelerado do cache de render e o
+áudio do outro no cache de assets), sem decodificar o corte de novo. Sem
+laço Python por amostra: o custo fica bem abaixo de 1% do render de um corte.
+"""
+import wave
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+ENVELOPE_FPS = 8000
+
+# Limiar e ratio do compressor, nível típico da fala (só para calcular a
+# redução nominal, usada no volume das pausas) e tempos de janela, ataque e
+# release (s). Valem para o caminho numpy e para o filtro do FFmpeg.
+DUCKING = {
+    "threshold_db": -35.0,
+    "ratio": 2.5,
+    "speech_db": -20.0,
+    "window": 0.05,
+    "hop": 0.01,
+    "attack": 0.05,
+    "release": 0.4,
+}
+
+def reduction_db(level_db, threshold_db: float = DUCKING["threshold_db"], ratio: float = DUCKING["ratio"]):
+    """Redução (dB, >= 0) aplicada à música para uma fala em `level_db` dBFS"""
+    return (1.0 - 1.0 / ratio) * np.maximum(0.0, level_db - threshold_db)
+
+def nominal_duck_db() -> float:
+    """Redução da música (dB, negativa) com a fala no nível típico DUCKING["speech_db"]"""
+    return -float(reduction_db(DUCKING["speech_db"]))
+
+def rms_envelope(samples: np.ndarray, fps: int, window: float, hop: float) -> tuple:
+    """
+    RMS em janelas de `window` s a cada `hop` s.
+
+    Returns:
+        tuple: (rms por janela, instante central de cada janela em s)
+    """
+    mono = samples.mean(axis=1) if samples.ndim == 2 else samples
+    mono = np.ascontiguousarray(mono, dtype=np.float32)
+    win = max(1, int(window * fps))
+    step = max(1, int(hop * fps))
+    if len(mono) < win:
+        mono = np.pad(mono, (0, win - len(mono)))
+    n = 1 + (len(mono) - win) // step
+    stride = mono.strides[0]
+    frames = as_strided(mono, shape=(n, win), strides=(stride * step, stride), writeable=False)
+    rms = np.sqrt(np.einsum("ij,ij->i", frames, frames) / win)
+    times = (np.arange(n) * step + win / 2) / fps
+    return rms, times
+
+def speech_envelope(parts: list, window: float = DUCKING["window"], hop: float = DUCKING["hop"]) -> tuple:
+    """
+    Envelope de uma fala formada por trechos em sequência, cada um com sua taxa.
+
+    Args:
+        parts: lista de (amostras, fps, início em s)
+
+    Returns:
+        tuple: (rms por janela, instante de cada janela em s)
+    """
+    envelopes = [rms_envelope(samples, fps, window, hop) for samples, fps, _ in parts]
+    rms = np.concatenate([e[0] for e in envelopes])
+    times = np.concatenate([e[1] + start for e, (_, _, start) in zip(envelopes, parts)])
+    return rms, times
+
+def _causal_mean(x: np.ndarray, n: int) -> np.ndarray:
+    if n <= 1:
+        return x
+    return np.convolve(x, np.full(n, 1.0 / n))[:len(x)]
+
+def ducking_gain(rms: np.ndarray, times: np.ndarray, out_len: int, out_fps: int,
+                 hop: float = DUCKING["hop"], attack: float = DUCKING["attack"],
+                 release: float = DUCKING["release"]) -> np.ndarray:
+    """
+    Curva de ganho (1 sem fala, 10^(-redução/20) durante a fala) com
+    `out_len` amostras a `out_fps`, pronta para multiplicar a música.
+    """
+    level_db = 20 * np.log10(np.maximum(rms, 1e-9))
+    reduction = reduction_db(level_db)
+
+    fast = _causal_mean(reduction, round(attack / hop))
+    slow = _causal_mean(reduction, round(release / hop))
+    gain = 10 ** (-np.maximum(fast, slow) / 20)
+    return np.interp(np.arange(out_len) / out_fps, times, gain).astype(np.float32)
+
+def read_wav(path) -> tuple:
+    """PCM 16 bits de um WAV como float32 (amostras, canais) e a taxa; None se não for s16"""
+    with wave.open(str(path), "rb") as f:
+        if f.getsampwidth() != 2:
+            return None
+        fps, channels = f.getframerate(), f.getnchannels()
+        data = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16).reshape(-1, channels)
+    return data.astype(np.float32) / 32768.0, fps
+
+def duck_music(music: np.ndarray, music_fps: int, speech_parts: list, volume: float = 1.0) -> np.ndarray:
+    """
+    Aplica à música (array float, formato (amostras, canais)) o ganho guiado
+    pela fala `speech_parts` (ver speech_envelope), já multiplicado por `volume`.
+    """
+    rms, times = speech_envelope(speech_parts)
+    gain = ducking_gain(rms, times, len(music), music_fps)
+    gain *= volume
+    return music * (gain[:, None] if music.ndim == 2 else gain)
+
+def sidechain_filter(music_label: str, voice_label: str, out_label: str) -> str:
+    """
+    O mesmo compressor em filtro do FFmpeg (sidechaincompress): limiar, ratio,
+    detecção RMS, joelho duro e os mesmos tempos de ataque/release.
+    """
+    threshold = 10 ** (DUCKING["threshold_db"] / 20)
+    return (f"[{music_label}][{voice_label}]sidechaincompress="
+            f"threshold={threshold:.4f}:ratio={DUCKING['ratio']:g}:knee=1:detection=rms:"
+            f"attack={DUCKING['attack'] * 1000:g}:release={DUCKING['release'] * 1000:g}[{out_label}]")
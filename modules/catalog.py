@@ -0,0 +1,202 @@
+# modules/catalog.py
+"""
+Catálogo indexado dos cortes (tabela `catalog` do clips/pipeline.db).
+
+Mantido incrementalmente por storage.save_upload_checkpoint (só o arquivo
+final de cada corte, com outro quando há) e mark_clip_uploaded: caminho, tamanho, duração, hook, tags, status de upload
+e ID do vídeo no YouTube. list_clips.py e check_status.py leem só o índice,
+com filtro e ordenação no SQLite, sem varrer diretórios nem abrir metadados.
+
+rebuild() refaz o índice do zero varrendo os diretórios em paralelo (útil
+para cortes gerados antes do catálogo ou movidos à mão).
+"""
+import json
+import os
+import re
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from . import state_db
+
+SORT_COLUMNS = {
+    "name": "video_dir, file_name",
+    "date": "mtime DESC",
+    "size": "size DESC",
+    "duration": "duration DESC",
+}
+OUTRO_SUFFIX = "_com_outro"
+INTERMEDIATE_MARKERS = (".tmp", "TEMP_MPY")
+_DURATION_RE = re.compile(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)")
+
+def probe_duration(path: str) -> float:
+    """Duração (s) lida do cabeçalho do `ffmpeg -i`, sem decodificar; None se não houver"""
+    from .video_optimizer import get_ffmpeg_binary
+    try:
+        result = subprocess.run([get_ffmpeg_binary(), "-hide_banner", "-i", str(path)],
+                                capture_output=True, text=True, timeout=30)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    match = _DURATION_RE.search(result.stderr)
+    if not match:
+        return None
+    h, m, s = match.groups()
+    return int(h) * 3600 + int(m) * 60 + float(s)
+
+def metadata_file_for(clip_path) -> Path:
+    """*_metadata.txt do corte (o corte com outro usa o do corte base)"""
+    clip_path = Path(clip_path)
+    stem = clip_path.stem[:-len(OUTRO_SUFFIX)] if clip_path.stem.endswith(OUTRO_SUFFIX) else clip_path.stem
+    return clip_path.with_name(f"{stem}_metadata.txt")
+
+def is_deliverable(clip_path: Path) -> bool:
+    """Só o arquivo final: pula temporários e o corte base quando existe a versão com outro"""
+    name = clip_path.name
+    if name.startswith(".") or any(marker in name for marker in INTERMEDIATE_MARKERS):
+        return False
+    if clip_path.stem.endswith(OUTRO_SUFFIX):
+        return True
+    return not clip_path.with_name(f"{clip_path.stem}{OUTRO_SUFFIX}{clip_path.suffix}").exists()
+
+def _read_metadata_tags(metadata_path: Path) -> list:
+    """Tags da última linha do *_metadata.txt ("#tag1 #tag2")"""
+    try:
+        lines = metadata_path.read_text(encoding="utf-8").strip().splitlines()
+    except OSError:
+        return []
+    if lines and lines[-1].startswith("#"):
+        return [tag.lstrip("#") for tag in lines[-1].split() if tag.startswith("#")]
+    return []
+
+def _file_fields(clip_path: Path, known: dict = None) -> dict:
+    """Tamanho/mtime do arquivo; a duração só é sondada se o arquivo mudou"""
+    st = clip_path.stat()
+    fields = {"size": st.st_size, "mtime": st.st_mtime}
+    if known and known.get("mtime") == st.st_mtime and known.get("duration") is not None:
+        fields["duration"] = known["duration"]
+    else:
+        fields["duration"] = probe_duration(clip_path)
+    return fields
+
+def _upsert(conn, clip_path: str, fields: dict):
+    clip_path = str(Path(clip_path))
+    fields = dict(fields)
+    if "tags" in fields:
+        fields["tags"] = json.dumps(fields["tags"] or [], ensure_ascii=False)
+    fields["indexed_at"] = datetime.now().isoformat(timespec="seconds")
+    exists = conn.execute("SELECT 1 FROM catalog WHERE clip_path = ?", (clip_path,)).fetchone()
+    if exists:
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        conn.execute(f"UPDATE catalog SET {assignments} WHERE clip_path = ?", (*fields.values(), clip_path))
+    else:
+        fields.setdefault("video_dir", str(Path(clip_path).parent))
+        fields.setdefault("file_name", Path(clip_path).name)
+        columns = ["clip_path", *fields]
+        conn.execute(f"INSERT INTO catalog ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                     (clip_path, *fields.values()))
+
+def _known(clips_dir: str, clip_path: str) -> dict:
+    row = state_db.connect(clips_dir).execute(
+        "SELECT mtime, duration FROM catalog WHERE clip_path = ?", (str(Path(clip_path)),)
+    ).fetchone()
+    return dict(row) if row else None
+
+def index_clip(clips_dir: str, clip_path: str, **fields):
+    """Insere/atualiza um corte no catálogo (lê tamanho/duração do arquivo se existir)"""
+    path = Path(clip_path)
+    if path.exists():
+        fields = {**_file_fields(path, _known(clips_dir, clip_path)), **fields}
+    with state_db.transaction(clips_dir) as conn:
+        _upsert(conn, clip_path, fields)
+
+def forget(clips_dir: str, clip_path: str):
+    with state_db.transaction(clips_dir) as conn:
+        conn.execute("DELETE FROM catalog WHERE clip_path = ?", (str(Path(clip_path)),))
+
+def mark_uploaded(clips_dir: str, clip_path: str, uploaded_at: str, video_id: str = None):
+    with state_db.transaction(clips_dir) as conn:
+        _upsert(conn, clip_path, {"uploaded": 1, "uploaded_at": uploaded_at, "video_id": video_id})
+
+def query(clips_dir: str, video: str = None, uploaded: bool = None, sort: str = "name",
+          limit: int = None) -> list:
+    """Cortes do catálogo com filtro por vídeo (substring do diretório) e status de upload"""
+    if not state_db.db_path(clips_dir).exists():
+        return []
+    where, params = [], []
+    if video:
+        where.append("video_dir LIKE ?")
+        params.append(f"%{video}%")
+    if uploaded is not None:
+        where.append("uploaded = ?")
+        params.append(int(uploaded))
+    sql = "SELECT * FROM catalog"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f" ORDER BY {SORT_COLUMNS.get(sort, SORT_COLUMNS['name'])}"
+    if limit:
+        sql += f" LIMIT {int(limit)}"
+    rows = state_db.connect(clips_dir).execute(sql, params).fetchall()
+    return [dict(row, tags=json.loads(row["tags"]), uploaded=bool(row["uploaded"])) for row in rows]
+
+def summary(clips_dir: str) -> list:
+    """Totais por diretório de vídeo: cortes, pendentes, bytes e duração"""
+    if not state_db.db_path(clips_dir).exists():
+        return []
+    rows = state_db.connect(clips_dir).execute(
+        "SELECT video_dir, COUNT(*) AS clips, SUM(uploaded = 0) AS pending, "
+        "COALESCE(SUM(size), 0) AS size, COALESCE(SUM(duration), 0) AS duration, MAX(mtime) AS last_mtime "
+        "FROM catalog GROUP BY video_dir ORDER BY video_dir"
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+def _scan_video_dir(video_dir: Path, known: dict, upload_rows: dict) -> list:
+    entries = []
+    for clip_path in sorted(video_dir.glob("*.mp4")):
+        if not is_deliverable(clip_path):
+            continue
+        key = str(clip_path)
+        metadata_file = metadata_file_for(clip_path)
+        upload = upload_rows.get(key, {})
+        info = json.loads(upload["info"]) if upload else {}
+        # Cortes já enviados saem da tabela de upload; o catálogo guarda o status
+        previous = known.get(key) or {}
+        entry = {
+            "video_dir": str(video_dir),
+            "file_name": clip_path.name,
+            "hook": info.get("hook") or clip_path.stem,
+            "tags": info.get("tags") or _read_metadata_tags(metadata_file),
+            "metadata_file": metadata_file.name if metadata_file.exists() else None,
+            "uploaded": int(bool(upload.get("uploaded") or previous.get("uploaded"))),
+            "uploaded_at": upload.get("uploaded_at") or previous.get("uploaded_at"),
+            "video_id": previous.get("video_id"),
+        }
+        entry.update(_file_fields(clip_path, previous))
+        entries.append((key, entry))
+    return entries
+
+def rebuild(clips_dir: str, workers: int = None) -> int:
+    """
+    Refaz o catálogo varrendo clips/ em paralelo (um diretório de vídeo por tarefa).
+    Mantém o que já se sabe (duração de arquivos inalterados, ID no YouTube).
+
+    Returns:
+        int: número de cortes indexados
+    """
+    base = Path(clips_dir)
+    video_dirs = [d for d in base.iterdir() if d.is_dir() and not d.name.startswith(".")]
+    conn = state_db.connect(clips_dir)
+    known = {row["clip_path"]: dict(row) for row in conn.execute(
+        "SELECT clip_path, mtime, duration, uploaded, uploaded_at, video_id FROM catalog")}
+    upload_rows = {row["clip_path"]: dict(row) for row in conn.execute(
+        "SELECT clip_path, info, uploaded, uploaded_at FROM clips")}
+
+    workers = workers or min(16, (os.cpu_count() or 4) * 2)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(lambda d: _scan_video_dir(d, known, upload_rows), video_dirs)
+        entries = [entry for result in results for entry in result]
+
+    with state_db.transaction(clips_dir) as conn:
+        conn.execute("DELETE FROM catalog")
+        for clip_path, fields in entries:
+            _upsert(conn, clip_path, fields)
+    return len(entries)
@@ -1,20 +1,60 @@
 import json
-import yaml
+from collections.abc import Mapping
 from typing import Dict, Any, List
 
-def load_cfg():
-    """Carrega as configurações do arquivo config.json ou config.yaml"""
-    try:
-        # Tenta carregar JSON primeiro
-        with open("config.json", "r", encoding="utf-8") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        # Fallback para YAML (compatibilidade)
+CONFIG_FILES = ("config.json", "config.yaml")
+
+class LazyConfig(Mapping):
+    """
+    Configuração carregada sob demanda: o arquivo só é lido no primeiro acesso
+    e o resultado é reaproveitado pelo resto do processo.
+    """
+
+    def __init__(self, paths=CONFIG_FILES):
+        self.paths = paths
+        self._data = None
+
+    def load(self) -> Dict[str, Any]:
+        """Carrega as configurações do arquivo config.json ou config.yaml (uma vez por processo)"""
+        if self._data is None:
+            self._data = self._parse()
+        return self._data
+
+    def reload(self) -> Dict[str, Any]:
+        """Força nova leitura do arquivo (ex: após editar o config.json)"""
+        self._data = None
+        return self.load()
+
+    def _parse(self) -> Dict[str, Any]:
+        json_path, yaml_path = self.paths
         try:
-            with open("config.yaml", "r", encoding="utf-8") as f:
-                return yaml.safe_load(f)
+            # Tenta carregar JSON primeiro
+            with open(json_path, "r", encoding="utf-8") as f:
+                return json.load(f)
         except FileNotFoundError:
-            raise FileNotFoundError("Nenhum arquivo de configuração encontrado (config.json ou config.yaml)")
+            # Fallback para YAML (compatibilidade)
+            try:
+                with open(yaml_path, "r", encoding="utf-8") as f:
+                    import yaml
+                    return yaml.safe_load(f)
+            except FileNotFoundError:
+                raise FileNotFoundError("Nenhum arquivo de configuração encontrado (config.json ou config.yaml)")
+
+    def __getitem__(self, key):
+        return self.load()[key]
+
+    def __iter__(self):
+        return iter(self.load())
+
+    def __len__(self):
+        return len(self.load())
+
+# Configuração global compartilhada por todos os módulos
+CONFIG = LazyConfig()
+
+def load_cfg():
+    """Carrega as configurações do arquivo config.json ou config.yaml"""
+    return CONFIG.load()
 
 def merge_configurations(pattern_config: Dict[str, Any], video_config: Dict[str, Any]) -> Dict[str, Any]:
     """
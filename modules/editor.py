@@ -1,13 +1,31 @@
 # modules/editor.py
 from pathlib import Path
 import moviepy.editor as mp
+from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
 from PIL import Image, ImageEnhance
 import re
 import unicodedata
 import os
 import json
+import shutil
 import numpy as np
-from .video_optimizer import create_optimized_write_params, print_optimization_info, create_fallback_params
+from .video_optimizer import (
+    profile_write_params, print_optimization_info, write_videofile_with_fallback, select_encoder_profile,
+)
+from .segmented_encoder import render_segmented
+from .tracing import StageClock
+from .profiler import count_calls
+from .render_session import RenderSession
+from .outro_appender import BACKGROUND_MUSIC_PATH, MUSIC_PAUSE_VOLUME, compose_with_outro
+from .audio_ducking import DUCKING
+from .render_cache import RenderCache, source_identity
+# Persistência (checkpoints/metadados) fica em storage para não exigir MoviePy;
+# reexportada aqui por compatibilidade
+from .storage import (
+    save_clip_metadata, list_video_clips,
+    get_checkpoint_path, save_checkpoint, load_checkpoint, validate_checkpoint_for_episode, clear_checkpoint,
+    get_upload_checkpoint_path, save_upload_checkpoint, load_upload_checkpoint, clear_upload_checkpoint,
+)
 
 def sanitize_filename(name, max_length=50):
     # Remove acentos
@@ -36,59 +54,6 @@ def create_video_directory(base_clips_dir: str, video_info: dict) -> Path:
     print(f"Diretório criado para o vídeo: {video_dir}")
     return video_dir
 
-def save_clip_metadata(video_dir: Path, clip_filename: str, highlight: dict, video_info: dict, episode_url: str, all_tags: list):
-    """
-    Salva os metadados do corte em um arquivo JSON
-    """
-    # Cria a descrição completa
-    original_title = video_info.get('title', 'Vídeo Original')
-    original_channel = video_info.get('channel', 'Canal Original')
-    
-    desc = f"""{highlight.get('description', highlight.get('hook', ''))}
-
-🎬 Trecho extraído do episódio: "{original_title}"
-📺 Canal original: {original_channel}"""
-
-    tags_string = "#" + " #".join(all_tags)
-    desc += f"\n\n{tags_string}"
-    
-    # Salva o arquivo de metadados
-    metadata_file = video_dir / f"{Path(clip_filename).stem}_metadata.txt"
-    with open(metadata_file, "w", encoding="utf-8") as f:
-        f.write(desc)
-    
-    print(f"Metadados salvos em: {metadata_file}")
-    return metadata_file
-
-def list_video_clips(base_clips_dir: str) -> dict:
-    """
-    Lista todos os vídeos processados e seus cortes
-    """
-    clips_info = {}
-    base_dir = Path(base_clips_dir)
-    
-    if not base_dir.exists():
-        print(f"Diretório {base_clips_dir} não encontrado")
-        return clips_info
-    
-    for video_dir in base_dir.iterdir():
-        if video_dir.is_dir():
-            video_name = video_dir.name
-            clips_info[video_name] = {
-                "video_dir": str(video_dir),
-                "clips": [],
-                "metadata_files": []
-            }
-            
-            # Lista os arquivos de vídeo e metadados
-            for file in video_dir.iterdir():
-                if file.suffix == '.mp4':
-                    clips_info[video_name]["clips"].append(file.name)
-                elif file.suffix == '.json' and 'metadata' in file.name:
-                    clips_info[video_name]["metadata_files"].append(file.name)
-    
-    return clips_info
-
 def get_font_path():
     # Usa Roboto-Bold.ttf da pasta fonts/ se existir, senão Arial-Bold
     font_dir = os.path.join(os.getcwd(), "fonts")
@@ -99,98 +64,6 @@ def get_font_path():
     print("Usando fonte fallback: Arial-Bold")
     return "Arial-Bold"
 
-def get_checkpoint_path(out_dir: str) -> Path:
-    """Retorna o caminho do arquivo de checkpoint"""
-    return Path(out_dir) / "checkpoint.json"
-
-def save_checkpoint(out_dir: str, video_path: str, highlight: dict, transcript: list, video_info: dict = None, episode_url: str = None):
-    """Salva o estado atual do processamento"""
-    checkpoint = {
-        "video_path": video_path,
-        "highlight": highlight,
-        "transcript": transcript,
-        "video_info": video_info or {},
-        "episode_url": episode_url,  # Adiciona a URL do episódio ao checkpoint
-        "created_at": str(Path().cwd())  # Adiciona timestamp de criação
-    }
-    checkpoint_path = get_checkpoint_path(out_dir)
-    # Cria o diretório se não existir
-    checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(checkpoint_path, "w", encoding="utf-8") as f:
-        json.dump(checkpoint, f, ensure_ascii=False, indent=2)
-    print(f"Checkpoint salvo em: {checkpoint_path}")
-
-def load_checkpoint(out_dir: str, episode_url: str = None) -> dict:
-    """
-    Carrega o último checkpoint salvo com validação da URL do episódio
-    
-    Args:
-        out_dir: Diretório onde está o checkpoint
-        episode_url: URL do episódio atual para validação
-    
-    Returns:
-        dict: Checkpoint se válido, None caso contrário
-    """
-    checkpoint_path = get_checkpoint_path(out_dir)
-    
-    # Verifica se o arquivo de checkpoint existe
-    if not checkpoint_path.exists():
-        print("ℹ️  Nenhum checkpoint encontrado")
-        return None
-    
-    try:
-        with open(checkpoint_path, "r", encoding="utf-8") as f:
-            checkpoint = json.load(f)
-        
-        # Validação da URL do episódio
-        if episode_url and checkpoint.get("episode_url"):
-            if checkpoint["episode_url"] != episode_url:
-                print(f"⚠️  Checkpoint inválido: URL do episódio não confere")
-                print(f"   Checkpoint: {checkpoint['episode_url']}")
-                print(f"   Atual: {episode_url}")
-                return None
-            else:
-                print(f"✅ Checkpoint válido encontrado para o episódio")
-        elif episode_url and not checkpoint.get("episode_url"):
-            print(f"⚠️  Checkpoint sem URL do episódio - considerando inválido para segurança")
-            return None
-        elif not episode_url:
-            print(f"ℹ️  Carregando checkpoint sem validação de URL")
-        
-        # Validação adicional: verifica se o arquivo de vídeo ainda existe
-        video_path = Path(checkpoint.get("video_path", ""))
-        if not video_path.exists():
-            print(f"⚠️  Checkpoint inválido: arquivo de vídeo não encontrado: {video_path}")
-            return None
-        
-        return checkpoint
-        
-    except (json.JSONDecodeError, KeyError, Exception) as e:
-        print(f"❌ Erro ao carregar checkpoint: {e}")
-        return None
-
-def validate_checkpoint_for_episode(out_dir: str, episode_url: str) -> dict:
-    """
-    Valida especificamente se existe um checkpoint válido para o episódio atual
-    
-    Args:
-        out_dir: Diretório onde está o checkpoint
-        episode_url: URL do episódio para validação
-    
-    Returns:
-        dict: Checkpoint se válido para o episódio, None caso contrário
-    """
-    return load_checkpoint(out_dir, episode_url)
-
-def clear_checkpoint(out_dir: str):
-    """Remove o arquivo de checkpoint"""
-    checkpoint_path = get_checkpoint_path(out_dir)
-    if checkpoint_path.exists():
-        checkpoint_path.unlink()
-        print("Checkpoint removido")
-    else:
-        print("ℹ️  Nenhum checkpoint encontrado para remoção")
-
 def segment_text(text: str, max_chars: int = 20) -> list:
     """
     Segmenta o texto em partes menores, garantindo uma linha por legenda.
@@ -371,6 +244,7 @@ def create_marquee_text(text: str, duration: float, fontsize: int, width: int,
     total_distance = text_width + width
     
     # Função de animação para mover o texto com loop contínuo
+    @count_calls("marquee")
     def move_text(t):
         # Calcula a posição X baseada no tempo
         progress = (t * speed) % total_distance
@@ -410,6 +284,7 @@ def create_typing_effect(text: str, duration: float, font_path: str, fontsize: i
     chars_per_second = 1 / typing_speed
     total_chars = len(text_upper)
     
+    @count_calls("typing")
     def make_frame(t):
         # Calcula quantos caracteres devem estar visíveis
         visible_chars = min(int(t * chars_per_second), total_chars)
@@ -475,6 +350,9 @@ def highlight_keywords(text: str) -> str:
     
     return ' '.join(highlighted_words)
 
+# Incrementar quando o visual do template/legendas mudar: invalida o cache de render
+TEMPLATE_VERSION = 1
+
 def create_template_clip(
         width: int, 
         height: int, 
@@ -496,6 +374,7 @@ def create_template_clip(
         video_size: (width, height) do tamanho do vídeo no template
     """
     # Cria um clip de fundo com gradiente azul/roxo
+    @count_calls("background")
     def make_background_frame(t):
         # Gradiente horizontal azul para roxo
         frame = np.zeros((height, width, 3), dtype=np.uint8)
@@ -571,6 +450,7 @@ def create_template_clip(
     logo_y = max(logo_size // 2, logo_y)
     
     # Cria logo circular com gradiente
+    @count_calls("logo")
     def make_logo_frame(t):
         frame = np.zeros((logo_size, logo_size, 3), dtype=np.uint8)
         center = logo_size // 2
@@ -686,6 +566,104 @@ def create_template_clip(
     
     return template
 
+def get_template_dimensions(format_type: str, final_height: int = 1920) -> tuple:
+    """Alturas do header, do footer e da área de vídeo do template para cada formato"""
+    if format_type == "vertical":
+        header_height = int(final_height * 0.12)  # 12% para header
+        footer_height = int(final_height * 0.08)  # 8% para footer
+    elif format_type == "square":
+        header_height = int(final_height * 0.13)  # 13% para header
+        footer_height = int(final_height * 0.09)  # 9% para footer
+    else:  # horizontal
+        header_height = int(final_height * 0.15)  # 15% para header
+        footer_height = int(final_height * 0.10)  # 10% para footer
+    
+    video_area_height = final_height - header_height - footer_height
+    return header_height, footer_height, video_area_height
+
+def _fit_width(size: tuple, width: int) -> tuple:
+    """Tamanho após clip.resize(width=...) (mesmo arredondamento do MoviePy)"""
+    w, h = size
+    return int(width), int(h * width / w)
+
+def _fit_height(size: tuple, height: int) -> tuple:
+    """Tamanho após clip.resize(height=...) (mesmo arredondamento do MoviePy)"""
+    w, h = size
+    return int(w * height / h), int(height)
+
+def compute_layout(source_size: tuple, crop_mode: str = "fit", final_size: tuple = (1080, 1920)) -> dict:
+    """
+    Calcula onde e em que tamanho o vídeo entra no template, só a partir do
+    tamanho da fonte, para que o decoder já entregue os frames no tamanho final.
+
+    Returns:
+        dict: source_size, format, header_height, decode_size (w, h) pedido ao
+              decoder, crop (x_center, y_center, w, h) ou None, size (w, h) na
+              área de conteúdo e position (x, y)
+    """
+    final_width, final_height = final_size
+    video_area_width = final_width - 40  # Margem de 20px de cada lado
+    original_w, original_h = source_size
+    aspect_ratio = original_w / original_h
+    crop = None
+
+    # Cada formato decide o tamanho de decode (e o recorte); a posição é
+    # calculada no fim, com as dimensões já arredondadas
+    if aspect_ratio > 1.5:  # Vídeo horizontal (16:9, 4:3, etc.)
+        video_format = "horizontal"
+        header_height, _, video_area_height = get_template_dimensions(video_format, final_height)
+        if crop_mode == "fit":
+            # Cabe toda a largura; se a altura passar da área, ajusta proporcionalmente
+            w, h = _fit_width(source_size, video_area_width)
+            if h > video_area_height:
+                w, h = _fit_height((w, h), video_area_height)
+            decode_size = (w, h)
+            center_x = False
+        else:  # crop_mode == "center"
+            # Cabe toda a altura; laterais excedentes são cortadas
+            w, h = _fit_height(source_size, video_area_height)
+            decode_size = (w, h)
+            if w > video_area_width:
+                crop = (w // 2, h // 2, video_area_width, video_area_height)
+            center_x = True
+        center_y = True
+    elif aspect_ratio < 0.8 or aspect_ratio <= 1:  # Vertical (9:16, 3:4...) ou quadrado ligeiramente vertical
+        video_format = "vertical" if aspect_ratio < 0.8 else "square"
+        header_height, _, video_area_height = get_template_dimensions(video_format, final_height)
+        w, h = _fit_height(source_size, video_area_height)
+        if w > video_area_width:
+            w, h = _fit_height((w, h), int(h * (video_area_width / w)))
+        decode_size = (w, h)
+        center_x, center_y = True, False
+    else:  # Quadrado ligeiramente horizontal
+        video_format = "square"
+        header_height, _, video_area_height = get_template_dimensions(video_format, final_height)
+        w, h = _fit_width(source_size, video_area_width)
+        if h > video_area_height:
+            w, h = _fit_height((w, h), video_area_height)
+        decode_size = (w, h)
+        center_x, center_y = False, True
+
+    # Encoders exigem dimensões pares; tamanho e posição saem do que é de fato decodificado
+    decode_size = (decode_size[0] // 2 * 2, decode_size[1] // 2 * 2)
+    if crop:
+        crop = (decode_size[0] // 2, decode_size[1] // 2, crop[2] // 2 * 2, crop[3] // 2 * 2)
+        w, h = crop[2], crop[3]
+    else:
+        w, h = decode_size
+    x = 20 + (video_area_width - w) // 2 if center_x else 20
+    y = max(0, header_height + ((video_area_height - h) // 2 if center_y else 0))
+
+    return {
+        "source_size": tuple(source_size),
+        "format": video_format,
+        "header_height": header_height,
+        "decode_size": decode_size,
+        "crop": crop,
+        "size": (w, h),
+        "position": (x, y),
+    }
+
 def make_clip(
         video_path: str, 
         highlight: dict, 
@@ -696,7 +674,10 @@ def make_clip(
         content_speed: float = 1.25,
         preserve_pitch: bool = True,
         cutting_duration: int = 61,
-        crop_mode: str = "fit"
+        crop_mode: str = "fit",
+        stage_timings: dict = None,
+        outro_path: str = None,
+        stage_probe=None
     ) -> Path:
     """
     Recorta, converte para vertical 9:16, gera legendas dinâmicas estilizadas e devolve o caminho final.
@@ -704,8 +685,33 @@ def make_clip(
     
     Args:
         crop_mode: "fit" para mostrar todo o conteúdo, "center" para recortar ao centro
+        stage_timings: dicionário opcional preenchido com o tempo (s) de cada etapa
+                       (load, subclip, speed, resize, subtitles, template, composite, encode).
+                       O MoviePy é preguiçoso: fora o encode, isso é tempo de montagem do grafo
+        stage_probe: `probe(etapa, clip)` opcional chamado com o clip intermediário de
+                     subclip, speed, resize, template e composite (ex.: o benchmark puxa
+                     frames por ele); o tempo do probe não entra em stage_timings
+        outro_path: se informado, o outro e a música de fundo entram no mesmo render
+                    (uma única codificação) e o arquivo gerado é o `_com_outro.mp4`
     """
+    # Todos os leitores, TextClips e temporários do render são fechados ao sair
+    with RenderSession() as session:
+        return _render_clip(
+            session, video_path, highlight, transcript, out_dir, video_info, optimization_config,
+            content_speed, preserve_pitch, cutting_duration, crop_mode, stage_timings, outro_path,
+            stage_probe
+        )
+
+def _render_clip(session, video_path, highlight, transcript, out_dir, video_info, optimization_config,
+                 content_speed, preserve_pitch, cutting_duration, crop_mode, stage_timings,
+                 outro_path=None, stage_probe=None) -> Path:
     seg = transcript[highlight["idx"]]
+    stages = StageClock(stage_timings, prefix="make_clip")
+
+    def probe(stage, stage_clip):
+        if stage_probe:
+            stage_probe(stage, stage_clip)
+            stages.restart()
     
     # Mostra informações de otimização
     print_optimization_info()
@@ -717,21 +723,80 @@ def make_clip(
         video_dir = Path(out_dir)
         video_dir.mkdir(exist_ok=True)
 
-    clip = mp.VideoFileClip(video_path)
-    video_duration = clip.duration
+    stages.mark("setup")
+
+    # Dimensões finais do template
+    final_width = 1080
+    final_height = 1920
+
+    # Geometria calculada antes de abrir o vídeo: o FFmpeg decodifica direto no
+    # tamanho da área de conteúdo (-vf scale no leitor), sem resize em Python
+    source_infos = ffmpeg_parse_infos(video_path)
+    source_size = tuple(source_infos["video_size"])
+    layout = compute_layout(source_size, crop_mode, (final_width, final_height))
+    decode_w, decode_h = layout["decode_size"]
+    target_resolution = None if (decode_w, decode_h) == source_size else (decode_h, decode_w)
 
     # Define início e fim do corte
     start = seg["start"]
     end = seg["end"]
     min_duration = cutting_duration*content_speed  # 1 minuto e 1 segundos
     if end - start < min_duration:
-        end = min(start + min_duration, video_duration)
+        end = min(start + min_duration, source_infos["video_duration"])
+
+    # Filtra apenas segmentos dentro do corte para otimizar
+    relevant_segments = [
+        segm for segm in transcript 
+        if not (segm["end"] <= start or segm["start"] >= end)
+    ]
+
+    profile_name = select_encoder_profile(
+        optimization_config["use_gpu"],
+        optimization_config["quality"],
+        optimization_config.get("encoder_profile"),
+        optimization_config.get("max_seconds_per_minute")
+    )
+    safe_hook = sanitize_filename(highlight['hook'])
+    outfile = video_dir / (f"{safe_hook}_com_outro.mp4" if outro_path else f"{safe_hook}.mp4")
+
+    # Cache de render: pula o corte se nenhuma camada mudou
+    render_cache = RenderCache(video_dir) if optimization_config.get("render_cache", True) else None
+    cache_artifacts = []
+    if render_cache:
+        # Passada única: o outro e a música de fundo fazem parte do arquivo gerado
+        music = outro_path and BACKGROUND_MUSIC_PATH.exists()
+        cache_keys = RenderCache.layer_keys({
+            "base": {
+                "source": source_identity(video_path), "start": start, "end": end,
+                "content_speed": content_speed, "preserve_pitch": preserve_pitch, "crop_mode": crop_mode,
+            },
+            "overlay": {
+                "template": TEMPLATE_VERSION, "question": highlight.get("question"), "font": get_font_path(),
+                "subtitles": [(segm["start"], segm["end"], segm["text"]) for segm in relevant_segments],
+            },
+            "encode": {
+                "profile": profile_name,
+                "outro": source_identity(outro_path) if outro_path else None,
+                "music": {"source": source_identity(BACKGROUND_MUSIC_PATH), "volume": MUSIC_PAUSE_VOLUME,
+                          "ducking": DUCKING} if music else None,
+                "segmented": optimization_config.get("segmented_encode", {}),
+            },
+        })
+        if render_cache.lookup(outfile, cache_keys):
+            print(f"♻️ Corte inalterado; reutilizando {outfile.name}")
+            return outfile
+
+    clip = session.video_file(video_path, target_resolution=target_resolution)
+    stages.mark("load")
 
     # Recorta o trecho
     clip = clip.subclip(start, end)
+    stages.mark("subclip")
+    probe("subclip", clip)
     
     # Aplica velocidade configurável ao conteúdo do short
     original_duration = end - start
+    speech_wav = None  # fala já decodificada (WAV acelerado), reaproveitada no ducking
     if content_speed != 1.0:
         if preserve_pitch and content_speed <= 2.0:  # FFmpeg atempo tem limite de 2x
             # Separa áudio e vídeo para processar separadamente
@@ -744,34 +809,47 @@ def make_clip(
             # Processa o áudio para manter o pitch original
             if audio_clip is not None:
                 try:
-                    # Usa FFmpeg diretamente no áudio do clip
-                    import tempfile
-                    import subprocess
-                    
-                    # Cria arquivo temporário para o áudio
-                    with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_audio:
-                        temp_audio_path = temp_audio.name
-                    
-                    # Salva o áudio original
-                    audio_clip.write_audiofile(temp_audio_path, verbose=False, logger=None)
-                    
-                    # Cria arquivo temporário para o áudio processado
-                    with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_audio_fast:
-                        temp_audio_fast_path = temp_audio_fast.name
-                    
-                    # Usa FFmpeg para acelerar mantendo pitch
-                    cmd = [
-                        'ffmpeg', '-y',  # Sobrescreve arquivo de saída
-                        '-i', temp_audio_path,
-                        '-filter:a', f'atempo={content_speed}',
-                        '-ar', '44100',  # Taxa de amostragem
-                        temp_audio_fast_path
-                    ]
-                    
-                    subprocess.run(cmd, check=True, capture_output=True)
-                    
-                    # Carrega o áudio processado
-                    audio_fast = mp.AudioFileClip(temp_audio_fast_path)
+                    # A faixa acelerada só depende da camada base: reaproveita do cache
+                    cached_audio = render_cache.layer_path(cache_keys["base"], ".wav") if render_cache else None
+                    if cached_audio and cached_audio.exists():
+                        audio_fast = session.audio_file(cached_audio)
+                        speech_wav = cached_audio
+                        print("♻️ Áudio acelerado reaproveitado do cache de render")
+                    else:
+                        # Usa FFmpeg diretamente no áudio do clip
+                        import subprocess
+                        
+                        # Temporários da sessão: só são removidos depois que o leitor
+                        # do áudio processado for fechado
+                        temp_audio_path = session.temp_path('.wav')
+                        
+                        # Salva o áudio original
+                        audio_clip.write_audiofile(temp_audio_path, verbose=False, logger=None)
+                        
+                        # Cria arquivo temporário para o áudio processado
+                        temp_audio_fast_path = session.temp_path('.wav')
+                        
+                        # Usa FFmpeg para acelerar mantendo pitch
+                        cmd = [
+                            'ffmpeg', '-y',  # Sobrescreve arquivo de saída
+                            '-i', temp_audio_path,
+                            '-filter:a', f'atempo={content_speed}',
+                            '-ar', '44100',  # Taxa de amostragem
+                            temp_audio_fast_path
+                        ]
+                        
+                        subprocess.run(cmd, check=True, capture_output=True)
+                        
+                        if cached_audio:
+                            cached_audio.parent.mkdir(parents=True, exist_ok=True)
+                            shutil.move(temp_audio_fast_path, cached_audio)
+                            temp_audio_fast_path = cached_audio
+                        
+                        # Carrega o áudio processado
+                        audio_fast = session.audio_file(temp_audio_fast_path)
+                        speech_wav = temp_audio_fast_path
+                    if cached_audio:
+                        cache_artifacts.append(cached_audio)
                     
                     # Combina vídeo acelerado com áudio processado
                     clip = video_clip.set_audio(audio_fast)
@@ -780,24 +858,10 @@ def make_clip(
                     print(f"   • Duração original: {original_duration:.2f}s -> nova: {clip.duration:.2f}s")
                     
                 except Exception as e:
+                    speech_wav = None
                     print(f"⚠️ Erro ao processar áudio com FFmpeg: {e}")
                     print("   • Usando método padrão (pitch será alterado)")
                     clip = clip.speedx(content_speed)
-                finally:
-                    # Limpa arquivos temporários de forma mais robusta
-                    import os
-                    import time
-                    
-                    # Aguarda um pouco para garantir que os arquivos foram liberados
-                    time.sleep(0.2)
-                    
-                    for temp_file in [temp_audio_path, temp_audio_fast_path]:
-                        try:
-                            if os.path.exists(temp_file):
-                                os.unlink(temp_file)
-                        except (PermissionError, OSError):
-                            # Se não conseguir deletar, não é crítico
-                            pass
             else:
                 # Se não há áudio, apenas acelera o vídeo
                 clip = video_clip
@@ -814,177 +878,41 @@ def make_clip(
         new_duration = original_duration
         print(f"⚡ Velocidade normal: 1.0x (duração: {original_duration:.2f}s)")
 
-    # Define dimensões finais do template
-    final_width = 1080
-    final_height = 1920
-    
-    # Calcula dimensões das seções do template (serão ajustadas baseadas no formato)
-    video_area_width = final_width - 40  # Margem de 20px de cada lado
-    
-    # Análise inteligente do formato do vídeo original
-    original_w, original_h = clip.size
-    original_aspect_ratio = original_w / original_h
-    
-    print(f"📐 Análise do vídeo original: {original_w}x{original_h} (proporção: {original_aspect_ratio:.2f})")
-    
-    # Função auxiliar para calcular dimensões do template baseadas no formato
-    def get_template_dimensions(format_type):
-        if format_type == "vertical":
-            header_height = int(final_height * 0.12)  # 12% para header
-            footer_height = int(final_height * 0.08)  # 8% para footer
-        elif format_type == "square":
-            header_height = int(final_height * 0.13)  # 13% para header
-            footer_height = int(final_height * 0.09)  # 9% para footer
-        else:  # horizontal
-            header_height = int(final_height * 0.15)  # 15% para header
-            footer_height = int(final_height * 0.10)  # 10% para footer
-        
-        video_area_height = final_height - header_height - footer_height
-        return header_height, footer_height, video_area_height
-    
-    # Define estratégia baseada na proporção original
-    video_format = "horizontal"  # Padrão
-    
-    if original_aspect_ratio > 1.5:  # Vídeo horizontal (16:9, 4:3, etc.)
+    stages.mark("speed")
+    probe("speed", clip)
+
+    original_w, original_h = layout["source_size"]
+    print(f"📐 Análise do vídeo original: {original_w}x{original_h} (proporção: {original_w / original_h:.2f})")
+    video_format = layout["format"]
+    if video_format == "horizontal":
         if crop_mode == "fit":
             print("🔄 Estratégia: Vídeo horizontal - mostrar todo conteúdo lateral")
         else:
             print("🔄 Estratégia: Vídeo horizontal - recorte ao centro")
-        
-        video_format = "horizontal"
-        
-        # Calcula dimensões do template para vídeo horizontal
-        header_height, footer_height, video_area_height = get_template_dimensions(video_format)
-        
-        if crop_mode == "fit":
-            # Redimensiona para caber toda a largura na área disponível
-            clip = clip.resize(width=video_area_width)
-            w, h = clip.size
-            
-            # Se a altura for maior que a área disponível, ajusta proporcionalmente
-            if h > video_area_height:
-                scale_factor = video_area_height / h
-                new_width = int(w * scale_factor)
-                clip = clip.resize(width=new_width, height=video_area_height)
-                w, h = clip.size
-            
-            # Centraliza verticalmente na área disponível
-            y_offset = (video_area_height - h) // 2
-            video_y = header_height + y_offset
-            
-            # Garante que a posição Y seja válida
-            video_y = max(0, video_y)
-            clip = clip.set_position((20, video_y))
-        else:  # crop_mode == "center"
-            # Redimensiona para caber toda a altura na área disponível
-            clip = clip.resize(height=video_area_height)
-            w, h = clip.size
-            
-            # Se a largura for maior que a área disponível, corta as laterais
-            if w > video_area_width:
-                x_center = w // 2
-                y_center = h // 2
-                clip = clip.crop(x_center=x_center, y_center=y_center, 
-                                width=video_area_width, height=video_area_height)
-                w, h = clip.size
-            
-            # Centraliza na área disponível
-            x_offset = (video_area_width - w) // 2
-            y_offset = (video_area_height - h) // 2
-            video_y = header_height + y_offset
-            
-            # Garante que a posição Y seja válida
-            video_y = max(0, video_y)
-            clip = clip.set_position((20 + x_offset, video_y))
-        
-    elif original_aspect_ratio < 0.8:  # Vídeo vertical (9:16, 3:4, etc.)
+    elif video_format == "vertical":
         print("🔄 Estratégia: Vídeo vertical - adaptar molde para aproveitar espaço")
-        video_format = "vertical"
-        
-        # Calcula dimensões do template para vídeo vertical
-        header_height, footer_height, video_area_height = get_template_dimensions(video_format)
-        
-        # Redimensiona para caber toda a altura na área disponível
-        clip = clip.resize(height=video_area_height)
-        w, h = clip.size
-        
-        # Se a largura for maior que a área disponível, ajusta proporcionalmente
-        if w > video_area_width:
-            scale_factor = video_area_width / w
-            new_height = int(h * scale_factor)
-            clip = clip.resize(width=video_area_width, height=new_height)
-            w, h = clip.size
-        
-        # Centraliza horizontalmente na área disponível
-        x_offset = (video_area_width - w) // 2
-        video_y = header_height
-        
-        # Garante que a posição Y seja válida
-        video_y = max(0, video_y)
-        clip = clip.set_position((20 + x_offset, video_y))
-        
-    else:  # Vídeo quadrado ou próximo do quadrado
+    else:
         print("🔄 Estratégia: Vídeo quadrado - ajuste proporcional")
-        video_format = "square"
-        
-        # Calcula dimensões do template para vídeo quadrado
-        header_height, footer_height, video_area_height = get_template_dimensions(video_format)
-        
-        # Redimensiona para caber na área disponível mantendo proporção
-        if original_aspect_ratio > 1:  # Ligeiramente horizontal
-            clip = clip.resize(width=video_area_width)
-            w, h = clip.size
-            if h > video_area_height:
-                scale_factor = video_area_height / h
-                new_width = int(w * scale_factor)
-                clip = clip.resize(width=new_width, height=video_area_height)
-                w, h = clip.size
-            y_offset = (video_area_height - h) // 2
-            video_y = header_height + y_offset
-            
-            # Garante que a posição Y seja válida
-            video_y = max(0, video_y)
-            clip = clip.set_position((20, video_y))
-        else:  # Ligeiramente vertical
-            clip = clip.resize(height=video_area_height)
-            w, h = clip.size
-            if w > video_area_width:
-                scale_factor = video_area_width / w
-                new_height = int(h * scale_factor)
-                clip = clip.resize(width=video_area_width, height=new_height)
-                w, h = clip.size
-            x_offset = (video_area_width - w) // 2
-            video_y = header_height
-            
-            # Garante que a posição Y seja válida
-            video_y = max(0, video_y)
-            clip = clip.set_position((20 + x_offset, video_y))
-    
-    # Garante dimensões pares
-    final_w, final_h = clip.size
-    if final_w % 2 != 0 or final_h % 2 != 0:
-        new_w = final_w // 2 * 2
-        new_h = final_h // 2 * 2
-        clip = clip.resize(newsize=(new_w, new_h))
-    
-    # Usa as posições calculadas durante o posicionamento
-    video_x = 20  # Posição padrão X (já calculada acima)
-    # video_y já foi calculada durante o posicionamento em cada estratégia
-    
-    print(f"✅ Vídeo adaptado: {final_w}x{final_h} na área de conteúdo")
+
+    # O decoder já entregou os frames no tamanho do layout; resta só o recorte
+    if layout["crop"]:
+        x_center, y_center, crop_w, crop_h = layout["crop"]
+        clip = clip.crop(x_center=x_center, y_center=y_center, width=crop_w, height=crop_h)
+    clip = clip.set_position(layout["position"])
+    final_w, final_h = layout["size"]
+    video_x, video_y = layout["position"]
+    
+    print(f"✅ Vídeo adaptado: {final_w}x{final_h} na área de conteúdo (decodificado em {decode_w}x{decode_h})")
     print(f"   • Posição: ({video_x}, {video_y})")
 
+    stages.mark("resize")
+    probe("resize", clip)
+
     font_path = get_font_path()
     # Tamanho da fonte: ~2.2% da altura do quadro (≈ 42–48 px em vídeos 1080 × 1920)
     fontsize = int(0.022 * final_height)  # 2.2% da altura total do quadro
     legendas = []
     
-    # Filtra apenas segmentos dentro do corte para otimizar
-    relevant_segments = [
-        segm for segm in transcript 
-        if not (segm["end"] <= start or segm["start"] >= end)
-    ]
-    
     print(f"Processando {len(relevant_segments)} segmentos relevantes...")
     for i, segm in enumerate(relevant_segments):
             
@@ -1038,15 +966,17 @@ def make_clip(
                 )
 
                 legenda = legenda.set_start(max(0, subseg_start - 0))
-                legendas.append(legenda)
+                legendas.append(session.own_tree(legenda))
             except Exception as e:
                 print(f"Erro ao criar legenda: {segmento[:50]}... | Erro: {e}")
                 print(f"Detalhes do erro: {str(e)}")
                 continue
 
+    stages.mark("subtitles")
+
     # Cria o template com header e footer adaptado ao formato do vídeo
     # Passa informações da posição e tamanho do vídeo para posicionamento dinâmico
-    video_pos = (video_x, video_y)  # Usa as posições capturadas anteriormente
+    video_pos = (video_x, video_y)  # Mesma posição do layout usada no set_position
     video_sz = (final_w, final_h)  # Usa o tamanho final do vídeo
     
     template = create_template_clip(
@@ -1058,6 +988,9 @@ def make_clip(
         video_position=video_pos, 
         video_size=video_sz
     )
+    session.own_tree(template)
+    stages.mark("template")
+    probe("template", template)
     
     # Posiciona o vídeo com legendas na área central do template
     # O vídeo já está posicionado corretamente, então apenas combina com as legendas
@@ -1069,95 +1002,36 @@ def make_clip(
     # Combina template com vídeo
     final = mp.CompositeVideoClip([template, video_with_subtitles], 
                                 size=(final_width, final_height))
+    session.own_tree(final)
 
-    safe_hook = sanitize_filename(highlight['hook'])
-    outfile = video_dir / f"{safe_hook}.mp4"
+    # Passada única: outro e música entram no mesmo grafo, sem recodificar o corte depois
+    if outro_path:
+        print(f"🎬 Incluindo outro no render: {Path(outro_path).stem}")
+        final, _ = compose_with_outro(session, final, outro_path, speech_wav=speech_wav)
+        session.own_tree(final)
 
-    # Usa parâmetros otimizados
-    write_params = create_optimized_write_params(
-        use_gpu=optimization_config["use_gpu"],
-        quality=optimization_config["quality"]
-    )
+    stages.mark("composite")
+    probe("composite", final)
+
+    # Mesmo perfil da chave de cache (selecionado uma vez no início)
+    write_params = profile_write_params(profile_name)
     
     print(f"🎬 Renderizando com otimizações: {write_params['codec']}")
     
-    try:
-        final.write_videofile(str(outfile), **write_params)
-    except Exception as e:
-        if "h264_amf" in str(write_params.get('codec', '')) and "Invalid argument" in str(e):
-            print("⚠️ Erro no codec AMD, usando fallback para CPU...")
-            fallback_params = create_fallback_params()
-            print(f"🔄 Renderizando com fallback: {fallback_params['codec']}")
-            final.write_videofile(str(outfile), **fallback_params)
-        else:
-            # Re-raise se não for erro de codec AMD
-            raise e
+    # Encode segmentado opcional: intermediário rápido + segmentos em paralelo
+    segmented = optimization_config.get("segmented_encode", {})
+    rendered = False
+    if segmented.get("enabled"):
+        rendered = render_segmented(
+            final, outfile, profile_name,
+            segment_seconds=segmented.get("segment_seconds", 4.0),
+            workers=segmented.get("workers")
+        )
+    if not rendered:
+        write_videofile_with_fallback(final, outfile, write_params)
+    stages.mark("encode", frames=int(final.duration * write_params.get("fps", 30)))
 
-    clip.close()
-    final.close()
-    template.close()
+    if render_cache:
+        render_cache.store(outfile, cache_keys, cache_artifacts)
 
     return outfile
-
-def get_upload_checkpoint_path(video_dir: str) -> Path:
-    """Retorna o caminho do arquivo de checkpoint de upload para o diretório do vídeo"""
-    return Path(video_dir) / "upload_checkpoint.json"
-
-def save_upload_checkpoint(video_dir: str, episode_url: str, generated_clips: list):
-    """
-    Salva checkpoint com informações de todos os cortes gerados para upload posterior
-    """
-    checkpoint_path = get_upload_checkpoint_path(video_dir)
-    
-    # Adiciona campos de status de upload se não existirem
-    for clip in generated_clips:
-        if "uploaded" not in clip:
-            clip["uploaded"] = False
-        if "uploaded_at" not in clip:
-            clip["uploaded_at"] = None
-    
-    checkpoint_data = {
-        "episode_url": episode_url,
-        "generated_clips": generated_clips,
-        "total_clips": len(generated_clips),
-        "created_at": str(Path().cwd() / "upload_checkpoint.json")
-    }
-    
-    with open(checkpoint_path, "w", encoding="utf-8") as f:
-        json.dump(checkpoint_data, f, indent=2, ensure_ascii=False)
-    
-    print(f"✅ Checkpoint de upload salvo: {checkpoint_path}")
-    print(f"   • {len(generated_clips)} cortes prontos para upload")
-    return checkpoint_path
-
-
-def load_upload_checkpoint(video_dir: str) -> dict:
-    """
-    Carrega checkpoint de upload se existir para o diretório do vídeo
-    """
-    checkpoint_path = get_upload_checkpoint_path(video_dir)
-    
-    if not checkpoint_path.exists():
-        return None
-    
-    try:
-        with open(checkpoint_path, "r", encoding="utf-8") as f:
-            checkpoint_data = json.load(f)
-        print(f"✅ Checkpoint de upload carregado: {checkpoint_path}")
-        print(f"   • {checkpoint_data['total_clips']} cortes encontrados")
-        return checkpoint_data
-    except Exception as e:
-        print(f"❌ Erro ao carregar checkpoint de upload: {e}")
-        return None
-
-
-def clear_upload_checkpoint(video_dir: str):
-    """
-    Remove checkpoint de upload após conclusão para o diretório do vídeo
-    """
-    checkpoint_path = get_upload_checkpoint_path(video_dir)
-    if checkpoint_path.exists():
-        checkpoint_path.unlink()
-        print(f"✅ Checkpoint de upload removido: {checkpoint_path}")
-    else:
-        print("ℹ️ Nenhum checkpoint de upload encontrado para remover")
\ No newline at end of file
@@ -0,0 +1,177 @@
+# modules/fake_openai_batch.py
+"""
+Servidor local que imita a Files API e a Batch API da OpenAI (o suficiente
+para o LLMBatch de modules/llm_utils.py), para exercitar o modo batch sem
+custo nem espera de até 24h.
+
+Uso:
+    python -m modules.fake_openai_batch --port 8766
+    OPENAI_BASE_URL=http://127.0.0.1:8766/v1 OPENAI_API_KEY=fake python main.py --batch
+
+Ou em código (ex.: testes):
+    server = start_fake_openai_batch()
+    server.responses["ep1-abc"] = '{"highlights": [...]}'   # conteúdo por custom_id
+    server.fail_requests("ep2-def")                          # vai para o arquivo de erros
+    ... LLMBatch com OPENAI_BASE_URL=server.endpoint ...
+    server.shutdown()
+
+Rotas: `POST /v1/files` (multipart, purpose=batch), `GET /v1/files/{id}/content`,
+`POST /v1/batches` e `GET /v1/batches/{id}`. O lote fica `in_progress` nas
+primeiras `polls_until_complete` consultas e depois `completed`, com os
+arquivos de saída e de erros no formato JSONL da OpenAI.
+"""
+import argparse
+import json
+import threading
+import time
+import uuid
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+API_PREFIX = "/v1"
+DEFAULT_CONTENT = '{"highlights": []}'
+USAGE = {"prompt_tokens": 1000, "completion_tokens": 200, "total_tokens": 1200,
+         "prompt_tokens_details": {"cached_tokens": 0}}
+
+def _parse_multipart(content_type: str, body: bytes) -> dict:
+    """Campos de um multipart/form-data ({nome: bytes})"""
+    message = BytesParser(policy=HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode("latin-1") + body)
+    return {part.get_param("name", header="content-disposition"): part.get_payload(decode=True)
+            for part in message.iter_parts()}
+
+def _jsonl(items: list) -> bytes:
+    return "".join(json.dumps(item) + "\n" for item in items).encode("utf-8")
+
+class _FakeBatchHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _reply(self, code: int, body=None, raw: bytes = None):
+        payload = raw if raw is not None else json.dumps(body).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/octet-stream" if raw is not None else "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _not_found(self):
+        self._reply(404, {"error": {"message": f"Not found: {self.path}", "type": "invalid_request_error"}})
+
+    def _add_file(self, content: bytes, purpose: str, filename: str) -> dict:
+        file_id = f"file-{uuid.uuid4().hex[:24]}"
+        self.server.files[file_id] = content
+        return {"id": file_id, "object": "file", "bytes": len(content), "created_at": int(time.time()),
+                "filename": filename, "purpose": purpose, "status": "processed"}
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        body = self._read_body()
+        if path == f"{API_PREFIX}/files":
+            fields = _parse_multipart(self.headers.get("Content-Type", ""), body)
+            self._reply(200, self._add_file(fields.get("file") or b"", (fields.get("purpose") or b"").decode(),
+                                            "batch_input.jsonl"))
+        elif path == f"{API_PREFIX}/batches":
+            params = json.loads(body or b"{}")
+            if params.get("input_file_id") not in self.server.files:
+                self._reply(400, {"error": {"message": "input_file_id not found", "type": "invalid_request_error"}})
+                return
+            batch_id = f"batch_{uuid.uuid4().hex[:24]}"
+            self.server.batches[batch_id] = {
+                "id": batch_id, "object": "batch", "endpoint": params["endpoint"],
+                "input_file_id": params["input_file_id"], "completion_window": params["completion_window"],
+                "status": "validating", "created_at": int(time.time()),
+                "output_file_id": None, "error_file_id": None, "polls": 0,
+            }
+            self._reply(200, self._public(batch_id))
+        else:
+            self._not_found()
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path.startswith(f"{API_PREFIX}/batches/"):
+            batch_id = path.rsplit("/", 1)[1]
+            batch = self.server.batches.get(batch_id)
+            if batch is None:
+                self._not_found()
+                return
+            batch["polls"] += 1
+            self.server.retrievals += 1
+            if batch["status"] != "completed":
+                if batch["polls"] > self.server.polls_until_complete:
+                    self._complete(batch)
+                else:
+                    batch["status"] = "in_progress"
+            self._reply(200, self._public(batch_id))
+        elif path.startswith(f"{API_PREFIX}/files/") and path.endswith("/content"):
+            content = self.server.files.get(path.split("/")[-2])
+            if content is None:
+                self._not_found()
+                return
+            self._reply(200, raw=content)
+        else:
+            self._not_found()
+
+    def _public(self, batch_id: str) -> dict:
+        return {k: v for k, v in self.server.batches[batch_id].items() if k != "polls"}
+
+    def _complete(self, batch: dict):
+        """Gera os arquivos de saída/erros a partir das requisições do arquivo de entrada"""
+        output, errors = [], []
+        for line in self.server.files[batch["input_file_id"]].decode("utf-8").splitlines():
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            custom_id = request["custom_id"]
+            item = {"id": f"batch_req_{uuid.uuid4().hex[:24]}", "custom_id": custom_id}
+            if custom_id in self.server.failed:
+                errors.append({**item, "response": {"status_code": 400, "request_id": uuid.uuid4().hex, "body": {
+                    "error": {"message": "Injected failure", "type": "invalid_request_error"}}}, "error": None})
+                continue
+            content = self.server.responses.get(custom_id, DEFAULT_CONTENT)
+            output.append({**item, "error": None, "response": {"status_code": 200, "request_id": uuid.uuid4().hex,
+                "body": {"id": f"chatcmpl-{uuid.uuid4().hex[:24]}", "object": "chat.completion",
+                         "model": request["body"]["model"], "usage": USAGE,
+                         "choices": [{"index": 0, "finish_reason": "stop",
+                                      "message": {"role": "assistant", "content": content}}]}}})
+        if output:
+            batch["output_file_id"] = self._add_file(_jsonl(output), "batch_output", "output.jsonl")["id"]
+        if errors:
+            batch["error_file_id"] = self._add_file(_jsonl(errors), "batch_output", "errors.jsonl")["id"]
+        batch["status"] = "completed"
+        batch["request_counts"] = {"total": len(output) + len(errors), "completed": len(output),
+                                   "failed": len(errors)}
+
+    def log_message(self, format, *args):
+        pass
+
+def start_fake_openai_batch(port: int = 0, host: str = "127.0.0.1",
+                            polls_until_complete: int = 1) -> ThreadingHTTPServer:
+    """Sobe o servidor numa thread daemon; `server.endpoint` é o valor para OPENAI_BASE_URL"""
+    server = ThreadingHTTPServer((host, port), _FakeBatchHandler)
+    server.files = {}
+    server.batches = {}
+    server.responses = {}  # custom_id -> conteúdo da resposta
+    server.failed = set()
+    server.retrievals = 0
+    server.polls_until_complete = polls_until_complete
+    server.fail_requests = lambda *custom_ids: server.failed.update(custom_ids)
+    server.endpoint = f"http://{host}:{server.server_address[1]}{API_PREFIX}"
+    threading.Thread(target=server.serve_forever, name="fake-openai-batch", daemon=True).start()
+    return server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Files/Batch API da OpenAI falsas para testes do modo batch")
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+    server = start_fake_openai_batch(args.port)
+    print(f"🧪 Batch API falsa em {server.endpoint} (Ctrl+C para sair)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,129 @@
+# modules/fake_youtube.py
+"""
+Servidor local que imita o endpoint de inserção de vídeos do YouTube Data API
+(`POST /upload/youtube/v3/videos?uploadType=resumable` + `PUT` na sessão),
+para exercitar a fila de publicação e o uploader sem tocar no YouTube.
+
+Uso:
+    python -m modules.fake_youtube --port 8765
+    YOUTUBE_API_ENDPOINT=http://127.0.0.1:8765/ python upload_clips.py
+
+Ou em código (ex.: testes):
+    server = start_fake_youtube()
+    server.fail_next(2, status=503, keep_bytes=100_000)   # falhas injetadas
+    ... uploads apontando para server.endpoint ...
+    server.uploads   # [{"id", "snippet", "status", "size"}]
+    server.shutdown()
+
+Implementa o protocolo resumível: pedaços com `Content-Range`, resposta 308
+com `Range` enquanto faltam bytes e consulta de status (`bytes */total`).
+As falhas injetadas guardam `keep_bytes` do pedaço antes de responder com
+erro, como um upload que caiu no meio.
+"""
+import argparse
+import json
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+INSERT_PATH = "/upload/youtube/v3/videos"
+SESSION_PATH = "/upload/session/"
+
+class _FakeYouTubeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _reply(self, code: int, body: dict = None, headers: dict = None):
+        payload = json.dumps(body).encode("utf-8") if body is not None else b""
+        self.send_response(code)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if body is not None:
+            self.send_header("Content-Type", "application/json; charset=UTF-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != INSERT_PATH or parse_qs(url.query).get("uploadType") != ["resumable"]:
+            self._reply(404, {"error": {"code": 404, "message": "Not Found"}})
+            return
+        metadata = json.loads(self._read_body() or b"{}")
+        session_id = uuid.uuid4().hex
+        self.server.sessions[session_id] = {"metadata": metadata, "data": bytearray()}
+        host = self.headers.get("Host", "%s:%d" % self.server.server_address[:2])
+        self._reply(200, headers={"Location": f"http://{host}{SESSION_PATH}{session_id}"})
+
+    def do_PUT(self):
+        url = urlparse(self.path)
+        session = self.server.sessions.get(url.path[len(SESSION_PATH):]) if url.path.startswith(SESSION_PATH) else None
+        if session is None:
+            self._reply(404, {"error": {"code": 404, "message": "Upload session not found"}})
+            return
+        chunk = self._read_body()
+        if self.server.faults and chunk:
+            status, keep_bytes = self.server.faults.pop(0)
+            session["data"].extend(chunk[:keep_bytes])
+            self.server.received += len(chunk)
+            self._reply(status, {"error": {"code": status, "message": "Injected failure"}})
+            return
+        self.server.received += len(chunk)
+        total = None
+        content_range = self.headers.get("Content-Range")
+        if content_range:
+            # "bytes 0-999/5000", "bytes 0-999/*" ou "bytes */5000" (consulta de status)
+            spec, _, size = content_range.split(" ", 1)[1].partition("/")
+            total = None if size == "*" else int(size)
+            if spec == "*":
+                chunk = b""  # consulta de status (ou fechamento de um arquivo vazio)
+            else:
+                first, _, last = spec.partition("-")
+                if not (first.isdigit() and last.isdigit()) or int(last) - int(first) + 1 != len(chunk):
+                    self._reply(400, {"error": {"code": 400, "message": f"Invalid Content-Range: {content_range}"}})
+                    return
+                if int(first) != len(session["data"]):
+                    self._reply(400, {"error": {"code": 400, "message": "Unexpected byte offset"}})
+                    return
+        else:
+            total = len(session["data"]) + len(chunk)
+        session["data"].extend(chunk)
+
+        received = len(session["data"])
+        if total is None or received < total:
+            headers = {"Range": f"bytes=0-{received - 1}"} if received else {}
+            self._reply(308, headers=headers)
+            return
+        video = {"id": uuid.uuid4().hex[:11], **session["metadata"], "size": received}
+        self.server.uploads.append(video)
+        self._reply(200, {"kind": "youtube#video", "id": video["id"]})
+
+    def log_message(self, format, *args):
+        pass
+
+def start_fake_youtube(port: int = 0, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Sobe o servidor numa thread daemon; `server.endpoint` é a raiz a usar como api_endpoint"""
+    server = ThreadingHTTPServer((host, port), _FakeYouTubeHandler)
+    server.sessions = {}
+    server.uploads = []
+    server.faults = []
+    server.received = 0  # bytes recebidos, incluindo pedaços reenviados
+    server.fail_next = lambda count, status=503, keep_bytes=0: server.faults.extend([(status, keep_bytes)] * count)
+    server.endpoint = f"http://{host}:{server.server_address[1]}/"
+    threading.Thread(target=server.serve_forever, name="fake-youtube", daemon=True).start()
+    return server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="YouTube Data API falso para testes de upload")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    server = start_fake_youtube(args.port)
+    print(f"🧪 YouTube falso em {server.endpoint} (Ctrl+C para sair)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
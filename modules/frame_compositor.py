@@ -0,0 +1,201 @@
+# modules/frame_compositor.py
+"""
+Composição de frames sem cópias desnecessárias no caminho do MoviePy.
+
+O MoviePy aloca por frame: o resize faz astype('uint8') e devolve um array novo,
+cada camada do CompositeVideoClip copia o frame inteiro (+im2) e mistura a
+máscara em float64, e o writer serializa o frame com tobytes(). Aqui:
+
+- ResizeInto: resize com cv2.resize(dst=...) num buffer pré-alocado por clip
+- composite_make_frame: cada composite mantém um buffer próprio; o fundo é
+  copiado uma vez e as camadas são misturadas in-place com alfa em inteiros
+  de 16 bits. Máscaras estáticas (ImageClip/TextClip, marcadas com
+  mark_static) têm o alfa cacheado; máscaras que mudam a cada frame são
+  convertidas em buffers temporários reaproveitados, só na região visível
+- write_frame_zero_copy: envia ao stdin do FFmpeg um memoryview do próprio frame
+
+Instalado por moviepy_patch.patch_compositor().
+"""
+from collections import OrderedDict
+import cv2
+import numpy as np
+
+ALPHA_CACHE_BYTES = 64 * 1024 * 1024
+
+class ResizeInto:
+    """fl_image que redimensiona para `size` (w, h) reaproveitando o mesmo buffer"""
+
+    def __init__(self, size: tuple):
+        self.size = (int(size[0]), int(size[1]))
+        self._buf = None
+
+    def __call__(self, pic):
+        if pic.dtype != np.uint8:
+            pic = pic.astype("uint8")
+        w, h = self.size
+        shape = (h, w) + pic.shape[2:]
+        if self._buf is None or self._buf.shape != shape:
+            self._buf = np.empty(shape, dtype=np.uint8)
+        # INTER_AREA para reduzir (sem aliasing), INTER_LINEAR para ampliar
+        interpolation = cv2.INTER_LINEAR if w > pic.shape[1] or h > pic.shape[0] else cv2.INTER_AREA
+        cv2.resize(pic, (w, h), dst=self._buf, interpolation=interpolation)
+        return self._buf
+
+def mark_static(clip):
+    """Marca a máscara como estática: o make_frame atual devolve sempre o mesmo array"""
+    clip._static_make_frame = clip.make_frame
+    return clip
+
+def is_static(clip) -> bool:
+    # fl()/fadein copiam o atributo mas trocam o make_frame, então deixam de contar
+    return getattr(clip, "_static_make_frame", None) is clip.make_frame
+
+class _AlphaCache:
+    """
+    Máscaras estáticas convertidas uma vez para pesos inteiros 0..256.
+    Limitado em bytes (LRU); só recebe máscaras marcadas com mark_static.
+    """
+
+    def __init__(self, max_bytes: int = ALPHA_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._items = OrderedDict()
+
+    def get(self, mask: np.ndarray) -> tuple:
+        """Retorna (alfa, 256 - alfa) como uint16"""
+        key = id(mask)
+        item = self._items.get(key)
+        # Guarda a máscara junto para que o id não seja reutilizado enquanto está no cache
+        if item is not None and item[0] is mask:
+            self._items.move_to_end(key)
+            return item[1]
+        alpha = np.rint(np.clip(mask, 0.0, 1.0) * 256).astype(np.uint16)
+        weights = (alpha, 256 - alpha)
+        size = alpha.nbytes * 2
+        if size > self.max_bytes:
+            return weights
+        if item is not None:
+            self.nbytes -= item[1][0].nbytes * 2
+        self._items[key] = (mask, weights)
+        self.nbytes += size
+        while self.nbytes > self.max_bytes:
+            _, (_, old) = self._items.popitem(last=False)
+            self.nbytes -= old[0].nbytes * 2
+        return weights
+
+ALPHA_CACHE = _AlphaCache()
+
+_scratch = {}
+
+def _scratch_buffers(shape: tuple, kind: str = "blend"):
+    """Buffers temporários reaproveitados entre frames (por formato e uso)"""
+    key = (kind, shape)
+    bufs = _scratch.get(key)
+    if bufs is None:
+        if kind == "alpha":
+            bufs = (np.empty(shape, np.uint16), np.empty(shape, np.uint16), np.empty(shape, np.float32))
+        else:
+            bufs = (np.empty(shape, np.uint16), np.empty(shape, np.uint16))
+        _scratch[key] = bufs
+    return bufs
+
+def _frame_alpha(mask: np.ndarray) -> tuple:
+    """Pesos de uma máscara por frame em buffers reaproveitados (sem alocar)"""
+    alpha, inverse, work = _scratch_buffers(mask.shape, "alpha")
+    np.clip(mask, 0.0, 1.0, out=work)
+    work *= 256
+    np.rint(work, out=work)
+    np.copyto(alpha, work, casting="unsafe")
+    np.subtract(256, alpha, out=inverse)
+    return alpha, inverse
+
+def blend_into(dst: np.ndarray, img: np.ndarray, pos: tuple, mask: np.ndarray = None,
+               static_mask: bool = False):
+    """Mistura `img` (com máscara opcional) sobre `dst` na posição (x, y), in-place"""
+    xp, yp = pos
+    h1, w1 = img.shape[:2]
+    h2, w2 = dst.shape[:2]
+    x1, y1 = max(0, -xp), max(0, -yp)
+    xp1, yp1 = max(0, xp), max(0, yp)
+    xp2, yp2 = min(w2, xp + w1), min(h2, yp + h1)
+    x2, y2 = min(w1, w2 - xp), min(h1, h2 - yp)
+    if xp1 >= xp2 or yp1 >= yp2:
+        return
+
+    src = img[y1:y2, x1:x2]
+    region = dst[yp1:yp2, xp1:xp2]
+    if mask is None:
+        np.copyto(region, src, casting="unsafe")
+        return
+
+    if static_mask:
+        alpha, inverse = ALPHA_CACHE.get(mask)
+        alpha, inverse = alpha[y1:y2, x1:x2], inverse[y1:y2, x1:x2]
+    else:
+        alpha, inverse = _frame_alpha(mask[y1:y2, x1:x2])
+    if region.ndim == 3:
+        alpha, inverse = alpha[:, :, None], inverse[:, :, None]
+    acc, tmp = _scratch_buffers(region.shape)
+    # (src * a + dst * (256 - a)) >> 8, tudo em uint16 sem alocar; camadas
+    # float (fades) são truncadas como no astype('uint8') do MoviePy
+    np.multiply(src, alpha, out=acc, casting="unsafe")
+    np.multiply(region, inverse, out=tmp)
+    acc += tmp
+    acc >>= 8
+    np.copyto(region, acc, casting="unsafe")
+
+def _layer_position(clip, ct: float, frame_size: tuple, img_size: tuple) -> tuple:
+    """Mesma resolução de posição do VideoClip.blit_on (strings, relativa, função do tempo)"""
+    wf, hf = frame_size
+    wi, hi = img_size
+    pos = clip.pos(ct)
+    if isinstance(pos, str):
+        pos = {"center": ["center", "center"], "left": ["left", "center"], "right": ["right", "center"],
+               "top": ["center", "top"], "bottom": ["center", "bottom"]}[pos]
+    else:
+        pos = list(pos)
+    if clip.relative_pos:
+        for i, dim in enumerate([wf, hf]):
+            if not isinstance(pos[i], str):
+                pos[i] = dim * pos[i]
+    if isinstance(pos[0], str):
+        pos[0] = {"left": 0, "center": (wf - wi) / 2, "right": wf - wi}[pos[0]]
+    if isinstance(pos[1], str):
+        pos[1] = {"top": 0, "center": (hf - hi) / 2, "bottom": hf - hi}[pos[1]]
+    return int(pos[0]), int(pos[1])
+
+def _blit_layer(buf: np.ndarray, clip, t: float):
+    ct = t - clip.start
+    img = clip.get_frame(ct)
+    mask = clip.mask.get_frame(ct) if clip.mask else None
+    if (img.ndim != buf.ndim or img.shape[2:] != buf.shape[2:]
+            or (mask is not None and mask.shape[:2] != img.shape[:2])):
+        # Caso raro (canais diferentes, máscara de outro tamanho): caminho original
+        out = clip.blit_on(buf, t)
+        if out is not buf:
+            np.copyto(buf, out, casting="unsafe")
+        return
+    h, w = buf.shape[:2]
+    blend_into(buf, img, _layer_position(clip, ct, (w, h), (img.shape[1], img.shape[0])), mask,
+               static_mask=mask is not None and is_static(clip.mask))
+
+def composite_make_frame(composite):
+    """make_frame de um CompositeVideoClip (não-máscara) usando um buffer próprio"""
+    state = {"buf": None}
+
+    def make_frame(t):
+        bg = composite.bg.get_frame(t)
+        buf = state["buf"]
+        if buf is None or buf.shape != bg.shape:
+            buf = state["buf"] = np.empty(bg.shape, dtype=np.uint8)
+        np.copyto(buf, bg, casting="unsafe")
+        for clip in composite.playing_clips(t):
+            _blit_layer(buf, clip, t)
+        return buf
+
+    return make_frame
+
+def write_frame_zero_copy(proc_stdin, frame: np.ndarray):
+    """Escreve o frame no pipe do FFmpeg sem tobytes() (cópia só se não for contíguo/uint8)"""
+    frame = np.ascontiguousarray(frame, dtype=np.uint8)
+    proc_stdin.write(memoryview(frame).cast("B"))
@@ -1,8 +1,6 @@
 # modules/highlighter.py
-import os, json, textwrap
-from dotenv import load_dotenv
+import json, textwrap
 from modules.llm_utils import call_llm, save_error_log
-load_dotenv()
 
 SYSTEM_MSG = (
     "Você é um editor de cortes especializado em criar conteúdo viral para Shorts. "
@@ -21,24 +19,158 @@ def clean_json_response(content):
         content = content[:-3]
     return content.strip()
 
-def find_highlights(transcript: list, video_info: dict = None, n: int = 3):
-    joined = "\n".join(f"[{i}] {seg['text']}" for i, seg in enumerate(transcript))
-    
-    # Contexto do vídeo original
-    context_info = ""
-    if video_info:
-        context_info = f"""
-        CONTEXTO DO VÍDEO ORIGINAL:
-        - Título: {video_info.get('title', 'N/A')}
-        - Canal: {video_info.get('channel', 'N/A')}
-        - Duração: {video_info.get('duration', 0) // 60}min
-        - Tags originais: {', '.join(video_info.get('tags', [])[:5])}
-        """
-    
-    prompt = textwrap.dedent(f"""
-{context_info}
+# Schema do structured output: a raiz precisa ser um objeto no modo strict
+HIGHLIGHT_ITEM_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "idx": {"type": "integer"},
+        "hook": {"type": "string"},
+        "tags": {"type": "array", "items": {"type": "string"}},
+        "description": {"type": "string"},
+        "question": {"type": "string"},
+    },
+    "required": ["idx", "hook", "tags", "description", "question"],
+    "additionalProperties": False,
+}
+
+HIGHLIGHTS_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "highlights",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "highlights": {"type": "array", "items": HIGHLIGHT_ITEM_SCHEMA},
+            },
+            "required": ["highlights"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+def recover_partial_json(content: str) -> list:
+    """
+    Recupera os objetos de highlight completos de uma resposta truncada ou malformada.
+    Percorre o texto contando chaves (ignorando as que estão dentro de strings) e
+    tenta decodificar cada objeto fechado que contenha "idx".
+    """
+    items = []
+    starts = []
+    in_string = False
+    escaped = False
+    for i, ch in enumerate(content):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch == "{":
+            starts.append(i)
+        elif ch == "}" and starts:
+            start = starts.pop()
+            try:
+                obj = json.loads(content[start:i + 1])
+            except ValueError:
+                continue
+            if isinstance(obj, dict) and "idx" in obj:
+                items.append(obj)
+    return items
+
+def validate_highlights(items: list, n_segments: int) -> tuple:
+    """
+    Valida e normaliza os highlights localmente.
+
+    Exige `idx` inteiro dentro dos limites da transcrição e `hook` não vazio;
+    corrige campos secundários (tags como string, hashtags, descrição/pergunta
+    ausentes) e descarta idx repetidos.
+
+    Returns:
+        tuple: (highlights válidos, lista de erros encontrados)
+    """
+    valid = []
+    errors = []
+    seen = set()
+    for pos, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors.append(f"item {pos}: não é um objeto")
+            continue
+        try:
+            idx = int(item.get("idx"))
+        except (TypeError, ValueError):
+            errors.append(f"item {pos}: idx inválido ({item.get('idx')!r})")
+            continue
+        if not 0 <= idx < n_segments:
+            errors.append(f"item {pos}: idx {idx} fora do intervalo 0..{n_segments - 1}")
+            continue
+        if idx in seen:
+            errors.append(f"item {pos}: idx {idx} repetido")
+            continue
+        hook = str(item.get("hook") or "").strip()
+        if not hook:
+            errors.append(f"item {pos}: hook ausente")
+            continue
+
+        tags = item.get("tags") or []
+        if isinstance(tags, str):
+            tags = tags.split(",")
+        tags = [str(t).strip().lstrip("#") for t in tags if str(t).strip().lstrip("#")]
+
+        seen.add(idx)
+        valid.append({
+            **item,
+            "idx": idx,
+            "hook": hook,
+            "tags": tags,
+            "description": item.get("description") or hook,
+            "question": item.get("question") or "",
+        })
+    return valid, errors
+
+def _decode_highlights(content: str) -> list:
+    """Decodifica a resposta (lista, objeto único ou {"highlights": [...]})"""
+    content = clean_json_response(content)
+    try:
+        parsed = json.loads(content)
+    except ValueError:
+        return recover_partial_json(content)
+
+    if isinstance(parsed, dict):
+        # Structured output embrulha a lista; objeto único vira lista
+        parsed = parsed["highlights"] if isinstance(parsed.get("highlights"), list) else [parsed]
+    if not isinstance(parsed, list):
+        raise ValueError(f"Formato inesperado: {type(parsed)}")
+    return parsed
+
+def _rejects_response_format(error) -> bool:
+    """BadRequestError da API recusando o parâmetro response_format (modelo sem structured output)"""
+    param = str(getattr(error, "param", None) or "")
+    code = str(getattr(error, "code", None) or "")
+    return param.startswith("response_format") or code == "response_format"
+
+def _call_highlighter(messages: list):
+    """Chama a LLM com structured output; repete sem schema se o modelo não suportar"""
+    from openai import BadRequestError
+    try:
+        response = call_llm(role="highlighter", messages=messages, response_format=HIGHLIGHTS_RESPONSE_FORMAT)
+    except BadRequestError as e:
+        if not _rejects_response_format(e):
+            raise
+        print(f"⚠️ Modelo sem suporte a structured output ({e.code or e.param}), repetindo sem schema...")
+        return call_llm(role="highlighter", messages=messages)
+    print("🧩 Highlights via structured output (json_schema)")
+    return response
 
-Escolha os {n} segmentos mais virais/de impacto com o objetivo de criar um vídeo viral e que possa gerar engajamento, com o objetivo de gerar mais visualizações, curtidas e comentários.
+# Instruções estáticas: ficam no início do prompt (junto ao system) para que o
+# prefixo seja idêntico entre episódios e re-execuções e aproveite o cache de
+# prompt do provedor. Tudo que varia (contexto, transcrição, n) vem depois.
+INSTRUCTIONS_MSG = textwrap.dedent("""
+Escolha os segmentos mais virais/de impacto com o objetivo de criar um vídeo viral e que possa gerar engajamento, com o objetivo de gerar mais visualizações, curtidas e comentários.
 
 INSTRUÇÕES:
 1. Considere o título e canal do vídeo original para criar títulos contextuais e chamativos;
@@ -50,39 +182,104 @@ INSTRUÇÕES:
 6. O trecho, além de viral, deve ser relevante no vídeo original e ter a intenção de gerar o CTA (Call to Action) para o usuário comentar, curtir, compartilhar, etc.
 7. Para cada highlight, além do título, tags e descrição, crie uma pergunta curta e chamativa que seja relevante para o trecho e que possa gerar engajamento.
 
-Responda APENAS com JSON: [{{"idx": <int>, "hook": "<título chamativo e contextual>", "tags": ["<tag1>", "<tag2>", ...], "description": "<descrição do trecho selecionado>", "question": "<pergunta curta e chamativa>"}}]
+Responda APENAS com JSON: {"highlights": [{"idx": <int>, "hook": "<título chamativo e contextual>", "tags": ["<tag1>", "<tag2>", ...], "description": "<descrição do trecho selecionado>", "question": "<pergunta curta e chamativa>"}]}
+""").strip()
+
+def build_highlight_messages(transcript: list, video_info: dict = None, n: int = 3) -> list:
+    """
+    Monta as mensagens de chat usadas para selecionar os highlights.
+
+    Ordem estável para cache de prefixo: system + instruções (estáticos),
+    contexto do vídeo, transcrição e, por último, a quantidade pedida.
+    """
+    joined = "\n".join(f"[{i}] {seg['text']}" for i, seg in enumerate(transcript))
+    
+    # Contexto do vídeo original
+    context_info = ""
+    if video_info:
+        context_info = textwrap.dedent(f"""
+        CONTEXTO DO VÍDEO ORIGINAL:
+        - Título: {video_info.get('title', 'N/A')}
+        - Canal: {video_info.get('channel', 'N/A')}
+        - Duração: {(video_info.get('duration') or 0) // 60}min
+        - Tags originais: {', '.join((video_info.get('tags') or [])[:5])}
+        """).strip()
+    
+    prompt = f"""{context_info}
 
 Transcrição:
 {joined}
-    """)
+
+Escolha exatamente {n} segmento(s)."""
     
-    response = call_llm(
-        role="highlighter",
-        messages=[
-            {"role": "system", "content": SYSTEM_MSG},
-            {"role": "user", "content": prompt}
-        ]
-    )
-    content = getattr(response.choices[0].message, "content", "").strip()
-    if not content:
-        save_error_log("Resposta vazia da LLM na etapa highlighter.", None)
-        raise RuntimeError("A LLM retornou uma resposta vazia na etapa de seleção de cortes.")
-    content = clean_json_response(content)
+    return [
+        {"role": "system", "content": f"{SYSTEM_MSG}\n\n{INSTRUCTIONS_MSG}"},
+        {"role": "user", "content": prompt}
+    ]
+
+def parse_highlights(content: str, transcript: list, n: int = 3, messages: list = None) -> list:
+    """
+    Converte a resposta da LLM em lista de highlights validados.
+
+    Respostas truncadas são recuperadas parcialmente; se faltarem itens e
+    `messages` for informado, faz um único prompt curto pedindo só os faltantes
+    em vez de descartar o episódio.
+    """
+    content = (content or "").strip()
     try:
-        parsed = json.loads(content)
-        
-        # Garante que sempre retorne uma lista
-        if isinstance(parsed, dict):
-            # Se retornou um objeto único, converte para lista
-            parsed = [parsed]
-        elif isinstance(parsed, list):
-            # Se já é uma lista, mantém como está
-            pass
-        else:
-            # Se não é nem dict nem list, erro
-            raise ValueError(f"Formato inesperado: {type(parsed)}")
-        
-        return parsed
+        items = _decode_highlights(content) if content else []
     except Exception as e:
         save_error_log(f"Resposta bruta da LLM:\n{content}\nErro: {e}", None)
-        raise RuntimeError(f"Erro ao decodificar JSON da LLM. Veja logs/erros.log para detalhes.")
\ No newline at end of file
+        items = []
+
+    valid, errors = validate_highlights(items, len(transcript))
+    if errors:
+        save_error_log(f"Highlights inválidos descartados: {errors}\nResposta bruta da LLM:\n{content}", None)
+
+    missing = n - len(valid)
+    if missing > 0 and messages:
+        print(f"🔧 Resposta incompleta ({len(valid)}/{n} highlights), pedindo apenas os {missing} faltantes...")
+        used = [h["idx"] for h in valid]
+        repair_messages = messages + [
+            {"role": "assistant", "content": content or "[]"},
+            {"role": "user", "content": (
+                f"A resposta anterior veio incompleta ou inválida. Envie APENAS {missing} highlight(s) "
+                f"adicional(is), no mesmo formato JSON, com idx entre 0 e {len(transcript) - 1} "
+                f"e diferentes de {used}."
+            )},
+        ]
+        try:
+            response = _call_highlighter(repair_messages)
+            repair_content = getattr(response.choices[0].message, "content", "") or ""
+            extra, extra_errors = validate_highlights(
+                valid + _decode_highlights(repair_content), len(transcript)
+            )
+            valid = extra[:n]
+            if extra_errors:
+                save_error_log(f"Highlights inválidos no reparo: {extra_errors}", None)
+        except Exception as e:
+            save_error_log(f"Falha no reparo de highlights: {e}", None)
+
+    if not valid:
+        if not content:
+            save_error_log("Resposta vazia da LLM na etapa highlighter.", None)
+            raise RuntimeError("A LLM retornou uma resposta vazia na etapa de seleção de cortes.")
+        raise RuntimeError(f"Erro ao decodificar JSON da LLM. Veja logs/erros.log para detalhes.")
+    return valid
+
+def find_highlights(transcript: list, video_info: dict = None, n: int = 3, batch=None, custom_id: str = None):
+    """
+    Seleciona os highlights do episódio.
+
+    Se `batch` (LLMBatch) for informado, a requisição é apenas enfileirada no lote
+    e a função retorna o custom_id; o resultado deve ser lido depois com
+    `parse_highlights`.
+    """
+    messages = build_highlight_messages(transcript, video_info, n)
+    if batch is not None:
+        return call_llm(role="highlighter", messages=messages, response_format=HIGHLIGHTS_RESPONSE_FORMAT,
+                        batch=batch, custom_id=custom_id)
+
+    response = _call_highlighter(messages)
+    content = getattr(response.choices[0].message, "content", "") or ""
+    return parse_highlights(content, transcript, n, messages)
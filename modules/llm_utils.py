@@ -1,42 +1,47 @@
 import os
 import json
-import yaml
-import requests
-from openai import OpenAI
-from dotenv import load_dotenv
+import time
+import threading
 from datetime import datetime
+from pathlib import Path
+from modules.config import CONFIG
 
-load_dotenv()
+# Nada pesado é importado ou criado no import do módulo: openai, requests e
+# dotenv são carregados na primeira chamada e o diretório de logs só é criado
+# na primeira escrita.
 
 LOG_DIR = "logs"
-COST_LOG = os.path.join(LOG_DIR, "custos.log")
+# Log de custos append-only em JSON lines (custos.log antigo, em YAML, fica como histórico)
+COST_LOG = os.path.join(LOG_DIR, "custos.jsonl")
+RATE_CACHE = os.path.join(LOG_DIR, "usd_brl.json")
+RATE_URL = "https://api.exchangerate.host/latest?base=USD&symbols=BRL"
+RATE_TIMEOUT = 3  # segundos
+DEFAULT_USD_BRL = 5.0
 ERROR_LOG = os.path.join(LOG_DIR, "erros.log")
-os.makedirs(LOG_DIR, exist_ok=True)
 
-# Carrega configuração (JSON ou YAML como fallback)
-def load_config():
-    try:
-        # Tenta carregar JSON primeiro
-        with open("config.json", "r", encoding="utf-8") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        # Fallback para YAML (compatibilidade)
-        try:
-            with open("config.yaml", "r", encoding="utf-8") as f:
-                return yaml.safe_load(f)
-        except FileNotFoundError:
-            raise FileNotFoundError("Nenhum arquivo de configuração encontrado (config.json ou config.yaml)")
+_env_loaded = False
 
-# Carrega configuração global
-CONFIG = load_config()
+def _load_env():
+    """Carrega o .env uma única vez, na primeira necessidade"""
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _env_loaded = True
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+def _ensure_log_dir():
+    os.makedirs(LOG_DIR, exist_ok=True)
 
-# Tabela de preços OpenAI (USD por 1k tokens)
+# Desconto aplicado pela OpenAI em requisições processadas via Batch API
+BATCH_DISCOUNT = 0.5
+
+# Tabela de preços OpenAI (USD por token)
+# "cached_input" é o preço dos tokens de entrada servidos do cache de prompt;
+# modelos sem essa chave cobram o preço cheio de entrada.
 # Atualize conforme necessário
 OPENAI_PRICES = {
-    "gpt-4o": {"input": 5.0/1_000_000, "output": 15.0/1_000_000},
-    "o3": {"input": 0.15/1_000_000, "output": 0.6/1_000_000},  # GPT-4o-mini
+    "gpt-4o": {"input": 5.0/1_000_000, "cached_input": 2.5/1_000_000, "output": 15.0/1_000_000},
+    "o3": {"input": 0.15/1_000_000, "cached_input": 0.075/1_000_000, "output": 0.6/1_000_000},  # GPT-4o-mini
     "gpt-4-turbo": {"input": 10.0/1_000_000, "output": 30.0/1_000_000},
     "gpt-4": {"input": 30.0/1_000_000, "output": 60.0/1_000_000},
     "gpt-3.5-turbo": {"input": 0.5/1_000_000, "output": 1.5/1_000_000},
@@ -47,17 +52,75 @@ OPENAI_PRICES = {
 # Armazena estatísticas de uso
 LLM_STATS = {}
 
-# Função para buscar cotação do dólar (exchangerate.host)
-def get_usd_brl():
+_rate_thread = None
+
+def _read_rate_cache():
     try:
-        resp = requests.get("https://api.exchangerate.host/latest?base=USD&symbols=BRL")
-        return resp.json()["rates"]["BRL"]
+        with open(RATE_CACHE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _today() -> str:
+    return datetime.now().strftime("%Y-%m-%d")
+
+def _write_rate_cache(cache: dict):
+    _ensure_log_dir()
+    tmp_path = f"{RATE_CACHE}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(cache, f)
+    os.replace(tmp_path, RATE_CACHE)
+
+def _fetch_usd_brl():
+    """
+    Busca a cotação (timeout curto) e grava no cache local. Falhas ficam
+    registradas em `last_attempt` e a última cotação conhecida é mantida.
+    """
+    cache = _read_rate_cache()
+    try:
+        import requests
+        resp = requests.get(RATE_URL, timeout=RATE_TIMEOUT)
+        rate = resp.json()["rates"]["BRL"]
     except Exception:
+        cache["last_attempt"] = {"date": _today(), "failed": True}
+    else:
+        cache.update({"rate": rate, "date": _today(), "last_attempt": {"date": _today(), "failed": False}})
+    try:
+        _write_rate_cache(cache)
+    except OSError:
+        pass
+
+def prefetch_usd_brl():
+    """
+    Atualiza a cotação em background no máximo uma vez por dia (mesmo que a
+    tentativa do dia tenha falhado, ex.: offline).
+    Chamado no início dos scripts para que o valor esteja pronto no relatório final.
+    """
+    global _rate_thread
+    cache = _read_rate_cache()
+    if cache.get("date") == _today() or cache.get("last_attempt", {}).get("date") == _today():
         return None
+    if _rate_thread is None or not _rate_thread.is_alive():
+        # Daemon: a saída do processo não espera pela rede
+        _rate_thread = threading.Thread(target=_fetch_usd_brl, name="usd-brl", daemon=True)
+        _rate_thread.start()
+    return _rate_thread
+
+# Função para buscar cotação do dólar (exchangerate.host) com cache diário
+def get_usd_brl(wait: float = 0.5):
+    """
+    Retorna a cotação USD→BRL do cache local (última conhecida se offline).
+    Se o cache não é de hoje, dispara a atualização em background e espera no
+    máximo `wait` segundos por ela.
+    """
+    thread = prefetch_usd_brl()
+    if thread is not None and wait:
+        thread.join(wait)
+    return _read_rate_cache().get("rate")
 
 # Função para salvar log de custos por episódio
 def save_cost_log(episode_url=None):
-    usd_brl = get_usd_brl() or 5.0
+    usd_brl = get_usd_brl() or DEFAULT_USD_BRL
     now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     total_usd = sum(s["usd"] for s in LLM_STATS.values())
     total_brl = total_usd * usd_brl
@@ -69,17 +132,60 @@ def save_cost_log(episode_url=None):
         "total_brl": total_brl,
         "etapas": LLM_STATS.copy()
     }
+    _ensure_log_dir()
     with open(COST_LOG, "a", encoding="utf-8") as f:
-        f.write(yaml.dump([log], allow_unicode=True))
+        f.write(json.dumps(log, ensure_ascii=False) + "\n")
 
 # Função para salvar log de erro
 def save_error_log(error, episode_url=None):
     now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    _ensure_log_dir()
     with open(ERROR_LOG, "a", encoding="utf-8") as f:
         f.write(f"[{now}] Episódio: {episode_url}\n{error}\n{'-'*60}\n")
 
+def get_model_for_role(role):
+    """Retorna o modelo configurado para a etapa (fallback para gpt-4o)"""
+    system_config = CONFIG.get("system_configuration", {})
+    openai_models = system_config.get("openai_models", {})
+    return openai_models.get(role, "gpt-4o")
+
+def get_openai_client():
+    """
+    Cria o cliente OpenAI. OPENAI_BASE_URL permite apontar para um endpoint
+    compatível (ex: servidor fake local de batch).
+    """
+    _load_env()
+    from openai import OpenAI
+    return OpenAI(api_key=os.getenv("OPENAI_API_KEY"), base_url=os.getenv("OPENAI_BASE_URL"))
+
+def _get_stats(role):
+    return LLM_STATS.setdefault(role, {"input": 0, "output": 0, "cache": 0, "usd": 0, "calls": 0})
+
+def _record_chat_usage(role, model, input_tokens, output_tokens, cached_tokens=0, discount=1.0):
+    """Contabiliza tokens e custo de uma chamada de chat (tokens em cache têm preço próprio)"""
+    prices = OPENAI_PRICES[model]
+    stats = _get_stats(role)
+    stats["input"] += input_tokens
+    stats["output"] += output_tokens
+    stats["cache"] += cached_tokens
+    stats["usd"] += (
+        (input_tokens - cached_tokens) * prices["input"] +
+        cached_tokens * prices.get("cached_input", prices["input"]) +
+        output_tokens * prices["output"]
+    ) * discount
+    stats["calls"] += 1
+
+def _cached_tokens(usage):
+    """Lê usage.prompt_tokens_details.cached_tokens (objeto da SDK ou dict do batch)"""
+    if isinstance(usage, dict):
+        details = usage.get("prompt_tokens_details") or {}
+        return details.get("cached_tokens") or 0
+    details = getattr(usage, "prompt_tokens_details", None)
+    return getattr(details, "cached_tokens", 0) or 0
+
 # Função centralizada para chamada de LLM
-def call_llm(role, messages=None, prompt=None, image=False, n=1, size=None, quality=None, response_format=None):
+def call_llm(role, messages=None, prompt=None, image=False, n=1, size=None, quality=None, response_format=None,
+             batch=None, custom_id=None):
     """
     role: etapa do pipeline (ex: 'highlighter', 'editor', 'thumbnail')
     messages: lista de mensagens para chat/completion
@@ -87,14 +193,19 @@ def call_llm(role, messages=None, prompt=None, image=False, n=1, size=None, qual
     image: se True, gera imagem
     n, size, quality: parâmetros para imagem
     response_format: formato de resposta esperado (ex: {"type": "json_object"})
+    batch: LLMBatch opcional; se informado, a requisição é apenas enfileirada (modo diferido)
+           e a função retorna o custom_id em vez da resposta
+    custom_id: identificador da requisição dentro do lote
     """
-    # Obtém modelo da configuração do sistema
-    system_config = CONFIG.get("system_configuration", {})
-    openai_models = system_config.get("openai_models", {})
-    model = openai_models.get(role, "gpt-4o")  # Fallback para gpt-4o
-    
-    client = OpenAI(api_key=OPENAI_API_KEY)
-    stats = LLM_STATS.setdefault(role, {"input": 0, "output": 0, "cache": 0, "usd": 0, "calls": 0})
+    model = get_model_for_role(role)
+
+    if batch is not None:
+        if image:
+            raise ValueError("Geração de imagem não é suportada no modo batch")
+        return batch.add(custom_id, role, messages, response_format=response_format)
+
+    client = get_openai_client()
+    stats = _get_stats(role)
     result = None
     if image:
         # Geração de imagem
@@ -106,6 +217,7 @@ def call_llm(role, messages=None, prompt=None, image=False, n=1, size=None, qual
             quality=quality or "standard"
         )
         stats["usd"] += OPENAI_PRICES[model]["image"] * n
+        stats["calls"] += 1
         result = response
     else:
         # Chat/completion
@@ -118,26 +230,226 @@ def call_llm(role, messages=None, prompt=None, image=False, n=1, size=None, qual
             
         response = client.chat.completions.create(**kwargs)
         usage = response.usage
-        input_tokens = usage.prompt_tokens
-        output_tokens = usage.completion_tokens
-        stats["input"] += input_tokens
-        stats["output"] += output_tokens
-        stats["usd"] += (
-            input_tokens * OPENAI_PRICES[model]["input"] +
-            output_tokens * OPENAI_PRICES[model]["output"]
-        )
+        _record_chat_usage(role, model, usage.prompt_tokens, usage.completion_tokens, _cached_tokens(usage))
         result = response
-    stats["calls"] += 1
     return result
 
+class LLMBatch:
+    """
+    Lote de requisições de chat para a Batch API da OpenAI.
+
+    As requisições de vários episódios são gravadas em um arquivo JSONL e
+    enviadas como um único job. O estado (id do lote, papéis e dados extras de
+    cada requisição) fica em memória enquanto o lote é montado e só é gravado
+    uma vez, em um arquivo JSON ao lado do JSONL, quando o job é criado,
+    permitindo retomar o polling após uma interrupção. Um lote interrompido
+    antes do envio não tem como ser retomado (os extras nunca foram gravados)
+    e é descartado por discard_unsubmitted().
+
+    Depois do envio, o estado também registra as respostas já coletadas (o
+    custo de cada uma entra no log uma única vez) e as requisições já
+    consumidas pelo pipeline (mark_consumed), para que um lote retomado só
+    processe o que faltou.
+    """
+
+    ENDPOINT = "/v1/chat/completions"
+
+    def __init__(self, batch_dir: str = "batches", name: str = None):
+        self.batch_dir = Path(batch_dir)
+        self.name = name or datetime.now().strftime("batch_%Y%m%d_%H%M%S")
+        self.requests_path = self.batch_dir / f"{self.name}.jsonl"
+        self.state_path = self.batch_dir / f"{self.name}.json"
+        self.batch_id = None
+        self.submitted_at = None
+        self.entries = {}  # custom_id -> {"role", "model", "extra"}
+        self.collected = []  # custom_ids com custo já registrado
+        self.consumed = []  # custom_ids já processados pelo pipeline
+
+    def add(self, custom_id: str, role: str, messages: list, response_format=None, extra: dict = None) -> str:
+        """Enfileira uma requisição de chat no arquivo JSONL do lote"""
+        if self.batch_id:
+            raise RuntimeError("Lote já enviado; crie um novo LLMBatch para novas requisições")
+        custom_id = custom_id or f"req-{len(self.entries)}"
+        if custom_id in self.entries:
+            raise ValueError(f"custom_id duplicado no lote: {custom_id}")
+        model = get_model_for_role(role)
+        body = {"model": model, "messages": messages}
+        if response_format:
+            body["response_format"] = response_format
+        line = {"custom_id": custom_id, "method": "POST", "url": self.ENDPOINT, "body": body}
+
+        self.batch_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.requests_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(line, ensure_ascii=False) + "\n")
+        self.entries[custom_id] = {"role": role, "model": model, "extra": extra or {}}
+        return custom_id
+
+    def set_extra(self, custom_id: str, extra: dict):
+        """Anexa dados do pipeline (ex: caminho do vídeo) a uma requisição (gravados no envio)"""
+        self.entries[custom_id]["extra"] = extra
+
+    def save_state(self):
+        state = {
+            "name": self.name,
+            "batch_id": self.batch_id,
+            "submitted_at": self.submitted_at,
+            "requests_path": str(self.requests_path),
+            "entries": self.entries,
+            "collected": self.collected,
+            "consumed": self.consumed,
+        }
+        self.batch_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.state_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, state_path: str) -> "LLMBatch":
+        """Recarrega um lote a partir do arquivo de estado"""
+        state_path = Path(state_path)
+        with open(state_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        batch = cls(str(state_path.parent), state["name"])
+        batch.batch_id = state.get("batch_id")
+        batch.submitted_at = state.get("submitted_at")
+        batch.entries = state.get("entries", {})
+        batch.collected = state.get("collected", [])
+        batch.consumed = state.get("consumed", [])
+        return batch
+
+    @classmethod
+    def find_pending(cls, batch_dir: str = "batches") -> "LLMBatch":
+        """Retorna o lote enviado mais recente ainda não concluído, se houver"""
+        batch_dir = Path(batch_dir)
+        if not batch_dir.exists():
+            return None
+        for state_path in sorted(batch_dir.glob("*.json"), reverse=True):
+            try:
+                batch = cls.load(state_path)
+            except Exception:
+                continue
+            if batch.batch_id:
+                return batch
+        return None
+
+    @classmethod
+    def discard_unsubmitted(cls, batch_dir: str = "batches") -> int:
+        """
+        Remove lotes montados mas nunca enviados (JSONL sem estado com batch_id),
+        restos de um processo interrompido durante a preparação.
+
+        Returns:
+            int: quantos lotes foram descartados
+        """
+        batch_dir = Path(batch_dir)
+        if not batch_dir.exists():
+            return 0
+        discarded = 0
+        for requests_path in sorted(batch_dir.glob("*.jsonl")):
+            state_path = requests_path.with_suffix(".json")
+            try:
+                submitted = state_path.exists() and cls.load(state_path).batch_id
+            except Exception:
+                submitted = False
+            if submitted:
+                continue
+            print(f"🗑️ Descartando lote não enviado: {requests_path.name}")
+            cls(str(batch_dir), requests_path.stem).close()
+            discarded += 1
+        return discarded
+
+    def submit(self) -> str:
+        """Envia o arquivo JSONL e cria o job de batch"""
+        if not self.entries:
+            raise RuntimeError("Lote vazio: nenhuma requisição para enviar")
+        client = get_openai_client()
+        with open(self.requests_path, "rb") as f:
+            input_file = client.files.create(file=f, purpose="batch")
+        job = client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=self.ENDPOINT,
+            completion_window="24h",
+        )
+        self.batch_id = job.id
+        self.submitted_at = datetime.now().isoformat(timespec="seconds")
+        self.save_state()
+        print(f"📦 Lote enviado: {self.batch_id} ({len(self.entries)} requisições)")
+        return self.batch_id
+
+    def wait(self, poll_interval: int = 60, timeout: int = 24 * 3600) -> dict:
+        """
+        Faz polling até o lote terminar e retorna {custom_id: conteúdo da resposta}.
+        Requisições com erro ficam com valor None e são registradas em logs/erros.log.
+        """
+        client = get_openai_client()
+        deadline = time.monotonic() + timeout
+        while True:
+            job = client.batches.retrieve(self.batch_id)
+            if job.status == "completed":
+                break
+            if job.status in ("failed", "expired", "cancelled"):
+                raise RuntimeError(f"Lote {self.batch_id} terminou com status '{job.status}'")
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"Lote {self.batch_id} não concluiu em {timeout}s")
+            print(f"⏳ Lote {self.batch_id}: {job.status}, aguardando {poll_interval}s...")
+            time.sleep(poll_interval)
+
+        results = {custom_id: None for custom_id in self.entries}
+        for file_id in (job.output_file_id, job.error_file_id):
+            if not file_id:
+                continue
+            raw = client.files.content(file_id).text
+            for line in raw.splitlines():
+                if line.strip():
+                    self._collect_result(json.loads(line), results)
+        collected = [custom_id for custom_id in self.entries if custom_id not in self.collected]
+        if collected:
+            self.collected += collected
+            self.save_state()
+        return results
+
+    def _collect_result(self, item: dict, results: dict):
+        custom_id = item.get("custom_id")
+        entry = self.entries.get(custom_id)
+        if entry is None:
+            return
+        first_time = custom_id not in self.collected
+        response = item.get("response") or {}
+        body = response.get("body") or {}
+        if item.get("error") or response.get("status_code") != 200:
+            if first_time:
+                save_error_log(f"Erro no lote {self.batch_id} ({custom_id}): {item.get('error') or body}", None)
+            return
+        if first_time:
+            usage = body.get("usage") or {}
+            _record_chat_usage(
+                entry["role"], entry["model"],
+                usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0),
+                _cached_tokens(usage), discount=BATCH_DISCOUNT,
+            )
+        results[custom_id] = body["choices"][0]["message"].get("content") or ""
+
+    def mark_consumed(self, custom_id: str):
+        """Registra que o pipeline terminou de processar a resposta (não é refeita ao retomar)"""
+        if custom_id not in self.consumed:
+            self.consumed.append(custom_id)
+            self.save_state()
+
+    def close(self):
+        """Remove os arquivos do lote após o processamento"""
+        for path in (self.requests_path, self.state_path):
+            if path.exists():
+                path.unlink()
+
 # Função para exibir relatório final
 def print_llm_report():
-    usd_brl = get_usd_brl() or 5.0
+    usd_brl = get_usd_brl() or DEFAULT_USD_BRL
     print("\n===== RELATÓRIO DE USO DE LLM =====")
     total_usd = 0
     for etapa, s in LLM_STATS.items():
         print(f"\nEtapa: {etapa}")
         print(f"  Tokens de entrada: {s['input']}")
+        if s["input"]:
+            print(f"  Tokens de entrada em cache: {s['cache']} ({s['cache'] / s['input']:.0%})")
         print(f"  Tokens de saída: {s['output']}")
         print(f"  Chamadas: {s['calls']}")
         print(f"  Custo em dólar: US$ {s['usd']:.4f}")
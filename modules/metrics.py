@@ -0,0 +1,179 @@
+# modules/metrics.py
+"""
+Métricas no formato de exposição de texto do Prometheus, sem dependências externas.
+
+Contadores e histogramas são alimentados pelos spans de modules.tracing
+(latência por etapa, fator de tempo real do ASR, fps do encode, bytes/s do
+upload) e pelo LLM_STATS (tokens e custo, lidos no momento da coleta).
+
+Uso em worker de longa duração:
+    from modules import metrics
+    metrics.start_metrics_server(9108)   # GET http://127.0.0.1:9108/metrics
+"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from modules import tracing
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+PREFIX = "podcast_cuts_"
+
+# Buckets em segundos: de chamadas rápidas de LLM até transcrições longas
+LATENCY_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+RATIO_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 4)
+FPS_BUCKETS = (5, 10, 20, 30, 45, 60, 90, 120, 240)
+BYTES_PER_SECOND_BUCKETS = (1e5, 5e5, 1e6, 2.5e6, 5e6, 1e7, 2.5e7, 5e7)
+
+_lock = threading.Lock()
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class Counter:
+    """Contador monotônico com labels"""
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = PREFIX + name
+        self.help = help_text
+        self._values = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with _lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+class Gauge(Counter):
+    """Valor instantâneo (ex: profundidade de fila)"""
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with _lock:
+            self._values[tuple(sorted(labels.items()))] = value
+
+class Histogram:
+    """Histograma cumulativo com buckets fixos"""
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: tuple = LATENCY_BUCKETS):
+        self.name = PREFIX + name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._values = {}  # labels -> [contagens por bucket, soma, total]
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with _lock:
+            counts, total = self._values.setdefault(key, ([0] * len(self.buckets), [0.0, 0]))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            total[0] += value
+            total[1] += 1
+
+    def samples(self):
+        out = []
+        with _lock:
+            for key, (counts, total) in self._values.items():
+                for bound, count in zip(self.buckets, counts):
+                    out.append((f"{self.name}_bucket", key + (("le", _format_value(bound)),), count))
+                out.append((f"{self.name}_sum", key, total[0]))
+                out.append((f"{self.name}_count", key, total[1]))
+        return out
+
+EPISODES = Counter("episodes_total", "Episódios processados, por status")
+CLIPS = Counter("clips_total", "Cortes renderizados")
+STAGE_SECONDS = Histogram("stage_seconds", "Latência de cada etapa do pipeline (spans do tracing)")
+ASR_REALTIME_FACTOR = Histogram("asr_realtime_factor", "Tempo de transcrição / duração do áudio", RATIO_BUCKETS)
+ENCODE_FPS = Histogram("encode_fps", "Frames codificados por segundo no make_clip", FPS_BUCKETS)
+UPLOAD_BYTES = Counter("upload_bytes_total", "Bytes enviados ao YouTube")
+UPLOAD_BYTES_PER_SECOND = Histogram("upload_bytes_per_second", "Vazão de cada upload", BYTES_PER_SECOND_BUCKETS)
+QUEUE_DEPTH = Gauge("queue_depth", "Itens aguardando em cada fila")
+
+REGISTRY = [EPISODES, CLIPS, STAGE_SECONDS, ASR_REALTIME_FACTOR, ENCODE_FPS,
+            UPLOAD_BYTES, UPLOAD_BYTES_PER_SECOND, QUEUE_DEPTH]
+
+def _on_span(span: dict):
+    """Converte spans do tracing em observações"""
+    name = span["name"]
+    wall = span["wall"]
+    attrs = span.get("attrs") or {}
+    STAGE_SECONDS.observe(wall, stage=name)
+    if name == "asr" and attrs.get("media_seconds"):
+        ASR_REALTIME_FACTOR.observe(wall / attrs["media_seconds"], model=attrs.get("model", ""))
+    elif name == "make_clip.encode" and attrs.get("frames") and wall > 0:
+        ENCODE_FPS.observe(attrs["frames"] / wall)
+    elif name == "make_clip":
+        CLIPS.inc()
+    elif name == "upload" and attrs.get("bytes"):
+        UPLOAD_BYTES.inc(attrs["bytes"])
+        if wall > 0:
+            UPLOAD_BYTES_PER_SECOND.observe(attrs["bytes"] / wall)
+
+tracing.add_listener(_on_span)
+
+def _llm_samples():
+    """Tokens, chamadas e custo por papel, lidos do LLM_STATS no momento da coleta"""
+    from modules.llm_utils import LLM_STATS
+    families = {
+        "llm_tokens_total": ("counter", "Tokens consumidos pela LLM", []),
+        "llm_calls_total": ("counter", "Chamadas à LLM", []),
+        "llm_cost_usd_total": ("counter", "Custo estimado da LLM em USD", []),
+    }
+    for role, stats in list(LLM_STATS.items()):
+        for kind in ("input", "output", "cache"):
+            families["llm_tokens_total"][2].append(((("kind", kind), ("role", role)), stats.get(kind, 0)))
+        families["llm_calls_total"][2].append(((("role", role),), stats.get("calls", 0)))
+        families["llm_cost_usd_total"][2].append(((("role", role),), stats.get("usd", 0)))
+    return families
+
+def render() -> str:
+    """Todas as métricas no formato de exposição de texto"""
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, labels, value in metric.samples():
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+    for short_name, (kind, help_text, samples) in _llm_samples().items():
+        name = PREFIX + short_name
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # não polui a saída do pipeline a cada coleta
+
+def start_metrics_server(port: int = 9108, host: str = "127.0.0.1"):
+    """Sobe o endpoint /metrics numa thread daemon e retorna o servidor"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    print(f"📈 Métricas disponíveis em http://{host}:{server.server_address[1]}/metrics")
+    return server
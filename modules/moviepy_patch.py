@@ -14,8 +14,10 @@ def patch_resize():
         else:
             # Para diminuir o tamanho, usa INTER_AREA para evitar aliasing
             interpolation = cv2.INTER_AREA
-        return cv2.resize(pic.astype('uint8'), (lx, ly),
-                         interpolation=interpolation)
+        # O fx resize já converte para uint8; evita uma segunda cópia
+        if pic.dtype != np.uint8:
+            pic = pic.astype('uint8')
+        return cv2.resize(pic, (lx, ly), interpolation=interpolation)
     
     resize.resizer = new_resizer
     resize.resizer.origin = "cv2"
@@ -56,9 +58,71 @@ def patch_moviepy_resources():
     
     atexit.register(cleanup_moviepy)
 
+# Patch do caminho de frames: resize em buffer, composite in-place, escrita sem cópia
+def patch_compositor():
+    """Troca as alocações por frame do MoviePy pelos buffers de frame_compositor"""
+    import moviepy.editor as mp
+    from moviepy.video.compositing.CompositeVideoClip import CompositeVideoClip
+    from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+    from .frame_compositor import ResizeInto, composite_make_frame, write_frame_zero_copy, mark_static
+
+    original_resize = mp.VideoClip.resize
+
+    def buffered_resize(clip, newsize=None, height=None, width=None, apply_to_mask=True):
+        # ImageClip redimensiona uma vez só; tamanhos em função do tempo e
+        # máscaras ficam no caminho original
+        dynamic = any(callable(v) for v in (newsize, height, width))
+        if isinstance(clip, mp.ImageClip) or clip.ismask or dynamic:
+            return original_resize(clip, newsize, height, width, apply_to_mask)
+        w, h = clip.size
+        if newsize is not None:
+            size = [newsize * w, newsize * h] if isinstance(newsize, (int, float)) else newsize
+        elif height is not None:
+            size = [w * height / h, height]
+        else:
+            size = [width, h * width / w]
+        newclip = clip.fl_image(ResizeInto(size))
+        if apply_to_mask and clip.mask is not None:
+            newclip.mask = original_resize(clip.mask, size, apply_to_mask=False)
+        return newclip
+
+    mp.VideoClip.resize = buffered_resize
+
+    # Máscaras de ImageClip/TextClip devolvem o mesmo array a cada frame:
+    # só elas entram no cache de alfa do compositor
+    original_image_init = mp.ImageClip.__init__
+
+    def image_init(self, *args, **kwargs):
+        original_image_init(self, *args, **kwargs)
+        if self.ismask:
+            mark_static(self)
+
+    mp.ImageClip.__init__ = image_init
+
+    original_init = CompositeVideoClip.__init__
+
+    def init_with_buffer(self, *args, **kwargs):
+        original_init(self, *args, **kwargs)
+        if not self.ismask:
+            self.make_frame = composite_make_frame(self)
+
+    CompositeVideoClip.__init__ = init_with_buffer
+
+    original_write_frame = FFMPEG_VideoWriter.write_frame
+
+    def write_frame(self, img_array):
+        try:
+            write_frame_zero_copy(self.proc.stdin, img_array)
+        except IOError:
+            # Caminho original monta a mensagem de erro com a saída do FFmpeg
+            original_write_frame(self, img_array)
+
+    FFMPEG_VideoWriter.write_frame = write_frame
+
 # Aplica todos os patches
 def apply_all_patches():
     """Aplica todos os patches do MoviePy"""
     patch_resize()
+    patch_compositor()
     patch_moviepy_resources()
     print("✅ Patches do MoviePy aplicados") 
\ No newline at end of file
@@ -7,7 +7,18 @@ import random
 import os
 from pathlib import Path
 import moviepy.editor as mp
-from .video_optimizer import create_optimized_write_params, create_fallback_params
+from .video_optimizer import profile_write_params, write_videofile_with_fallback, select_encoder_profile
+from .render_session import RenderSession
+from .outro_splice import splice_outro
+from .outro_assets import ASSETS, MUSIC_FPS
+from .audio_ducking import ENVELOPE_FPS, duck_music, nominal_duck_db, read_wav
+
+TRANSITION_DURATION = 1.0
+# Volume da música sob a fala típica; nas pausas ela sobe o equivalente à
+# redução nominal do compressor (~9 dB, ou seja ~0.14 contra os 0.05 fixos de antes)
+MUSIC_VOLUME = 0.05
+MUSIC_PAUSE_VOLUME = MUSIC_VOLUME / 10 ** (nominal_duck_db() / 20)
+BACKGROUND_MUSIC_PATH = Path("assets/fundo.mp3")
 
 class OutroAppender:
     def __init__(self, assets_dir: str = "assets/outros"):
@@ -16,22 +27,8 @@ class OutroAppender:
         self._load_outros()
     
     def _load_outros(self):
-        """Carrega os arquivos de outros disponíveis"""
-        if not self.assets_dir.exists():
-            print(f"⚠️  Diretório de outros não encontrado: {self.assets_dir}")
-            return
-        
-        # Procura por arquivos outro1.mp4, outro2.mp4, outro3.mp4
-        for i in range(1, 4):
-            outro_path = self.assets_dir / f"outro{i}.mp4"
-            if outro_path.exists():
-                self.outro_files.append(str(outro_path))
-        
-        if not self.outro_files:
-            print(f"⚠️  Nenhum arquivo de outro encontrado em {self.assets_dir}")
-            print("   Execute 'python generate_outros.py' para gerar os outros")
-        else:
-            print(f"✅ {len(self.outro_files)} outros carregados")
+        """Carrega os arquivos de outros disponíveis (do cache de processo)"""
+        self.outro_files = ASSETS.outro_files(self.assets_dir)
     
     def get_random_outro(self) -> str:
         """Retorna o caminho de um outro aleatório"""
@@ -63,102 +60,53 @@ class OutroAppender:
         outro_name = Path(outro_path).stem
         
         print(f"🎬 Anexando outro: {outro_name}")
-        
-        try:
-            # Carrega o vídeo principal
-            main_clip = mp.VideoFileClip(str(input_path))
-            
-            # Carrega o outro
-            outro_clip = mp.VideoFileClip(outro_path)
-            
-            # Cria transição de 1 segundo entre o corte e o outro
-            transition_duration = 1.0
-            
-            # Cria um fade out no final do vídeo principal (visual e áudio)
-            main_clip = main_clip.fadeout(transition_duration)
-            
-            # Cria um fade out no áudio do corte principal
-            if main_clip.audio:
-                main_clip = main_clip.set_audio(main_clip.audio.audio_fadeout(transition_duration))
-            
-            # Cria um fade in no início do outro (visual e áudio)
-            outro_clip = outro_clip.fadein(transition_duration)
-            
-            # Mantém o áudio do outro em volume total (sem fade in)
-            # O TTS deve manter o mesmo volume do áudio do vídeo
-            
-            # Concatena os vídeos com transição
-            final_clip = mp.concatenate_videoclips([main_clip, outro_clip])
-            
-            # Adiciona música de fundo com controle de volume dinâmico
-            background_music_path = Path("assets/fundo.mp3")
-            if background_music_path.exists():
-                print("🎵 Adicionando música de fundo com controle de volume...")
-                
-                # Carrega a música de fundo
-                background_music = mp.AudioFileClip(str(background_music_path))
-                
-                # Seleciona um trecho aleatório da música
-                music_duration = final_clip.duration
-                if background_music.duration > music_duration:
-                    # Escolhe um ponto de início aleatório
-                    max_start = background_music.duration - music_duration
-                    start_time = random.uniform(0, max_start)
-                    background_music = background_music.subclip(start_time, start_time + music_duration)
-                else:
-                    # Se a música for menor, repete até cobrir a duração
-                    repeats_needed = int(music_duration / background_music.duration) + 1
-                    background_music = mp.concatenate_audioclips([background_music] * repeats_needed)
-                    background_music = background_music.subclip(0, music_duration)
-                
-                # Aplica controle de volume simplificado
-                # Reduz volume da música para não competir com o áudio principal
-                background_music = background_music.volumex(0.05)  # 6% do volume
-                
-                # Combina com o áudio original
-                final_audio = mp.CompositeAudioClip([final_clip.audio, background_music])
-                final_clip = final_clip.set_audio(final_audio)
-                
-                print("✅ Música de fundo adicionada com controle de volume dinâmico")
-            else:
-                print("⚠️ Arquivo de música de fundo não encontrado: assets/fundo.mp3")
-            
-            # Gera nome do arquivo de saída
+
+        profile_name = select_encoder_profile(
+            use_gpu=optimization_config["use_gpu"],
+            quality=optimization_config["quality"],
+            profile=optimization_config.get("encoder_profile"),
+            max_seconds_per_minute=optimization_config.get("max_seconds_per_minute")
+        )
+
+        # Caminho rápido: recodifica só a emenda e copia o resto do corte
+        if optimization_config.get("outro_fast_path", True):
             output_path = input_path.parent / f"{input_path.stem}_com_outro.mp4"
-            
-            # Usa parâmetros otimizados
-            write_params = create_optimized_write_params(
-                use_gpu=optimization_config["use_gpu"],
-                quality=optimization_config["quality"]
-            )
-            
-            print(f"🎬 Renderizando vídeo com outro...")
-            print(f"   Duração original: {main_clip.duration:.1f}s")
-            print(f"   Duração do outro: {outro_clip.duration:.1f}s")
-            print(f"   Duração final: {final_clip.duration:.1f}s")
-            
-            try:
-                final_clip.write_videofile(str(output_path), **write_params)
-            except Exception as e:
-                if "h264_amf" in str(write_params.get('codec', '')) and "Invalid argument" in str(e):
-                    print("⚠️ Erro no codec AMD, usando fallback para CPU...")
-                    fallback_params = create_fallback_params()
-                    print(f"🔄 Renderizando com fallback: {fallback_params['codec']}")
-                    final_clip.write_videofile(str(output_path), **fallback_params)
-                else:
-                    raise e
-            
-            # Limpa recursos
-            main_clip.close()
-            outro_clip.close()
-            final_clip.close()
-            
-            print(f"✅ Outro anexado com sucesso: {output_path}")
-            return str(output_path)
-            
+            if splice_outro(input_path, outro_path, output_path, profile_name,
+                            music_path=BACKGROUND_MUSIC_PATH, music_volume=MUSIC_PAUSE_VOLUME,
+                            transition=TRANSITION_DURATION):
+                print(f"✅ Outro anexado com sucesso: {output_path}")
+                return str(output_path)
+
+        try:
+            with RenderSession() as session:
+                return self._render_with_outro(session, input_path, outro_path, profile_name)
         except Exception as e:
             print(f"❌ Erro ao anexar outro: {e}")
             raise e
+
+    def _render_with_outro(self, session: RenderSession, input_path: Path, outro_path: str,
+                           profile_name: str) -> str:
+        """Renderiza corte + outro + música; todos os leitores pertencem à sessão"""
+        # Carrega o vídeo principal
+        main_clip = session.video_file(input_path)
+        final_clip, outro_clip = compose_with_outro(session, main_clip, outro_path)
+        
+        # Gera nome do arquivo de saída
+        output_path = input_path.parent / f"{input_path.stem}_com_outro.mp4"
+        
+        # Mesmo perfil do caminho rápido
+        write_params = profile_write_params(profile_name)
+        
+        print(f"🎬 Renderizando vídeo com outro...")
+        print(f"   Duração original: {main_clip.duration:.1f}s")
+        print(f"   Duração do outro: {outro_clip.duration:.1f}s")
+        print(f"   Duração final: {final_clip.duration:.1f}s")
+        
+        session.own_tree(final_clip)
+        write_videofile_with_fallback(final_clip, output_path, write_params)
+        
+        print(f"✅ Outro anexado com sucesso: {output_path}")
+        return str(output_path)
     
     def list_available_outros(self):
         """Lista os outros disponíveis"""
@@ -184,9 +132,8 @@ class OutroAppender:
                 return False
             
             try:
-                # Tenta carregar o vídeo para validar
-                clip = mp.VideoFileClip(outro_path)
-                clip.close()
+                # Sonda o vídeo para validar (fica no cache para os próximos usos)
+                ASSETS.probe(outro_path)
             except Exception as e:
                 print(f"❌ Arquivo inválido {outro_path}: {e}")
                 return False
@@ -194,6 +141,82 @@ class OutroAppender:
         print(f"✅ {len(self.outro_files)} outros válidos encontrados")
         return True
 
+def _speech_parts(main_clip, outro_path: str, speech_wav=None) -> list:
+    """
+    Trechos de fala para o envelope do ducking: o corte (do WAV acelerado, se
+    houver; senão decodificado do clip) e o áudio do outro (cache de PCM)
+    """
+    parts = []
+    main_pcm = read_wav(speech_wav) if speech_wav else None
+    if main_pcm:
+        parts.append((*main_pcm, 0.0))
+    elif main_clip.audio is not None:
+        parts.append((main_clip.audio.to_soundarray(fps=ENVELOPE_FPS), ENVELOPE_FPS, 0.0))
+    if ASSETS.probe(outro_path).get("audio_found"):
+        parts.append((ASSETS.speech_array(outro_path), MUSIC_FPS, main_clip.duration))
+    return parts
+
+def compose_with_outro(session: RenderSession, main_clip, outro_path: str, speech_wav=None) -> tuple:
+    """
+    Monta corte + outro + música de fundo como um único clip (sem renderizar).
+    Usado tanto pelo OutroAppender quanto pelo render em passada única do editor.
+    `speech_wav` é o WAV já decodificado da fala do corte (o áudio acelerado
+    do cache de render), usado no envelope do ducking em vez de decodificar
+    o áudio do corte de novo.
+
+    Returns:
+        tuple: (clip final, clip do outro)
+    """
+    # Carrega o outro
+    outro_clip = session.video_file(outro_path)
+    
+    # Cria transição de 1 segundo entre o corte e o outro
+    transition_duration = TRANSITION_DURATION
+    
+    # Cria um fade out no final do vídeo principal (visual e áudio)
+    main_clip = main_clip.fadeout(transition_duration)
+    
+    # Cria um fade out no áudio do corte principal
+    if main_clip.audio:
+        main_clip = main_clip.set_audio(main_clip.audio.audio_fadeout(transition_duration))
+    
+    # Cria um fade in no início do outro (visual e áudio)
+    outro_clip = outro_clip.fadein(transition_duration)
+    
+    # Mantém o áudio do outro em volume total (sem fade in)
+    # O TTS deve manter o mesmo volume do áudio do vídeo
+    
+    # Envelope da fala a partir do PCM já decodificado (antes do concatenate)
+    speech_parts = _speech_parts(main_clip, outro_path, speech_wav)
+
+    # Concatena os vídeos com transição
+    final_clip = mp.concatenate_videoclips([main_clip, outro_clip])
+    
+    # Adiciona música de fundo com controle de volume dinâmico
+    background_music_path = BACKGROUND_MUSIC_PATH
+    if background_music_path.exists():
+        print("🎵 Adicionando música de fundo com controle de volume...")
+        
+        # Trecho aleatório (em loop se a música for menor) do PCM já decodificado
+        music = ASSETS.music_slice(background_music_path, final_clip.duration)
+        
+        # Ducking: a música abaixa (~MUSIC_VOLUME com fala típica) enquanto há fala e sobe nas pausas
+        if speech_parts:
+            music = duck_music(music, MUSIC_FPS, speech_parts, volume=MUSIC_PAUSE_VOLUME)
+        else:
+            music *= MUSIC_VOLUME
+        background_music = mp.AudioArrayClip(music, fps=MUSIC_FPS)
+        
+        # Combina com o áudio original
+        final_audio = mp.CompositeAudioClip([final_clip.audio, background_music])
+        final_clip = final_clip.set_audio(final_audio)
+        
+        print("✅ Música de fundo adicionada com controle de volume dinâmico")
+    else:
+        print("⚠️ Arquivo de música de fundo não encontrado: assets/fundo.mp3")
+    
+    return final_clip, outro_clip
+
 def append_outro(input_clip: str, optimization_config: dict = None) -> str:
     """
     Função helper para anexar outro a um corte
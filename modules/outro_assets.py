@@ -0,0 +1,119 @@
+# modules/outro_assets.py
+"""
+Cache de processo para os assets do outro (vídeos de outro e música de fundo).
+
+- A lista de outros só é refeita quando o mtime do diretório muda
+- Cada arquivo é sondado (ffmpeg_parse_infos) uma vez por mtime
+- A música de fundo é decodificada uma única vez para PCM s16le em disco
+  (assets/.cache) e aberta como np.memmap; cada corte recebe uma fatia
+  aleatória desse array, sem decodificar o MP3 de novo nem montar
+  concatenate_audioclips quando a música é curta
+- O áudio dos outros usa o mesmo cache de PCM, para o envelope do ducking
+"""
+import os
+import random
+import subprocess
+import threading
+from pathlib import Path
+import numpy as np
+from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+from .video_optimizer import get_ffmpeg_binary
+
+PCM_CACHE_DIR = Path("assets/.cache")
+MUSIC_FPS = 44100
+MUSIC_CHANNELS = 2
+
+class AssetCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._outros = {}
+        self._infos = {}
+        self._pcm = {}
+
+    @staticmethod
+    def _mtime(path: Path) -> float:
+        return os.stat(path).st_mtime
+
+    def outro_files(self, assets_dir) -> list:
+        """outro1.mp4..outro3.mp4 existentes em `assets_dir` (reescaneia só se o diretório mudar)"""
+        assets_dir = Path(assets_dir)
+        if not assets_dir.exists():
+            print(f"⚠️  Diretório de outros não encontrado: {assets_dir}")
+            return []
+        mtime = self._mtime(assets_dir)
+        with self._lock:
+            cached = self._outros.get(assets_dir)
+            if cached and cached[0] == mtime:
+                return list(cached[1])
+
+            # Procura por arquivos outro1.mp4, outro2.mp4, outro3.mp4
+            files = [str(p) for p in (assets_dir / f"outro{i}.mp4" for i in range(1, 4)) if p.exists()]
+            self._outros[assets_dir] = (mtime, files)
+
+        if not files:
+            print(f"⚠️  Nenhum arquivo de outro encontrado em {assets_dir}")
+            print("   Execute 'python generate_outros.py' para gerar os outros")
+        else:
+            print(f"✅ {len(files)} outros carregados")
+        return list(files)
+
+    def probe(self, path) -> dict:
+        """ffmpeg_parse_infos memorizado por (caminho, mtime)"""
+        path = Path(path)
+        key = (path.resolve(), self._mtime(path))
+        infos = self._infos.get(key)
+        if infos is None:
+            infos = self._infos[key] = ffmpeg_parse_infos(str(path))
+        return infos
+
+    def music_pcm_path(self, path) -> Path:
+        """Arquivo PCM s16le (44.1 kHz, estéreo) da música, decodificado uma vez"""
+        path = Path(path)
+        pcm_path = PCM_CACHE_DIR / f"{path.stem}.{MUSIC_FPS}hz.s16le"
+        with self._lock:
+            if not pcm_path.exists() or pcm_path.stat().st_mtime < self._mtime(path):
+                PCM_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+                print(f"🎵 Decodificando {path.name} para o cache de PCM...")
+                tmp = pcm_path.with_suffix(".tmp")
+                subprocess.run([
+                    get_ffmpeg_binary(), "-hide_banner", "-y", "-i", str(path), "-vn",
+                    "-f", "s16le", "-acodec", "pcm_s16le", "-ar", str(MUSIC_FPS), "-ac", str(MUSIC_CHANNELS),
+                    str(tmp),
+                ], check=True, capture_output=True)
+                tmp.replace(pcm_path)
+                self._pcm.pop(pcm_path, None)
+        return pcm_path
+
+    def music_array(self, path) -> np.ndarray:
+        """PCM da música como memmap int16 de formato (amostras, canais)"""
+        pcm_path = self.music_pcm_path(path)
+        mtime = self._mtime(pcm_path)
+        with self._lock:
+            cached = self._pcm.get(pcm_path)
+            if cached is None or cached[0] != mtime:
+                data = np.memmap(pcm_path, dtype=np.int16, mode="r").reshape(-1, MUSIC_CHANNELS)
+                cached = self._pcm[pcm_path] = (mtime, data)
+        return cached[1]
+
+    def speech_array(self, path) -> np.ndarray:
+        """Áudio de um outro como float32 [-1, 1] (amostras, canais), do mesmo cache de PCM"""
+        return self.music_array(path).astype(np.float32) / 32768.0
+
+    def music_duration(self, path) -> float:
+        return len(self.music_array(path)) / MUSIC_FPS
+
+    def music_slice(self, path, duration: float) -> np.ndarray:
+        """
+        Trecho aleatório de `duration` segundos como float32 [-1, 1]. Se a música
+        for menor, ela é repetida em loop (índices módulo o comprimento).
+        """
+        data = self.music_array(path)
+        n = int(round(duration * MUSIC_FPS))
+        if len(data) > n:
+            start = random.randint(0, len(data) - n)
+            chunk = data[start:start + n]
+        else:
+            chunk = data[np.arange(n) % len(data)]
+        return chunk.astype(np.float32) / 32768.0
+
+ASSETS = AssetCache()
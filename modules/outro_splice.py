@@ -0,0 +1,192 @@
+# modules/outro_splice.py
+"""
+Anexa o outro sem recodificar o corte inteiro.
+
+O outro é pré-codificado uma vez por perfil de encoder (mesmo codec, GOP,
+resolução e fps dos cortes, já com o fade in) e guardado em cache. Para cada
+corte, só o trecho final a partir do último keyframe antes do fade out é
+recodificado; o resto do vídeo é copiado. As partes são unidas pelo concat
+demuxer (intermediários MPEG-TS, com SPS/PPS em banda). Só o áudio é
+remixado por inteiro (fade out, outro e música de fundo com ducking), o que
+leva poucos segundos.
+"""
+import random
+import re
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+from .outro_assets import ASSETS, MUSIC_FPS, MUSIC_CHANNELS
+from .audio_ducking import sidechain_filter
+from .video_optimizer import (
+    ENCODER_PROFILES, get_ffmpeg_binary, get_optimal_ffmpeg_params, get_optimal_audio_params,
+    get_ffmpeg_threads_param,
+)
+
+OUTRO_CACHE_DIR = Path("assets/outros/.encoded")
+
+# Família do bitstream de cada encoder: só partes da mesma família podem ser
+# concatenadas. O VAAPI fica de fora porque já usa -vf (hwupload) nos parâmetros.
+CODEC_FAMILIES = {"h264": "h264", "hevc": "hevc", "av1": "av1"}
+ENCODER_FAMILIES = {
+    "h264_amf": "h264", "libx264": "h264",
+    "libx265": "hevc", "libsvtav1": "av1",
+}
+
+def _ffmpeg(args: list) -> str:
+    result = subprocess.run([get_ffmpeg_binary(), "-hide_banner", "-y"] + args,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"FFmpeg falhou: {result.stderr.strip()[-300:]}")
+    return result.stderr
+
+def _video_codec(path: Path) -> str:
+    """Codec do primeiro stream de vídeo (lido do cabeçalho do `ffmpeg -i`)"""
+    result = subprocess.run([get_ffmpeg_binary(), "-hide_banner", "-i", str(path)],
+                            capture_output=True, text=True)
+    match = re.search(r"Stream #\S+.*?: Video: (\w+)", result.stderr)
+    return match.group(1) if match else ""
+
+def video_encoder_args(profile_name: str) -> list:
+    """Argumentos de vídeo do perfil, sem opções do muxer MP4 (os intermediários são MPEG-TS)"""
+    profile = ENCODER_PROFILES[profile_name]
+    args = ["-c:v", profile["encoder"]]
+    if profile.get("preset"):
+        args += ["-preset", profile["preset"]]
+    params = get_optimal_ffmpeg_params(profile=profile_name)
+    while "-movflags" in params:
+        i = params.index("-movflags")
+        del params[i:i + 2]
+    return args + params + get_ffmpeg_threads_param()
+
+def encoded_outro(outro_path: str, profile_name: str, size: tuple, fps: float, transition: float) -> Path:
+    """
+    Outro pré-codificado (vídeo, com fade in) para o perfil e resolução dos cortes.
+    Refeito só quando o arquivo original é mais novo que o cache.
+    """
+    source = Path(outro_path)
+    w, h = size
+    cached = OUTRO_CACHE_DIR / f"{source.stem}.{profile_name}.{w}x{h}.{fps:g}fps.ts"
+    if cached.exists() and cached.stat().st_mtime >= source.stat().st_mtime:
+        return cached
+
+    OUTRO_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    print(f"🎞️ Pré-codificando outro {source.name} ({profile_name}, {w}x{h})...")
+    tmp = cached.with_suffix(".tmp.ts")
+    _ffmpeg([
+        "-i", str(source), "-an",
+        "-vf", f"scale={w}:{h},fps={fps:g},fade=t=in:st=0:d={transition}",
+    ] + video_encoder_args(profile_name) + ["-f", "mpegts", str(tmp)])
+    tmp.replace(cached)
+    return cached
+
+def _split_tail(clip_path: Path, work_dir: Path, split_time: float) -> tuple:
+    """Corta o vídeo no primeiro keyframe após `split_time`, sem recodificar"""
+    _ffmpeg([
+        "-i", str(clip_path), "-map", "0:v:0", "-c", "copy",
+        "-f", "segment", "-segment_times", f"{split_time:.3f}", "-reset_timestamps", "1",
+        "-segment_format", "mpegts", str(work_dir / "part_%02d.ts"),
+    ])
+    parts = sorted(work_dir.glob("part_*.ts"))
+    if len(parts) != 2:
+        raise RuntimeError("nenhum keyframe no trecho final do corte")
+    return parts[0], parts[1]
+
+def _mix_audio(clip_path: Path, clip_duration: float, outro_path: str, outro_duration: float,
+               outro_has_audio: bool, music_path: Path, music_volume: float, transition: float,
+               out: Path):
+    """Áudio final: fade out do corte + áudio do outro + música de fundo com ducking pela fala"""
+    total = clip_duration + outro_duration
+    inputs = ["-i", str(clip_path)]
+    if outro_has_audio:
+        inputs += ["-i", str(outro_path)]
+        outro_audio = "[1:a]aresample=44100,aformat=channel_layouts=stereo[a1]"
+    else:
+        inputs += ["-f", "lavfi", "-t", f"{outro_duration:.3f}", "-i", "anullsrc=r=44100:cl=stereo"]
+        outro_audio = "[1:a]anull[a1]"
+    graph = [
+        f"[0:a]aresample=44100,aformat=channel_layouts=stereo,"
+        f"afade=t=out:st={clip_duration - transition:.3f}:d={transition}[a0]",
+        outro_audio,
+    ]
+    if music_path is not None and music_path.exists():
+        # Lê o PCM já decodificado do cache em vez de decodificar o MP3 a cada corte
+        music_duration = ASSETS.music_duration(music_path)
+        start = random.uniform(0, music_duration - total) if music_duration > total else 0
+        inputs += ["-stream_loop", "-1", "-ss", f"{start:.3f}",
+                   "-f", "s16le", "-ar", str(MUSIC_FPS), "-ac", str(MUSIC_CHANNELS),
+                   "-i", str(ASSETS.music_pcm_path(music_path))]
+        # A fala controla o ducking da música (sidechain); amix divide cada
+        # entrada por 2 e volume=2 devolve o nível original da voz
+        graph += [
+            "[a0][a1]concat=n=2:v=0:a=1,asplit=2[voice][sidechain]",
+            f"[2:a]aformat=channel_layouts=stereo,volume={music_volume},atrim=0:{total:.3f}[music]",
+            sidechain_filter("music", "sidechain", "ducked"),
+            "[voice][ducked]amix=inputs=2:duration=first:dropout_transition=0,volume=2[out]",
+        ]
+    else:
+        graph.append("[a0][a1]concat=n=2:v=0:a=1[out]")
+    _ffmpeg(inputs + ["-filter_complex", ";".join(graph), "-map", "[out]"]
+            + get_optimal_audio_params() + [str(out)])
+
+def splice_outro(clip_path, outro_path: str, output_path, profile_name: str,
+                 music_path: Path = None, music_volume: float = 0.05, transition: float = 1.0) -> bool:
+    """
+    Gera `output_path` = corte + outro recodificando só a emenda.
+
+    Returns:
+        bool: True se o arquivo foi gerado; False se o caminho rápido não se
+              aplica (o chamador deve usar o render completo)
+    """
+    clip_path, output_path = Path(clip_path), Path(output_path)
+    family = ENCODER_FAMILIES.get(ENCODER_PROFILES[profile_name]["encoder"])
+    if family is None or CODEC_FAMILIES.get(_video_codec(clip_path)) != family:
+        print("ℹ️ Codec do corte incompatível com a emenda; usando render completo do outro")
+        return False
+
+    clip_infos = ffmpeg_parse_infos(str(clip_path))
+    outro_infos = ASSETS.probe(outro_path)
+    if not clip_infos.get("audio_found"):
+        return False
+    clip_duration = clip_infos["duration"]
+    fps = clip_infos["video_fps"]
+    size = tuple(clip_infos["video_size"])
+
+    work_dir = Path(tempfile.mkdtemp(prefix="outro_splice_", dir=output_path.parent))
+    try:
+        outro_ts = encoded_outro(outro_path, profile_name, size, fps, transition)
+
+        # Corta um pouco antes do fade para que o keyframe seguinte caia antes dele
+        head, tail = _split_tail(clip_path, work_dir, max(0.0, clip_duration - transition - 1.0))
+        tail_duration = ffmpeg_parse_infos(str(tail))["duration"]
+        if tail_duration < transition:
+            raise RuntimeError("keyframe depois do início do fade out")
+
+        tail_faded = work_dir / "tail_faded.ts"
+        _ffmpeg([
+            "-i", str(tail), "-an",
+            "-vf", f"fade=t=out:st={tail_duration - transition:.3f}:d={transition}",
+        ] + video_encoder_args(profile_name) + ["-f", "mpegts", str(tail_faded)])
+
+        audio = work_dir / "audio.m4a"
+        _mix_audio(clip_path, clip_duration, outro_path, outro_infos["duration"],
+                   outro_infos.get("audio_found", False), music_path, music_volume, transition, audio)
+
+        list_file = work_dir / "concat.txt"
+        with open(list_file, "w", encoding="utf-8") as f:
+            for part in (head, tail_faded, outro_ts):
+                f.write(f"file '{Path(part).resolve().as_posix()}'\n")
+        _ffmpeg([
+            "-f", "concat", "-safe", "0", "-i", str(list_file), "-i", str(audio),
+            "-map", "0:v:0", "-map", "1:a:0", "-c", "copy",
+            "-movflags", "+faststart", str(output_path),
+        ])
+        print(f"⚡ Outro anexado sem recodificar o corte (emenda de {tail_duration:.1f}s recodificada)")
+        return True
+    except Exception as e:
+        print(f"⚠️ Caminho rápido do outro falhou: {e}")
+        print("   • Usando render completo")
+        return False
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
@@ -0,0 +1,112 @@
+# modules/profiler.py
+"""
+Profiler por amostragem para os caminhos quentes do render.
+
+Uma thread auxiliar lê a pilha da thread do render a cada `interval` segundos
+(sys._current_frames) e acumula pilhas no formato "collapsed" (uma linha
+"f1;f2;f3 N" por pilha), pronto para flamegraph.pl, speedscope ou inferno.
+Custo baixo e constante, sem instrumentar cada chamada como o cProfile.
+
+Também conta quantas vezes cada callback make_frame (fundo, logo, marquee,
+digitação) é chamado, expondo o trabalho Python feito por frame.
+"""
+import json
+import os
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+
+PROFILE_DIR = "profiles"
+DEFAULT_INTERVAL = 0.005
+
+FRAME_CALLS = Counter()
+
+_enabled_dir = None
+
+def count_calls(name: str):
+    """Decorator que conta as chamadas de um callback por frame em FRAME_CALLS"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            FRAME_CALLS[name] += 1
+            return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def enable(out_dir: str = PROFILE_DIR):
+    """Liga o profiling de profile_clip() para o resto da execução"""
+    global _enabled_dir
+    _enabled_dir = out_dir
+
+def is_enabled() -> bool:
+    return _enabled_dir is not None
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class SamplingProfiler:
+    """Amostra periodicamente a pilha de uma thread (por padrão, a que entrou no with)"""
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL, thread_id: int = None):
+        self.interval = interval
+        self.thread_id = thread_id
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            self.stacks[";".join(reversed(labels))] += 1
+            self.samples += 1
+
+    def __enter__(self):
+        if self.thread_id is None:
+            self.thread_id = threading.get_ident()
+        self._thread = threading.Thread(target=self._sample, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+    def write_collapsed(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+@contextmanager
+def profile_clip(name: str):
+    """
+    Perfila o render de um corte se enable() foi chamado; caso contrário não faz nada.
+    Grava <nome>.collapsed (pilhas) e <nome>.frames.json (chamadas de make_frame).
+    """
+    if _enabled_dir is None:
+        yield
+        return
+    os.makedirs(_enabled_dir, exist_ok=True)
+    base = os.path.join(_enabled_dir, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{name}")
+    calls_before = FRAME_CALLS.copy()
+    with SamplingProfiler() as prof:
+        yield
+    prof.write_collapsed(base + ".collapsed")
+    calls = dict(FRAME_CALLS - calls_before)
+    with open(base + ".frames.json", "w", encoding="utf-8") as f:
+        json.dump({"samples": prof.samples, "interval": prof.interval, "make_frame_calls": calls}, f, indent=2)
+
+    print(f"🔬 Profile: {prof.samples} amostras → {base}.collapsed")
+    for callback, count in sorted(calls.items(), key=lambda kv: -kv[1]):
+        print(f"   • make_frame {callback}: {count} chamadas")
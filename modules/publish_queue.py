@@ -0,0 +1,303 @@
+# modules/publish_queue.py
+"""
+Fila persistente de publicação (tabela `publish_queue` do clips/pipeline.db)
+e o agendador que a consome.
+
+Cada corte entra na fila com um horário de publicação calculado na hora do
+enfileiramento (o último horário da fila + o atraso aleatório de
+upload_delay), em vez de o processo dormir entre um upload e outro. O
+UploadScheduler roda numa thread: acorda só quando o próximo corte vence
+(ou quando algo novo é enfileirado), envia os cortes vencidos (em paralelo
+se vários vencerem juntos) e volta a dormir. Assim o main.py continua
+renderizando no mesmo processo enquanto publica, e a fila sobrevive a
+reinícios: basta rodar upload_clips.py de novo.
+
+Estados de um corte na fila: 'scheduled' → 'uploading' → 'done'. Falhas
+voltam para 'scheduled' com backoff; depois de MAX_ATTEMPTS ficam 'failed'
+(recebem mais uma tentativa a cada novo enqueue, sem zerar o contador) e
+falhas permanentes (arquivo ausente ou vazio) ficam 'rejected' até o arquivo
+voltar a existir.
+
+O envio é feito por um `uploader(clip_info) -> video_id` injetável; o
+padrão usa youtube_uploader.upload (upload resumível em pedaços, com a
+sessão de cada corte salva em `upload_sessions` para retomar após uma
+queda), e testes podem apontar para o servidor local de
+modules/fake_youtube.py ou passar uma função falsa.
+"""
+import json
+import random
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from . import metrics, state_db, storage, tracing
+
+MAX_ATTEMPTS = 5
+RETRY_BASE_S = 60
+LEASE_S = 2 * 3600  # corte "uploading" de um processo que morreu volta para a fila
+IDLE_WAIT_S = 3600
+ERROR_WAIT_S = 30  # pausa do agendador depois de um erro inesperado (ex.: banco travado)
+
+def build_description(clip_info: dict) -> str:
+    """Descrição publicada: texto do corte + episódio/canal de origem + hashtags"""
+    video_info = clip_info.get("video_info", {})
+    original_title = video_info.get('title', 'Vídeo Original')
+    original_channel = video_info.get('channel', 'Canal Original')
+    desc = f"""{clip_info["description"]}\n\n🎬 Trecho extraído do episódio: \"{original_title}\"\n📺 Canal original: {original_channel}"""
+    tags_string = "#" + " #".join(clip_info["tags"])
+    desc += f"\n\n{tags_string}"
+    return desc
+
+class UploadSessionStore:
+    """Sessão resumível de um corte na tabela `upload_sessions` (ver modules/resumable_upload.py)"""
+
+    def __init__(self, clips_dir: str, clip_path: str):
+        self.clips_dir = clips_dir
+        self.clip_path = clip_path
+
+    def load(self) -> dict:
+        return state_db.load_upload_session(self.clips_dir, self.clip_path)
+
+    def save(self, session: dict):
+        state_db.save_upload_session(self.clips_dir, self.clip_path, session)
+
+    def clear(self):
+        state_db.delete_upload_session(self.clips_dir, self.clip_path)
+
+def youtube_uploader(clip_info: dict, clips_dir: str, chunk_size: int = None) -> str:
+    """Uploader padrão: YouTube Data API em pedaços, com a sessão salva no banco (cliente Google importado só aqui)"""
+    from modules import youtube_uploader as yt
+    clip_path = clip_info["clip_path"]
+    store = UploadSessionStore(clips_dir, clip_path)
+    return yt.upload(clip_path, clip_info["hook"], build_description(clip_info), tags=clip_info["tags"],
+                     chunk_size=chunk_size or yt.DEFAULT_CHUNK_SIZE, session_store=store)
+
+def simulated_uploader(clip_info: dict) -> str:
+    print(f"   🧪 [TESTE] Upload simulado para: {clip_info['hook']}")
+    print(f"   🧪 [TESTE] Descrição: {clip_info['description'][:50]}...")
+    return None
+
+def enqueue(clips_dir: str, clip_infos: list, delay: dict = None) -> int:
+    """
+    Agenda os cortes ainda não enviados. O primeiro de uma fila vazia sai
+    imediatamente; cada um dos seguintes fica `delay` (aleatório entre
+    min_seconds e max_seconds) depois do último agendado. Cortes que
+    esgotaram as tentativas ('failed') voltam para a fila mantendo o número
+    de tentativas; os recusados de vez ('rejected') só voltam se o arquivo
+    existir e não estiver vazio.
+
+    Returns:
+        int: quantos cortes novos entraram na fila
+    """
+    delay = delay or {"min_seconds": 0, "max_seconds": 0}
+    added = 0
+    with state_db.transaction(clips_dir) as conn:
+        last = conn.execute(
+            "SELECT MAX(publish_at) FROM publish_queue WHERE status IN ('scheduled', 'uploading', 'done')"
+        ).fetchone()[0]
+        for clip in clip_infos:
+            if clip.get("uploaded"):
+                continue
+            row = conn.execute("SELECT status, attempts FROM publish_queue WHERE clip_path = ?",
+                               (clip["clip_path"],)).fetchone()
+            attempts = 0
+            if row:
+                if row["status"] == "failed":
+                    attempts = row["attempts"]
+                elif row["status"] != "rejected" or not _deliverable(clip["clip_path"]):
+                    continue
+            now = time.time()
+            if last is None:
+                publish_at = now
+            else:
+                publish_at = max(now, last + random.randint(delay["min_seconds"], delay["max_seconds"]))
+            video_dir = clip.get("video_dir") or Path(clip["clip_path"]).parent
+            info = {k: v for k, v in clip.items() if k not in ("video_dir", "uploaded", "uploaded_at")}
+            conn.execute(
+                "INSERT OR REPLACE INTO publish_queue (clip_path, video_dir, info, publish_at, attempts) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (clip["clip_path"], str(Path(video_dir)), json.dumps(info, ensure_ascii=False), publish_at, attempts),
+            )
+            last = publish_at
+            added += 1
+    return added
+
+def _deliverable(clip_path: str) -> bool:
+    path = Path(clip_path)
+    return path.exists() and path.stat().st_size > 0
+
+def claim_due(clips_dir: str, now: float = None) -> list:
+    """Marca como 'uploading' e retorna os cortes vencidos (seguro entre processos)"""
+    now = now or time.time()
+    with state_db.transaction(clips_dir) as conn:
+        rows = conn.execute(
+            "SELECT * FROM publish_queue WHERE (status = 'scheduled' AND publish_at <= ?) "
+            "OR (status = 'uploading' AND claimed_at < ?) ORDER BY publish_at",
+            (now, now - LEASE_S),
+        ).fetchall()
+        conn.executemany("UPDATE publish_queue SET status = 'uploading', claimed_at = ? WHERE clip_path = ?",
+                         [(now, row["clip_path"]) for row in rows])
+    return [dict(row) for row in rows]
+
+def next_due(clips_dir: str) -> float:
+    """Horário (epoch) do próximo corte agendado, ou None se a fila está vazia"""
+    row = state_db.connect(clips_dir).execute(
+        "SELECT MIN(publish_at) FROM publish_queue WHERE status = 'scheduled'"
+    ).fetchone()
+    return row[0]
+
+def pending_count(clips_dir: str) -> int:
+    return state_db.connect(clips_dir).execute(
+        "SELECT COUNT(*) FROM publish_queue WHERE status IN ('scheduled', 'uploading')"
+    ).fetchone()[0]
+
+def complete(clips_dir: str, row: dict, video_id: str):
+    with state_db.transaction(clips_dir) as conn:
+        conn.execute("UPDATE publish_queue SET status = 'done', video_id = ?, last_error = NULL WHERE clip_path = ?",
+                     (video_id, row["clip_path"]))
+
+def fail(clips_dir: str, row: dict, error: str, permanent: bool = False):
+    """Reagenda com backoff exponencial; depois de MAX_ATTEMPTS fica 'failed' (ou 'rejected' se permanente)"""
+    attempts = row["attempts"] + 1
+    if permanent:
+        status = "rejected"
+    else:
+        status = "failed" if attempts >= MAX_ATTEMPTS else "scheduled"
+    retry_at = time.time() + RETRY_BASE_S * 2 ** (attempts - 1)
+    with state_db.transaction(clips_dir) as conn:
+        conn.execute(
+            "UPDATE publish_queue SET status = ?, attempts = ?, publish_at = ?, last_error = ? WHERE clip_path = ?",
+            (status, attempts, retry_at, error, row["clip_path"]),
+        )
+
+class UploadScheduler:
+    """
+    Thread que publica os cortes da fila nos horários agendados.
+
+    Uso:
+        scheduler = UploadScheduler(clips_dir).start()
+        ... enqueue(...); scheduler.notify()
+        scheduler.wait_idle()   # opcional: espera a fila esvaziar
+        scheduler.stop()
+    """
+
+    def __init__(self, clips_dir: str, uploader=None, workers: int = 2,
+                 on_error=None):
+        self.clips_dir = clips_dir
+        self.uploader = uploader or partial(youtube_uploader, clips_dir=clips_dir)
+        self.workers = workers
+        self.on_error = on_error
+        self.uploaded = 0
+        self.failed = 0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._idle = threading.Condition()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="upload-scheduler", daemon=True)
+        self._thread.start()
+        return self
+
+    def notify(self):
+        """Acorda o agendador (novos cortes na fila)"""
+        self._wake.set()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join()
+
+    def wait_idle(self, timeout: float = None) -> bool:
+        """Bloqueia até não haver cortes agendados/em envio"""
+        deadline = None if timeout is None else time.time() + timeout
+        with self._idle:
+            while pending_count(self.clips_dir) and not self._stop.is_set():
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._idle.wait(timeout=min(remaining or 60, 60))
+        return True
+
+    def _publish(self, row: dict):
+        clip_info = json.loads(row["info"])
+        hook = clip_info["hook"]
+        clip_path = clip_info["clip_path"]
+        print(f"\n📤 Publicando: {hook}")
+        print(f"   Arquivo: {Path(clip_path).name}")
+        if not Path(clip_path).exists():
+            print(f"   ❌ Arquivo não encontrado: {clip_path}")
+            self.failed += 1
+            fail(self.clips_dir, row, "Arquivo não encontrado", permanent=True)
+            return
+        if Path(clip_path).stat().st_size == 0:
+            print(f"   ❌ Arquivo vazio (render incompleto?): {clip_path}")
+            self.failed += 1
+            fail(self.clips_dir, row, "Arquivo vazio", permanent=True)
+            return
+        try:
+            with tracing.span("upload", clip=Path(clip_path).name, bytes=Path(clip_path).stat().st_size):
+                video_id = self.uploader(clip_info)
+        except Exception as e:
+            print(f"   ❌ Erro no upload: {e}")
+            self.failed += 1
+            fail(self.clips_dir, row, str(e))
+            if self.on_error:
+                self.on_error(f"Erro no upload do corte: {hook} - {e}", clip_info.get("episode_url"))
+            return
+        complete(self.clips_dir, row, video_id)
+        storage.mark_clip_uploaded(self.clips_dir, clip_info, video_id)
+        self.uploaded += 1
+        print(f"   ✅ Upload concluído: {hook}")
+
+        checkpoint = state_db.load_clips(self.clips_dir, row["video_dir"])
+        if checkpoint and all(c["uploaded"] for c in checkpoint["generated_clips"]):
+            print(f"   ✅ Todos os uploads de {Path(row['video_dir']).name} concluídos!")
+            storage.clear_upload_checkpoint(self.clips_dir, row["video_dir"])
+
+    def _report(self, message: str, episode_url: str = None):
+        print(f"   ❌ {message}")
+        if self.on_error:
+            self.on_error(f"{message}\n{traceback.format_exc()}", episode_url)
+
+    def _publish_safe(self, row: dict):
+        """_publish sem derrubar o agendador: um erro inesperado é registrado e o corte é liberado"""
+        try:
+            self._publish(row)
+        except Exception as e:
+            self._report(f"Erro inesperado ao publicar {Path(row['clip_path']).name}: {e}",
+                         json.loads(row["info"]).get("episode_url"))
+            try:
+                # Só volta para a fila se ainda não foi concluído (evita publicar duas vezes)
+                status = state_db.connect(self.clips_dir).execute(
+                    "SELECT status FROM publish_queue WHERE clip_path = ?", (row["clip_path"],)).fetchone()
+                if status and status["status"] == "uploading":
+                    fail(self.clips_dir, row, str(e))
+            except Exception:
+                pass  # o lease (LEASE_S) devolve o corte à fila
+
+    def _run(self):
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="upload") as pool:
+            while not self._stop.is_set():
+                self._wake.clear()
+                try:
+                    due = claim_due(self.clips_dir)
+                    if due:
+                        list(pool.map(self._publish_safe, due))
+                    metrics.QUEUE_DEPTH.set(pending_count(self.clips_dir), queue="uploads")
+                    upcoming = next_due(self.clips_dir)
+                    wait = IDLE_WAIT_S if upcoming is None else max(0.0, upcoming - time.time())
+                except Exception as e:
+                    # Ex.: banco travado; a thread continua e tenta de novo em instantes
+                    self._report(f"Erro no agendador de uploads: {e}")
+                    upcoming, wait = None, ERROR_WAIT_S
+                with self._idle:
+                    self._idle.notify_all()
+
+                if wait > 0:
+                    if upcoming is not None and wait >= 1:
+                        print(f"⏳ Próximo upload em {int(wait // 60):02d}:{int(wait % 60):02d}")
+                    self._wake.wait(timeout=wait)
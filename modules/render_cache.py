@@ -0,0 +1,84 @@
+# modules/render_cache.py
+"""
+Cache de render por hash de conteúdo.
+
+Cada corte é descrito por camadas com hash próprio:
+- base: identidade do arquivo de origem, início/fim, velocidade, pitch, crop
+- overlay: versão do template, pergunta, legendas e estilo do texto
+- encode: perfil do encoder, outro em passada única, encode segmentado
+
+O manifesto (`.render_cache.json`) fica no diretório do vídeo, ao lado dos
+metadados dos cortes. Se todas as camadas batem e o arquivo de saída não
+mudou, o render é pulado. Se só parte mudou (ex.: texto da pergunta), as
+camadas intactas que têm artefato próprio são reaproveitadas: hoje, a faixa
+de áudio acelerada com atempo (`.render_cache/<hash da base>.wav`).
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+from .storage import write_json_atomic
+
+MANIFEST_NAME = ".render_cache.json"
+LAYER_DIR_NAME = ".render_cache"
+
+def source_identity(path: str) -> dict:
+    """Identidade barata do arquivo de origem (nome, tamanho e mtime)"""
+    st = os.stat(path)
+    return {"name": Path(path).name, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+def content_hash(data) -> str:
+    payload = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:20]
+
+class RenderCache:
+    def __init__(self, video_dir: Path):
+        self.video_dir = Path(video_dir)
+        self.manifest_path = self.video_dir / MANIFEST_NAME
+        self.layer_dir = self.video_dir / LAYER_DIR_NAME
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            self.entries = {}
+
+    @staticmethod
+    def layer_keys(layers: dict) -> dict:
+        """Hash por camada + hash do corte inteiro (chave "clip")"""
+        keys = {name: content_hash(parts) for name, parts in layers.items()}
+        keys["clip"] = content_hash(keys)
+        return keys
+
+    def lookup(self, outfile: Path, keys: dict) -> bool:
+        """True se `outfile` existe e foi gerado exatamente com estas camadas"""
+        entry = self.entries.get(Path(outfile).name)
+        if not entry or not Path(outfile).exists():
+            return False
+        if entry["keys"].get("clip") == keys["clip"] and os.path.getsize(outfile) == entry.get("size"):
+            return True
+        changed = [name for name, key in keys.items() if name != "clip" and entry["keys"].get(name) != key]
+        if changed:
+            print(f"♻️ Cache de render: camadas alteradas: {', '.join(changed)}")
+        return False
+
+    def layer_path(self, key: str, suffix: str) -> Path:
+        """Artefato reaproveitável de uma camada (pode ainda não existir)"""
+        return self.layer_dir / f"{key}{suffix}"
+
+    def store(self, outfile: Path, keys: dict, artifacts: list = ()):
+        """Registra o corte gerado e remove artefatos de camadas que deixaram de ser usados"""
+        self.entries[Path(outfile).name] = {
+            "keys": keys,
+            "size": os.path.getsize(outfile),
+            "artifacts": [Path(p).name for p in artifacts],
+        }
+        write_json_atomic(self.manifest_path, self.entries, indent=2)
+
+        in_use = {name for entry in self.entries.values() for name in entry.get("artifacts", [])}
+        if self.layer_dir.exists():
+            for artifact in self.layer_dir.iterdir():
+                if artifact.name not in in_use:
+                    try:
+                        artifact.unlink()
+                    except OSError:
+                        pass
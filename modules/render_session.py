@@ -0,0 +1,92 @@
+# modules/render_session.py
+"""
+Ciclo de vida explícito dos recursos de um render.
+
+Cada VideoFileClip/AudioFileClip mantém um processo FFmpeg leitor e buffers
+abertos até ser fechado; clips derivados (subclip, resize, set_audio...) não
+fecham o original. A RenderSession é dona de todos os leitores, TextClips e
+arquivos temporários de um render e os libera de forma determinística ao
+sair do `with`, inclusive em caso de erro, mantendo a memória estável em
+lotes longos.
+"""
+import gc
+import os
+import tempfile
+import moviepy.editor as mp
+
+# Janela de áudio decodificado mantida por leitor (em amostras). O padrão do
+# MoviePy (200000) guarda ~4.5s por leitor; a escrita lê em blocos sequenciais
+# e não precisa de mais que ~1s.
+AUDIO_BUFFERSIZE = 50000
+
+class RenderSession:
+    """
+    Uso:
+        with RenderSession() as session:
+            clip = session.video_file(path)
+            tmp = session.temp_path(".wav")
+            ...
+            session.own_tree(final)
+    """
+
+    def __init__(self):
+        self._clips = []
+        self._seen = set()
+        self._temp_files = []
+
+    def own(self, clip):
+        """Registra um clip para ser fechado no fim da sessão e o retorna"""
+        if clip is not None and id(clip) not in self._seen:
+            self._seen.add(id(clip))
+            self._clips.append(clip)
+        return clip
+
+    def own_tree(self, clip):
+        """Registra um clip e, recursivamente, as camadas e máscaras de composites"""
+        if clip is None or id(clip) in self._seen:
+            return clip
+        self.own(clip)
+        for child in getattr(clip, "clips", None) or []:
+            self.own_tree(child)
+        self.own_tree(getattr(clip, "mask", None))
+        return clip
+
+    def video_file(self, path: str, **kwargs):
+        kwargs.setdefault("audio_buffersize", AUDIO_BUFFERSIZE)
+        return self.own(mp.VideoFileClip(str(path), **kwargs))
+
+    def audio_file(self, path: str, **kwargs):
+        kwargs.setdefault("buffersize", AUDIO_BUFFERSIZE)
+        return self.own(mp.AudioFileClip(str(path), **kwargs))
+
+    def temp_path(self, suffix: str = "") -> str:
+        """Caminho temporário removido no fim da sessão (depois que os leitores fecham)"""
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        os.close(fd)
+        self._temp_files.append(path)
+        return path
+
+    def close(self):
+        # Ordem reversa: derivados e composites antes dos leitores de origem
+        for clip in reversed(self._clips):
+            try:
+                clip.close()
+            except Exception:
+                pass
+        self._clips.clear()
+        self._seen.clear()
+
+        for path in self._temp_files:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+        self._temp_files.clear()
+        gc.collect()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
@@ -0,0 +1,220 @@
+# modules/resumable_upload.py
+"""
+Cliente do protocolo de upload resumível do Google (usado pelo YouTube Data API).
+
+Cada arquivo é enviado em pedaços de `chunk_size` bytes (múltiplo de 256 KiB)
+para uma sessão criada com `POST ...?uploadType=resumable`. A URI da sessão e
+o último offset confirmado pelo servidor ficam num `store` (no pipeline, a
+tabela `upload_sessions` do clips/pipeline.db), então:
+- falhas 5xx ou de rede são repetidas com backoff exponencial; antes de
+  reenviar, o servidor é consultado (`Content-Range: bytes */total`) para
+  saber quantos bytes realmente chegaram;
+- se o processo morrer, o próximo upload do mesmo arquivo retoma a sessão
+  salva a partir do offset confirmado, em vez de reenviar tudo;
+- sessões expiradas (404/410) ou de um arquivo que mudou são recriadas;
+- um arquivo vazio é finalizado com um único PUT `Content-Range: bytes */0`
+  (não existe intervalo de bytes a enviar).
+
+Só usa a biblioteca padrão (http.client); a autenticação entra por um
+callback que devolve os cabeçalhos. Pode ser testado contra o servidor local
+de modules/fake_youtube.py.
+"""
+import http.client
+import json
+import os
+import random
+import time
+from urllib.parse import urlsplit
+
+CHUNK_GRANULARITY = 256 * 1024
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+RETRIABLE_STATUS = {500, 502, 503, 504}
+MAX_RETRIES = 8
+BACKOFF_BASE_S = 1.0
+BACKOFF_MAX_S = 64.0
+REQUEST_TIMEOUT_S = 120
+
+class ResumableUploadError(Exception):
+    """Falha definitiva (status não repetível ou tentativas esgotadas)"""
+
+class _Transient(Exception):
+    """Falha repetível: 5xx ou erro de rede"""
+
+def normalize_chunk_size(chunk_size: int) -> int:
+    """Arredonda para cima até um múltiplo de 256 KiB (exigência do protocolo)"""
+    chunks = max(1, -(-int(chunk_size) // CHUNK_GRANULARITY))
+    return chunks * CHUNK_GRANULARITY
+
+def _range_end(headers) -> int:
+    """Offset seguinte ao último byte confirmado no cabeçalho `Range: bytes=0-N`"""
+    value = headers.get("Range")
+    if not value:
+        return 0
+    return int(value.rsplit("-", 1)[1]) + 1
+
+class ResumableUpload:
+    """
+    Uso:
+        upload = ResumableUpload(init_url, "corte.mp4", {"snippet": {...}}, store=store, auth=auth)
+        response = upload.run()   # JSON devolvido pelo servidor ao final
+
+    `store` tem load() -> dict|None, save(dict) e clear(); `auth(refresh)`
+    devolve os cabeçalhos de autenticação (refresh=True após um 401).
+    """
+
+    def __init__(self, init_url: str, path: str, metadata: dict, content_type: str = "video/mp4",
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, store=None, auth=None):
+        self.init_url = init_url
+        self.path = str(path)
+        self.metadata = metadata
+        self.content_type = content_type
+        self.chunk_size = normalize_chunk_size(chunk_size)
+        self.store = store
+        self.auth = auth
+        st = os.stat(self.path)
+        self.size = st.st_size
+        self.mtime_ns = st.st_mtime_ns
+        self.bytes_sent = 0  # inclui reenvios; comparar com self.size mostra o desperdício
+
+    # ------------------------------------------------------------ HTTP
+
+    def _request(self, method: str, url: str, body: bytes = b"", headers: dict = None):
+        """Uma tentativa; 5xx e erros de rede viram _Transient, 401 renova a autenticação uma vez"""
+        for refresh in (False, True):
+            all_headers = dict(headers or {})
+            if self.auth:
+                all_headers.update(self.auth(refresh))
+            all_headers["Content-Length"] = str(len(body))
+            parts = urlsplit(url)
+            conn_cls = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+            conn = conn_cls(parts.netloc, timeout=REQUEST_TIMEOUT_S)
+            try:
+                target = parts.path + (f"?{parts.query}" if parts.query else "")
+                conn.request(method, target, body=body, headers=all_headers)
+                resp = conn.getresponse()
+                data = resp.read()
+            except (OSError, http.client.HTTPException) as e:
+                raise _Transient(f"erro de rede: {e}") from e
+            finally:
+                conn.close()
+            if resp.status in RETRIABLE_STATUS:
+                raise _Transient(f"HTTP {resp.status}")
+            if resp.status == 401 and self.auth and not refresh:
+                continue
+            return resp.status, resp.headers, data
+
+    def _backoff(self, attempt: int, error: Exception):
+        if attempt > MAX_RETRIES:
+            raise ResumableUploadError(f"Tentativas esgotadas ({MAX_RETRIES}): {error}")
+        delay = min(BACKOFF_MAX_S, BACKOFF_BASE_S * 2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+        print(f"   ⚠️ Upload: {error} - nova tentativa em {delay:.1f}s")
+        time.sleep(delay)
+
+    def _with_retry(self, fn):
+        attempt = 0
+        while True:
+            try:
+                return fn()
+            except _Transient as e:
+                attempt += 1
+                self._backoff(attempt, e)
+
+    # ------------------------------------------------------------ protocolo
+
+    def _initiate(self) -> str:
+        headers = {
+            "Content-Type": "application/json; charset=UTF-8",
+            "X-Upload-Content-Type": self.content_type,
+            "X-Upload-Content-Length": str(self.size),
+        }
+        body = json.dumps(self.metadata).encode("utf-8")
+        status, resp_headers, data = self._with_retry(lambda: self._request("POST", self.init_url, body, headers))
+        if status != 200 or not resp_headers.get("Location"):
+            raise ResumableUploadError(f"Falha ao abrir sessão de upload: HTTP {status} {data[:200]!r}")
+        return resp_headers["Location"]
+
+    def _query(self, uri: str):
+        """Offset confirmado pelo servidor; dict se o upload já terminou; None se a sessão expirou"""
+        status, headers, data = self._with_retry(
+            lambda: self._request("PUT", uri, headers={"Content-Range": f"bytes */{self.size}"}))
+        if status in (200, 201):
+            return json.loads(data or b"{}")
+        if status == 308:
+            return _range_end(headers)
+        if status in (404, 410):
+            return None
+        raise ResumableUploadError(f"Consulta da sessão falhou: HTTP {status} {data[:200]!r}")
+
+    def _save(self, uri: str, offset: int):
+        if self.store:
+            self.store.save({"session_uri": uri, "size": self.size, "mtime_ns": self.mtime_ns,
+                             "chunk_size": self.chunk_size, "offset": offset})
+
+    def _resume(self):
+        """(uri, offset) de uma sessão salva ainda válida, ou (uri, dict) se ela já tinha terminado"""
+        saved = self.store.load() if self.store else None
+        if not saved or saved["size"] != self.size or saved["mtime_ns"] != self.mtime_ns:
+            return None, 0
+        result = self._query(saved["session_uri"])
+        if result is None:
+            print("   ♻️ Sessão de upload expirada, recomeçando")
+            return None, 0
+        if isinstance(result, int):
+            print(f"   ♻️ Retomando upload em {result / 1024 / 1024:.1f}/{self.size / 1024 / 1024:.1f} MB")
+        return saved["session_uri"], result
+
+    def _finish(self, response: dict, on_progress=None) -> dict:
+        if self.store:
+            self.store.clear()
+        if on_progress:
+            on_progress(self.size, self.size)
+        return response
+
+    def run(self, on_progress=None) -> dict:
+        """Envia (ou retoma) o arquivo; `on_progress(offset, total)` a cada pedaço confirmado"""
+        uri, offset = self._resume()
+        if isinstance(offset, dict):
+            return self._finish(offset, on_progress)
+        if uri is None:
+            uri = self._initiate()
+            self._save(uri, 0)
+
+        attempt = 0
+        with open(self.path, "rb") as f:
+            while True:
+                f.seek(offset)
+                chunk = f.read(self.chunk_size)
+                if chunk:
+                    content_range = f"bytes {offset}-{offset + len(chunk) - 1}/{self.size}"
+                else:
+                    # Arquivo vazio: só declara o tamanho total para fechar a sessão
+                    content_range = f"bytes */{self.size}"
+                self.bytes_sent += len(chunk)
+                try:
+                    status, headers, data = self._request("PUT", uri, chunk, {"Content-Range": content_range})
+                except _Transient as e:
+                    attempt += 1
+                    self._backoff(attempt, e)
+                    # O pedaço pode ter chegado em parte: pergunta ao servidor onde retomar
+                    result = self._query(uri)
+                    if isinstance(result, dict):
+                        return self._finish(result, on_progress)
+                    if result is not None:
+                        offset = result
+                        continue
+                    status, headers, data = 404, {}, b""
+
+                if status in (200, 201):
+                    return self._finish(json.loads(data or b"{}"), on_progress)
+                if status == 308:
+                    offset = _range_end(headers)
+                    attempt = 0
+                    self._save(uri, offset)
+                    if on_progress:
+                        on_progress(offset, self.size)
+                elif status in (404, 410):
+                    print("   ♻️ Sessão de upload expirada, recomeçando")
+                    uri, offset = self._initiate(), 0
+                    self._save(uri, 0)
+                else:
+                    raise ResumableUploadError(f"Upload recusado: HTTP {status} {data[:200]!r}")
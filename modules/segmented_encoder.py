@@ -0,0 +1,119 @@
+# modules/segmented_encoder.py
+"""
+Render em dois estágios: o composite é gravado uma vez num intermediário rápido
+(x264 ultrafast, qualidade alta, keyframe a cada N segundos), cortado nos GOPs
+sem recodificar, e cada segmento é codificado em paralelo por um processo
+FFmpeg próprio. As partes são unidas pelo concat demuxer, também sem recodificar.
+
+Um único x264 deixa de escalar por volta de 8 threads; com vários segmentos
+simultâneos o encode final escala quase linearmente em máquinas com muitos núcleos.
+"""
+import os
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from .video_optimizer import ENCODER_PROFILES, get_ffmpeg_binary, get_optimal_ffmpeg_params, get_optimal_audio_params
+
+# Só encoders de software: GPU (AMF/VAAPI) não ganha com instâncias paralelas
+SEGMENTABLE_ENCODERS = {"libx264", "libx265", "libsvtav1"}
+
+def default_workers() -> int:
+    """Número de encodes simultâneos (~4 threads por instância)"""
+    return max(1, (os.cpu_count() or 1) // 4)
+
+def _ffmpeg(args: list):
+    result = subprocess.run([get_ffmpeg_binary(), "-hide_banner", "-y", "-loglevel", "error"] + args,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"FFmpeg falhou: {result.stderr.strip()[-300:]}")
+
+def write_intermediate(clip, path: Path, segment_seconds: float):
+    """Grava o composite num intermediário rápido com keyframes nos pontos de corte"""
+    clip.write_videofile(
+        str(path),
+        codec="libx264",
+        preset="ultrafast",
+        fps=30,
+        audio_codec="pcm_s16le",
+        ffmpeg_params=[
+            "-crf", "12",
+            "-pix_fmt", "yuv420p",
+            "-force_key_frames", f"expr:gte(t,n_forced*{segment_seconds})",
+        ],
+    )
+
+def split_at_gops(intermediate: Path, out_dir: Path, segment_seconds: float) -> list:
+    """Corta o vídeo do intermediário nos keyframes, sem recodificar"""
+    pattern = out_dir / "seg_%04d.mkv"
+    _ffmpeg([
+        "-i", str(intermediate), "-map", "0:v:0", "-c", "copy",
+        "-f", "segment", "-segment_time", str(segment_seconds), "-reset_timestamps", "1",
+        str(pattern),
+    ])
+    return sorted(out_dir.glob("seg_*.mkv"))
+
+def encode_segment(segment: Path, profile_name: str, threads: int) -> Path:
+    """Codifica um segmento com o perfil final"""
+    profile = ENCODER_PROFILES[profile_name]
+    out = segment.with_name(segment.stem.replace("seg_", "enc_") + ".mp4")
+    args = ["-i", str(segment), "-c:v", profile["encoder"]]
+    if profile.get("preset"):
+        args += ["-preset", profile["preset"]]
+    args += get_optimal_ffmpeg_params(profile=profile_name) + ["-threads", str(threads), "-an", str(out)]
+    _ffmpeg(args)
+    return out
+
+def concat_segments(segments: list, intermediate: Path, outfile: Path):
+    """Une os segmentos (concat demuxer, sem recodificar) e codifica o áudio do intermediário"""
+    list_file = segments[0].parent / "concat.txt"
+    with open(list_file, "w", encoding="utf-8") as f:
+        for seg in segments:
+            f.write(f"file '{seg.resolve().as_posix()}'\n")
+    _ffmpeg([
+        "-f", "concat", "-safe", "0", "-i", str(list_file),
+        "-i", str(intermediate),
+        "-map", "0:v:0", "-map", "1:a:0?",
+        "-c:v", "copy",
+    ] + get_optimal_audio_params() + ["-movflags", "+faststart", str(outfile)])
+
+def render_segmented(clip, outfile, profile_name: str, segment_seconds: float = 4.0, workers: int = None) -> bool:
+    """
+    Renderiza o clip no modo segmentado.
+
+    Returns:
+        bool: True se o arquivo final foi gerado; False se o perfil não é
+              segmentável ou algo falhou (o chamador deve usar o render serial)
+    """
+    encoder = ENCODER_PROFILES[profile_name]["encoder"]
+    if encoder not in SEGMENTABLE_ENCODERS:
+        print(f"ℹ️ Encode segmentado não se aplica a {encoder}, usando render serial")
+        return False
+
+    workers = workers or default_workers()
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    outfile = Path(outfile)
+    work_dir = Path(tempfile.mkdtemp(prefix="segmented_", dir=outfile.parent))
+    try:
+        intermediate = work_dir / "intermediate.mkv"
+        print(f"🎞️ Encode segmentado: intermediário rápido ({segment_seconds}s por GOP)...")
+        write_intermediate(clip, intermediate, segment_seconds)
+
+        segments = split_at_gops(intermediate, work_dir, segment_seconds)
+        if not segments:
+            raise RuntimeError("Nenhum segmento gerado a partir do intermediário")
+        print(f"   • {len(segments)} segmentos, {workers} encodes paralelos × {threads} threads ({profile_name})")
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            encoded = list(pool.map(lambda seg: encode_segment(seg, profile_name, threads), segments))
+
+        concat_segments(encoded, intermediate, outfile)
+        print(f"✅ Encode segmentado concluído: {outfile.name}")
+        return True
+    except Exception as e:
+        print(f"⚠️ Falha no encode segmentado: {e}")
+        print("   • Usando render serial")
+        return False
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
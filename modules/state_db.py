@@ -0,0 +1,296 @@
+# modules/state_db.py
+"""
+Estado do pipeline em SQLite (clips/pipeline.db): episódios, etapas de cada
+highlight, cortes prontos para upload, o catálogo de cortes (modules/catalog.py),
+a fila de publicação (modules/publish_queue.py) e as sessões de upload
+resumível em andamento (modules/resumable_upload.py).
+
+Substitui os JSONs espalhados (journal por episódio, upload_checkpoint.json
+por vídeo): vários processos e threads podem gravar ao mesmo tempo (WAL +
+transações BEGIN IMMEDIATE com busy timeout) e os scripts de status consultam
+índices em vez de percorrer diretórios.
+"""
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+DB_NAME = "pipeline.db"
+BUSY_TIMEOUT_S = 30
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS episodes (
+    url TEXT PRIMARY KEY,
+    video_path TEXT NOT NULL,
+    video_info TEXT NOT NULL DEFAULT '{}',
+    highlights TEXT NOT NULL DEFAULT '[]',
+    transcript TEXT NOT NULL DEFAULT '[]',
+    status TEXT NOT NULL DEFAULT 'processing',
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS episodes_by_status ON episodes(status);
+
+CREATE TABLE IF NOT EXISTS highlight_stages (
+    episode_url TEXT NOT NULL REFERENCES episodes(url) ON DELETE CASCADE,
+    idx INTEGER NOT NULL,
+    stage TEXT NOT NULL,
+    data TEXT NOT NULL DEFAULT '{}',
+    at TEXT NOT NULL,
+    PRIMARY KEY (episode_url, idx, stage)
+);
+
+CREATE TABLE IF NOT EXISTS clips (
+    clip_path TEXT PRIMARY KEY,
+    video_dir TEXT NOT NULL,
+    episode_url TEXT,
+    position INTEGER NOT NULL DEFAULT 0,
+    hook TEXT,
+    info TEXT NOT NULL DEFAULT '{}',
+    uploaded INTEGER NOT NULL DEFAULT 0,
+    uploaded_at TEXT,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS clips_by_dir ON clips(video_dir, position);
+CREATE INDEX IF NOT EXISTS clips_pending ON clips(uploaded, video_dir);
+
+CREATE TABLE IF NOT EXISTS catalog (
+    clip_path TEXT PRIMARY KEY,
+    video_dir TEXT NOT NULL,
+    file_name TEXT NOT NULL,
+    size INTEGER,
+    mtime REAL,
+    duration REAL,
+    hook TEXT,
+    tags TEXT NOT NULL DEFAULT '[]',
+    metadata_file TEXT,
+    uploaded INTEGER NOT NULL DEFAULT 0,
+    uploaded_at TEXT,
+    video_id TEXT,
+    indexed_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS catalog_by_dir ON catalog(video_dir, file_name);
+CREATE INDEX IF NOT EXISTS catalog_by_upload ON catalog(uploaded, mtime);
+
+CREATE TABLE IF NOT EXISTS publish_queue (
+    clip_path TEXT PRIMARY KEY,
+    video_dir TEXT NOT NULL,
+    info TEXT NOT NULL DEFAULT '{}',
+    publish_at REAL NOT NULL,
+    status TEXT NOT NULL DEFAULT 'scheduled',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    claimed_at REAL,
+    last_error TEXT,
+    video_id TEXT
+);
+CREATE INDEX IF NOT EXISTS publish_queue_due ON publish_queue(status, publish_at);
+
+CREATE TABLE IF NOT EXISTS upload_sessions (
+    clip_path TEXT PRIMARY KEY,
+    session_uri TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    chunk_size INTEGER NOT NULL,
+    offset INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT NOT NULL
+);
+"""
+
+_local = threading.local()
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+def db_path(clips_dir: str) -> Path:
+    return Path(clips_dir) / DB_NAME
+
+def connect(clips_dir: str) -> sqlite3.Connection:
+    """Conexão da thread atual para o banco de `clips_dir` (criada e migrada no primeiro uso)"""
+    path = db_path(clips_dir).resolve()
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(path)
+    if conn is None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(path), timeout=BUSY_TIMEOUT_S, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.executescript(SCHEMA)
+        conns[path] = conn
+    return conn
+
+@contextmanager
+def transaction(clips_dir: str):
+    """Transação de escrita: BEGIN IMMEDIATE pega o lock de escrita já no início"""
+    conn = connect(clips_dir)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+# ---------------------------------------------------------------- episódios
+
+def start_episode(clips_dir: str, episode_url: str, video_path: str, transcript: list,
+                  video_info: dict, highlights: list) -> bool:
+    """
+    Registra o episódio (transcrição e highlights gravados uma única vez).
+    Se já existe com outros highlights, as etapas antigas são descartadas.
+
+    Returns:
+        bool: True se o registro foi (re)criado
+    """
+    highlights_json = json.dumps(highlights, ensure_ascii=False, sort_keys=True)
+    with transaction(clips_dir) as conn:
+        row = conn.execute("SELECT highlights, status FROM episodes WHERE url = ?", (episode_url,)).fetchone()
+        if row and row["status"] == "processing" and row["highlights"] == highlights_json:
+            return False
+        conn.execute("DELETE FROM episodes WHERE url = ?", (episode_url,))
+        conn.execute(
+            "INSERT INTO episodes (url, video_path, video_info, highlights, transcript, status, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, 'processing', ?, ?)",
+            (episode_url, video_path, json.dumps(video_info or {}, ensure_ascii=False), highlights_json,
+             json.dumps(transcript, ensure_ascii=False), _now(), _now()),
+        )
+    return True
+
+def record_stage(clips_dir: str, episode_url: str, idx: int, stage: str, data: dict):
+    with transaction(clips_dir) as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO highlight_stages (episode_url, idx, stage, data, at) VALUES (?, ?, ?, ?, ?)",
+            (episode_url, idx, stage, json.dumps(data, ensure_ascii=False), _now()),
+        )
+        conn.execute("UPDATE episodes SET updated_at = ? WHERE url = ?", (_now(), episode_url))
+
+def load_episode(clips_dir: str, episode_url: str) -> dict:
+    """Episódio em andamento com suas etapas ({idx: {etapa: registro}}), ou None"""
+    conn = connect(clips_dir)
+    row = conn.execute("SELECT * FROM episodes WHERE url = ? AND status = 'processing'",
+                       (episode_url,)).fetchone()
+    if row is None:
+        return None
+    stages = {}
+    for stage_row in conn.execute("SELECT idx, stage, data, at FROM highlight_stages WHERE episode_url = ?",
+                                  (episode_url,)):
+        record = {"idx": stage_row["idx"], "stage": stage_row["stage"], "at": stage_row["at"],
+                  **json.loads(stage_row["data"])}
+        stages.setdefault(stage_row["idx"], {})[stage_row["stage"]] = record
+    return {
+        "episode_url": row["url"],
+        "video_path": row["video_path"],
+        "video_info": json.loads(row["video_info"]),
+        "highlights": json.loads(row["highlights"]),
+        "transcript": json.loads(row["transcript"]),
+        "created_at": row["created_at"],
+        "stages": stages,
+    }
+
+def list_episodes(clips_dir: str, status: str = "processing") -> list:
+    """Resumo dos episódios (sem a transcrição) com o número de cortes concluídos"""
+    rows = connect(clips_dir).execute(
+        "SELECT e.url, e.video_path, e.video_info, e.highlights, e.created_at, e.updated_at, "
+        "(SELECT COUNT(*) FROM highlight_stages s WHERE s.episode_url = e.url AND s.stage = 'done') AS done "
+        "FROM episodes e WHERE e.status = ? ORDER BY e.updated_at",
+        (status,),
+    )
+    return [{
+        "episode_url": row["url"],
+        "video_path": row["video_path"],
+        "video_info": json.loads(row["video_info"]),
+        "highlights": json.loads(row["highlights"]),
+        "created_at": row["created_at"],
+        "updated_at": row["updated_at"],
+        "done": row["done"],
+    } for row in rows]
+
+def episode_done_since(clips_dir: str, episode_url: str, since: str) -> bool:
+    """True se o episódio foi concluído em `since` (ISO) ou depois"""
+    row = connect(clips_dir).execute(
+        "SELECT 1 FROM episodes WHERE url = ? AND status = 'done' AND updated_at >= ?", (episode_url, since)
+    ).fetchone()
+    return row is not None
+
+def finish_episode(clips_dir: str, episode_url: str):
+    """Marca o episódio como concluído e descarta transcrição e etapas"""
+    with transaction(clips_dir) as conn:
+        conn.execute("DELETE FROM highlight_stages WHERE episode_url = ?", (episode_url,))
+        conn.execute("UPDATE episodes SET status = 'done', transcript = '[]', updated_at = ? WHERE url = ?",
+                     (_now(), episode_url))
+
+# ---------------------------------------------------------------- cortes
+
+def replace_clips(clips_dir: str, video_dir: str, episode_url: str, generated_clips: list):
+    """Substitui o conjunto de cortes prontos para upload de um diretório de vídeo"""
+    video_dir = str(Path(video_dir))
+    with transaction(clips_dir) as conn:
+        conn.execute("DELETE FROM clips WHERE video_dir = ?", (video_dir,))
+        conn.executemany(
+            "INSERT OR REPLACE INTO clips (clip_path, video_dir, episode_url, position, hook, info, "
+            "uploaded, uploaded_at, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(clip["clip_path"], video_dir, episode_url, i, clip.get("hook"),
+              json.dumps(clip, ensure_ascii=False), int(bool(clip.get("uploaded"))), clip.get("uploaded_at"), _now())
+             for i, clip in enumerate(generated_clips)],
+        )
+
+def mark_uploaded(clips_dir: str, clip_path: str, uploaded_at: str = None):
+    """Atualiza só o corte enviado (sem regravar o conjunto)"""
+    with transaction(clips_dir) as conn:
+        conn.execute("UPDATE clips SET uploaded = 1, uploaded_at = ? WHERE clip_path = ?",
+                     (uploaded_at or _now(), clip_path))
+
+def _clip_from_row(row) -> dict:
+    clip = json.loads(row["info"])
+    clip["uploaded"] = bool(row["uploaded"])
+    clip["uploaded_at"] = row["uploaded_at"]
+    return clip
+
+def load_clips(clips_dir: str, video_dir: str) -> dict:
+    """Cortes de um diretório de vídeo no formato do antigo checkpoint de upload, ou None"""
+    rows = connect(clips_dir).execute(
+        "SELECT * FROM clips WHERE video_dir = ? ORDER BY position", (str(Path(video_dir)),)
+    ).fetchall()
+    if not rows:
+        return None
+    return {
+        "episode_url": rows[0]["episode_url"],
+        "generated_clips": [_clip_from_row(row) for row in rows],
+        "total_clips": len(rows),
+    }
+
+def delete_clips(clips_dir: str, video_dir: str):
+    with transaction(clips_dir) as conn:
+        conn.execute("DELETE FROM clips WHERE video_dir = ?", (str(Path(video_dir)),))
+
+def pending_clips(clips_dir: str) -> list:
+    """Todos os cortes ainda não enviados, por diretório de vídeo"""
+    rows = connect(clips_dir).execute(
+        "SELECT * FROM clips WHERE uploaded = 0 ORDER BY video_dir, position"
+    ).fetchall()
+    return [dict(_clip_from_row(row), video_dir=row["video_dir"]) for row in rows]
+
+# ---------------------------------------------------------------- sessões de upload
+
+def save_upload_session(clips_dir: str, clip_path: str, session: dict):
+    with transaction(clips_dir) as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO upload_sessions (clip_path, session_uri, size, mtime_ns, chunk_size, "
+            "offset, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (str(Path(clip_path)), session["session_uri"], session["size"], session["mtime_ns"],
+             session["chunk_size"], session.get("offset", 0), _now()),
+        )
+
+def load_upload_session(clips_dir: str, clip_path: str) -> dict:
+    row = connect(clips_dir).execute("SELECT * FROM upload_sessions WHERE clip_path = ?",
+                                     (str(Path(clip_path)),)).fetchone()
+    return dict(row) if row else None
+
+def delete_upload_session(clips_dir: str, clip_path: str):
+    with transaction(clips_dir) as conn:
+        conn.execute("DELETE FROM upload_sessions WHERE clip_path = ?", (str(Path(clip_path)),))
@@ -0,0 +1,310 @@
+# modules/storage.py
+"""
+Persistência leve do pipeline: checkpoints de processamento/upload e metadados
+dos cortes. Não depende de MoviePy, para que scripts de status e listagem
+iniciem rápido. O estado de episódios e cortes fica no SQLite (state_db).
+"""
+from pathlib import Path
+from datetime import datetime
+import json
+import os
+import tempfile
+from . import state_db, catalog
+
+def save_clip_metadata(video_dir: Path, clip_filename: str, highlight: dict, video_info: dict, episode_url: str, all_tags: list):
+    """
+    Salva os metadados do corte em um arquivo JSON
+    """
+    # Cria a descrição completa
+    original_title = video_info.get('title', 'Vídeo Original')
+    original_channel = video_info.get('channel', 'Canal Original')
+    
+    desc = f"""{highlight.get('description', highlight.get('hook', ''))}
+
+🎬 Trecho extraído do episódio: "{original_title}"
+📺 Canal original: {original_channel}"""
+
+    tags_string = "#" + " #".join(all_tags)
+    desc += f"\n\n{tags_string}"
+    
+    # Salva o arquivo de metadados
+    metadata_file = video_dir / f"{Path(clip_filename).stem}_metadata.txt"
+    with open(metadata_file, "w", encoding="utf-8") as f:
+        f.write(desc)
+    
+    print(f"Metadados salvos em: {metadata_file}")
+    return metadata_file
+
+def list_video_clips(base_clips_dir: str) -> dict:
+    """
+    Lista todos os vídeos processados e seus cortes (lido do catálogo indexado)
+    """
+    clips_info = {}
+    if not Path(base_clips_dir).exists():
+        print(f"Diretório {base_clips_dir} não encontrado")
+        return clips_info
+    
+    for entry in catalog.query(base_clips_dir):
+        video_name = Path(entry["video_dir"]).name
+        info = clips_info.setdefault(video_name, {
+            "video_dir": entry["video_dir"],
+            "clips": [],
+            "metadata_files": []
+        })
+        info["clips"].append(entry["file_name"])
+        if entry["metadata_file"] and entry["metadata_file"] not in info["metadata_files"]:
+            info["metadata_files"].append(entry["metadata_file"])
+    
+    return clips_info
+
+def get_checkpoint_path(out_dir: str) -> Path:
+    """Retorna o caminho do arquivo de checkpoint"""
+    return Path(out_dir) / "checkpoint.json"
+
+def save_checkpoint(out_dir: str, video_path: str, highlight: dict, transcript: list, video_info: dict = None, episode_url: str = None):
+    """Salva o estado atual do processamento"""
+    checkpoint = {
+        "video_path": video_path,
+        "highlight": highlight,
+        "transcript": transcript,
+        "video_info": video_info or {},
+        "episode_url": episode_url,  # Adiciona a URL do episódio ao checkpoint
+        "created_at": str(Path().cwd())  # Adiciona timestamp de criação
+    }
+    checkpoint_path = get_checkpoint_path(out_dir)
+    # Cria o diretório se não existir
+    checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(checkpoint_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f, ensure_ascii=False, indent=2)
+    print(f"Checkpoint salvo em: {checkpoint_path}")
+
+def load_checkpoint(out_dir: str, episode_url: str = None) -> dict:
+    """
+    Carrega o último checkpoint salvo com validação da URL do episódio
+    
+    Args:
+        out_dir: Diretório onde está o checkpoint
+        episode_url: URL do episódio atual para validação
+    
+    Returns:
+        dict: Checkpoint se válido, None caso contrário
+    """
+    checkpoint_path = get_checkpoint_path(out_dir)
+    
+    # Verifica se o arquivo de checkpoint existe
+    if not checkpoint_path.exists():
+        print("ℹ️  Nenhum checkpoint encontrado")
+        return None
+    
+    try:
+        with open(checkpoint_path, "r", encoding="utf-8") as f:
+            checkpoint = json.load(f)
+        
+        # Validação da URL do episódio
+        if episode_url and checkpoint.get("episode_url"):
+            if checkpoint["episode_url"] != episode_url:
+                print(f"⚠️  Checkpoint inválido: URL do episódio não confere")
+                print(f"   Checkpoint: {checkpoint['episode_url']}")
+                print(f"   Atual: {episode_url}")
+                return None
+            else:
+                print(f"✅ Checkpoint válido encontrado para o episódio")
+        elif episode_url and not checkpoint.get("episode_url"):
+            print(f"⚠️  Checkpoint sem URL do episódio - considerando inválido para segurança")
+            return None
+        elif not episode_url:
+            print(f"ℹ️  Carregando checkpoint sem validação de URL")
+        
+        # Validação adicional: verifica se o arquivo de vídeo ainda existe
+        video_path = Path(checkpoint.get("video_path", ""))
+        if not video_path.exists():
+            print(f"⚠️  Checkpoint inválido: arquivo de vídeo não encontrado: {video_path}")
+            return None
+        
+        return checkpoint
+        
+    except (json.JSONDecodeError, KeyError, Exception) as e:
+        print(f"❌ Erro ao carregar checkpoint: {e}")
+        return None
+
+def validate_checkpoint_for_episode(out_dir: str, episode_url: str) -> dict:
+    """
+    Valida especificamente se existe um checkpoint válido para o episódio atual
+    
+    Args:
+        out_dir: Diretório onde está o checkpoint
+        episode_url: URL do episódio para validação
+    
+    Returns:
+        dict: Checkpoint se válido para o episódio, None caso contrário
+    """
+    return load_checkpoint(out_dir, episode_url)
+
+def clear_checkpoint(out_dir: str):
+    """Remove o arquivo de checkpoint"""
+    checkpoint_path = get_checkpoint_path(out_dir)
+    if checkpoint_path.exists():
+        checkpoint_path.unlink()
+        print("Checkpoint removido")
+    else:
+        print("ℹ️  Nenhum checkpoint encontrado para remoção")
+
+def write_json_atomic(path: Path, data, indent: int = None):
+    """Grava em arquivo temporário no mesmo diretório e renomeia (nunca deixa JSON pela metade)"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=indent)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+def start_episode_journal(out_dir: str, episode_url: str, video_path: str, transcript: list,
+                          video_info: dict, highlights: list) -> bool:
+    """
+    Abre o journal do episódio: transcrição e highlights são gravados uma única
+    vez; depois cada etapa concluída vira um registro pequeno e independente
+
+    Returns:
+        bool: True se o journal foi (re)criado, sem etapas anteriores
+    """
+    created = state_db.start_episode(out_dir, episode_url, video_path, transcript, video_info, highlights)
+    if created:
+        print(f"Journal do episódio criado em: {state_db.db_path(out_dir)}")
+    return created
+
+def record_highlight_stage(out_dir: str, episode_url: str, highlight_idx: int, stage: str, **data):
+    """Registra que uma etapa (render, done) de um highlight terminou (uma transação pequena)"""
+    state_db.record_stage(out_dir, episode_url, highlight_idx, stage, data)
+
+def load_episode_journal(out_dir: str, episode_url: str) -> dict:
+    """
+    Carrega o journal do episódio, se existir e o vídeo de origem ainda estiver em disco.
+
+    Returns:
+        dict: dados do episódio + "stages" ({idx: {etapa: registro}}), ou None
+    """
+    journal = state_db.load_episode(out_dir, episode_url)
+    if journal is None:
+        return None
+    if not Path(journal["video_path"]).exists():
+        print(f"⚠️  Journal inválido: arquivo de vídeo não encontrado: {journal['video_path']}")
+        return None
+    return journal
+
+def list_episode_journals(out_dir: str) -> list:
+    """Episódios com processamento em andamento (sem a transcrição)"""
+    if not state_db.db_path(out_dir).exists():
+        return []
+    return state_db.list_episodes(out_dir)
+
+def clear_episode_journal(out_dir: str, episode_url: str):
+    """Encerra o journal do episódio após a conclusão"""
+    state_db.finish_episode(out_dir, episode_url)
+    print("Journal do episódio encerrado")
+
+def get_upload_checkpoint_path(video_dir: str) -> Path:
+    """Caminho do antigo checkpoint de upload em JSON (só lido para migração)"""
+    return Path(video_dir) / "upload_checkpoint.json"
+
+def save_upload_checkpoint(clips_dir: str, video_dir: str, episode_url: str, generated_clips: list):
+    """
+    Salva checkpoint com informações de todos os cortes gerados para upload posterior.
+    `clips_dir` é o paths.clips configurado (onde fica o banco); `video_dir`
+    pode ser um subdiretório dele ou o próprio clips_dir.
+    """
+    # Adiciona campos de status de upload se não existirem
+    for clip in generated_clips:
+        if "uploaded" not in clip:
+            clip["uploaded"] = False
+        if "uploaded_at" not in clip:
+            clip["uploaded_at"] = None
+    
+    state_db.replace_clips(clips_dir, video_dir, episode_url, generated_clips)
+    # Catálogo recebe só o arquivo entregue (com outro, se anexado)
+    for clip in generated_clips:
+        metadata_file = catalog.metadata_file_for(clip["clip_path"])
+        catalog.index_clip(clips_dir, clip["clip_path"], hook=clip.get("hook"), tags=clip.get("tags"),
+                           metadata_file=metadata_file.name if metadata_file.exists() else None,
+                           uploaded=int(bool(clip["uploaded"])), uploaded_at=clip["uploaded_at"])
+        clip_path = Path(clip["clip_path"])
+        if clip_path.stem.endswith(catalog.OUTRO_SUFFIX):
+            base = clip_path.with_name(clip_path.stem[:-len(catalog.OUTRO_SUFFIX)] + clip_path.suffix)
+            catalog.forget(clips_dir, str(base))
+    
+    print(f"✅ Checkpoint de upload salvo: {Path(video_dir).name}")
+    print(f"   • {len(generated_clips)} cortes prontos para upload")
+    return state_db.db_path(clips_dir)
+
+def mark_clip_uploaded(clips_dir: str, clip_info: dict, video_id: str = None):
+    """Marca um corte como enviado (atualiza só a linha dele)"""
+    clip_info["uploaded"] = True
+    clip_info["uploaded_at"] = datetime.now().isoformat()
+    if video_id:
+        clip_info["video_id"] = video_id
+    state_db.mark_uploaded(clips_dir, clip_info["clip_path"], clip_info["uploaded_at"])
+    catalog.mark_uploaded(clips_dir, clip_info["clip_path"], clip_info["uploaded_at"], video_id)
+
+def _migrate_upload_checkpoint(clips_dir: str, video_dir: str):
+    """Importa um upload_checkpoint.json antigo para o banco e o renomeia"""
+    legacy_path = get_upload_checkpoint_path(video_dir)
+    if not legacy_path.exists():
+        return
+    try:
+        with open(legacy_path, "r", encoding="utf-8") as f:
+            legacy = json.load(f)
+        state_db.replace_clips(clips_dir, video_dir, legacy.get("episode_url"),
+                               legacy.get("generated_clips", []))
+        legacy_path.rename(legacy_path.with_suffix(".json.migrated"))
+        print(f"ℹ️ Checkpoint de upload migrado para o banco: {legacy_path}")
+    except Exception as e:
+        print(f"❌ Erro ao migrar checkpoint de upload: {e}")
+
+def migrate_upload_checkpoints(clips_dir: str):
+    """Uma única varredura de clips/ importando os upload_checkpoint.json antigos"""
+    base = Path(clips_dir)
+    if not base.exists():
+        return
+    # Cortes sem video_info ficam direto em clips/
+    _migrate_upload_checkpoint(clips_dir, clips_dir)
+    for video_dir in base.iterdir():
+        if video_dir.is_dir():
+            _migrate_upload_checkpoint(clips_dir, str(video_dir))
+
+def load_upload_checkpoint(clips_dir: str, video_dir: str) -> dict:
+    """
+    Carrega checkpoint de upload se existir para o diretório do vídeo
+    """
+    _migrate_upload_checkpoint(clips_dir, video_dir)
+    if not state_db.db_path(clips_dir).exists():
+        return None
+    
+    try:
+        checkpoint_data = state_db.load_clips(clips_dir, video_dir)
+        if checkpoint_data:
+            print(f"✅ Checkpoint de upload carregado: {Path(video_dir).name}")
+            print(f"   • {checkpoint_data['total_clips']} cortes encontrados")
+        return checkpoint_data
+    except Exception as e:
+        print(f"❌ Erro ao carregar checkpoint de upload: {e}")
+        return None
+
+def clear_upload_checkpoint(clips_dir: str, video_dir: str):
+    """
+    Remove checkpoint de upload após conclusão para o diretório do vídeo
+    """
+    state_db.delete_clips(clips_dir, video_dir)
+    print(f"✅ Checkpoint de upload removido: {Path(video_dir).name}")
+
+def pending_uploads(clips_dir: str) -> list:
+    """Cortes ainda não enviados em todos os diretórios de vídeo (consulta indexada)"""
+    if not state_db.db_path(clips_dir).exists():
+        return []
+    return state_db.pending_clips(clips_dir)
@@ -0,0 +1,220 @@
+# modules/tracing.py
+"""
+Tracing leve do pipeline: spans aninhados com tempo de parede, CPU (processo e
+filhos, ex: FFmpeg), pico de memória e bytes lidos/escritos em disco.
+
+Cada execução grava um arquivo JSON lines em logs/traces/ e pode exportar o
+trace no formato Chrome/Perfetto (chrome://tracing, ui.perfetto.dev).
+Listeners (ex: modules.metrics) recebem cada span fechado. Sem start_run() e
+sem listeners, os spans não medem nada.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+TRACE_DIR = os.path.join("logs", "traces")
+
+_lock = threading.Lock()
+_local = threading.local()
+_run = None  # {"id", "path", "origin", "spans"}
+_listeners = []
+_origin = time.perf_counter()
+
+def _io_counters():
+    """Bytes lidos/escritos em disco pelo processo (None se indisponível)"""
+    try:
+        with open("/proc/self/io", "r") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+        return int(fields["read_bytes"]), int(fields["write_bytes"])
+    except (OSError, KeyError, ValueError):
+        pass
+    try:
+        import psutil
+        io = psutil.Process().io_counters()
+        return io.read_bytes, io.write_bytes
+    except Exception:
+        return None
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        try:
+            import psutil
+            return round(psutil.Process().memory_info().peak_wset / (1024 * 1024), 1)
+        except Exception:
+            return None
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1)
+
+def _snapshot() -> dict:
+    t = os.times()
+    return {
+        "wall": time.perf_counter(),
+        "cpu": t.user + t.system,
+        "children_cpu": t.children_user + t.children_system,
+        "io": _io_counters(),
+    }
+
+def _stack() -> list:
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+def start_run(run_name: str = "run") -> str:
+    """Inicia o trace da execução; retorna o caminho do arquivo JSON lines"""
+    global _run
+    run_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{run_name}"
+    os.makedirs(TRACE_DIR, exist_ok=True)
+    _run = {
+        "id": run_id,
+        "path": os.path.join(TRACE_DIR, f"{run_id}.jsonl"),
+        "origin": time.perf_counter(),
+        "spans": [],
+    }
+    return _run["path"]
+
+def is_active() -> bool:
+    return _run is not None or bool(_listeners)
+
+def add_listener(callback):
+    """Registra callback(span: dict) chamado a cada span fechado"""
+    if callback not in _listeners:
+        _listeners.append(callback)
+
+def _record(name: str, start: dict, end: dict, attrs: dict, depth: int, parent: str):
+    span = {
+        "name": name,
+        "parent": parent,
+        "depth": depth,
+        "thread": threading.current_thread().name,
+        "start": round(start["wall"] - (_run["origin"] if _run else _origin), 6),
+        "wall": round(end["wall"] - start["wall"], 6),
+        "cpu": round(end["cpu"] - start["cpu"], 6),
+        "children_cpu": round(end["children_cpu"] - start["children_cpu"], 6),
+        "peak_rss_mb": _peak_rss_mb(),
+        "read_bytes": end["io"][0] - start["io"][0] if start["io"] and end["io"] else None,
+        "write_bytes": end["io"][1] - start["io"][1] if start["io"] and end["io"] else None,
+    }
+    if attrs:
+        span["attrs"] = attrs
+    if _run is not None:
+        with _lock:
+            _run["spans"].append(span)
+            with open(_run["path"], "a", encoding="utf-8") as f:
+                f.write(json.dumps(span, ensure_ascii=False, default=str) + "\n")
+    for callback in _listeners:
+        try:
+            callback(span)
+        except Exception:
+            pass  # instrumentação nunca derruba o pipeline
+    return span
+
+@contextmanager
+def span(name: str, **attrs):
+    """
+    Mede um bloco do pipeline. Spans abertos dentro deste viram filhos dele.
+
+        with tracing.span("download", url=episode_url):
+            ...
+    """
+    if not is_active():
+        yield
+        return
+    stack = _stack()
+    parent = stack[-1] if stack else None
+    stack.append(name)
+    start = _snapshot()
+    try:
+        yield
+    finally:
+        stack.pop()
+        _record(name, start, _snapshot(), attrs, len(stack), parent)
+
+class StageClock:
+    """
+    Cronômetro sequencial de etapas: cada mark() fecha a etapa iniciada no mark
+    anterior, preenche o dicionário opcional `timings` (segundos) e, com trace
+    ativo, registra a etapa como span filho do span atual (prefixado por `prefix`).
+    """
+
+    def __init__(self, timings: dict = None, prefix: str = None):
+        self.timings = timings
+        self.prefix = prefix
+        self._last = _snapshot()
+
+    def mark(self, stage: str, **attrs):
+        now = _snapshot()
+        if self.timings is not None:
+            self.timings[stage] = self.timings.get(stage, 0.0) + (now["wall"] - self._last["wall"])
+        if is_active():
+            stack = _stack()
+            name = f"{self.prefix}.{stage}" if self.prefix else stage
+            _record(name, self._last, now, attrs, len(stack), stack[-1] if stack else None)
+        self._last = now
+
+    def restart(self):
+        """Recomeça a contagem sem registrar o intervalo (ex.: trabalho de medição fora do render)"""
+        self._last = _snapshot()
+
+def summarize() -> list:
+    """Agrega os spans da execução por nome (na ordem em que começaram)"""
+    if _run is None:
+        return []
+    rows = {}
+    for s in sorted(_run["spans"], key=lambda s: (s["start"], s["depth"])):
+        row = rows.setdefault(s["name"], {
+            "name": s["name"], "depth": s["depth"], "count": 0, "wall": 0.0, "cpu": 0.0,
+            "children_cpu": 0.0, "peak_rss_mb": 0.0, "read_bytes": 0, "write_bytes": 0,
+        })
+        row["count"] += 1
+        row["wall"] += s["wall"]
+        row["cpu"] += s["cpu"]
+        row["children_cpu"] += s["children_cpu"]
+        row["peak_rss_mb"] = max(row["peak_rss_mb"], s["peak_rss_mb"] or 0)
+        row["read_bytes"] += s["read_bytes"] or 0
+        row["write_bytes"] += s["write_bytes"] or 0
+    return list(rows.values())
+
+def print_trace_summary():
+    """Imprime a tabela de tempo por etapa (junto ao relatório de LLM)"""
+    rows = summarize()
+    if not rows:
+        return
+    mb = 1024 * 1024
+    print("\n===== TEMPO POR ETAPA =====")
+    print(f"{'Etapa':<32} {'Qtde':>5} {'Parede(s)':>10} {'CPU(s)':>8} {'CPU filhos(s)':>14} "
+          f"{'RSS pico(MB)':>13} {'Lido(MB)':>9} {'Escrito(MB)':>12}")
+    for r in rows:
+        name = ("  " * r["depth"] + r["name"])[:32]
+        print(f"{name:<32} {r['count']:>5} {r['wall']:>10.2f} {r['cpu']:>8.2f} {r['children_cpu']:>14.2f} "
+              f"{r['peak_rss_mb']:>13.1f} {r['read_bytes'] / mb:>9.1f} {r['write_bytes'] / mb:>12.1f}")
+    print(f"Trace completo: {_run['path']}")
+    print("===========================\n")
+
+def export_chrome_trace(path: str):
+    """Exporta os spans no formato Chrome trace (abre no Perfetto/chrome://tracing)"""
+    if _run is None:
+        return None
+    threads = {}
+    events = []
+    for s in _run["spans"]:
+        tid = threads.setdefault(s["thread"], len(threads) + 1)
+        args = {k: s[k] for k in ("cpu", "children_cpu", "peak_rss_mb", "read_bytes", "write_bytes")}
+        args.update(s.get("attrs", {}))
+        events.append({
+            "name": s["name"], "ph": "X", "pid": os.getpid(), "tid": tid,
+            "ts": int(s["start"] * 1_000_000), "dur": int(s["wall"] * 1_000_000),
+            "args": args,
+        })
+    for thread_name, tid in threads.items():
+        events.append({"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid,
+                       "args": {"name": thread_name}})
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, default=str)
+    print(f"📊 Trace Chrome/Perfetto exportado: {path}")
+    return path
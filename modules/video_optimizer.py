@@ -4,90 +4,285 @@ Módulo para otimizações de processamento de vídeo
 Inclui suporte para GPU AMD e outras otimizações
 """
 import os
+import json
 import subprocess
 import platform
+import tempfile
 from pathlib import Path
 
+# Cache em disco das capacidades do host (um probe por máquina/versão do FFmpeg)
+CAPABILITIES_CACHE = Path.home() / ".cache" / "podcast_cuts" / "capabilities.json"
+
+_capabilities = None
+
+def get_ffmpeg_binary() -> str:
+    """Retorna o mesmo binário do FFmpeg usado pelo MoviePy (imageio-ffmpeg), ou o do PATH"""
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return "ffmpeg"
+
+class Capabilities:
+    """
+    Capacidades de codificação do host: versão do FFmpeg, encoders e hwaccels
+    disponíveis e quais encoders candidatos realmente funcionam (teste real).
+    """
+
+    def __init__(self, fingerprint: str, ffmpeg_version: str, encoders: list,
+                 hwaccels: list, working_encoders: list, profile_trials: dict = None):
+        self.fingerprint = fingerprint
+        self.ffmpeg_version = ffmpeg_version
+        self.encoders = encoders
+        self.hwaccels = hwaccels
+        self.working_encoders = working_encoders
+        self.profile_trials = profile_trials or {}  # perfil -> passou no teste com o argv real
+
+    def has_encoder(self, name: str) -> bool:
+        """True se o encoder passou no teste de codificação"""
+        return name in self.working_encoders
+
+    def has_profile(self, name: str) -> bool:
+        """True se o perfil passou no teste (perfis registrados depois do probe herdam o do encoder)"""
+        if name in self.profile_trials:
+            return self.profile_trials[name]
+        return self.has_encoder(ENCODER_PROFILES[name]["encoder"])
+
+    @property
+    def amd_gpu(self) -> bool:
+        return self.has_encoder("h264_amf")
+
+    def to_dict(self) -> dict:
+        return {
+            "fingerprint": self.fingerprint,
+            "ffmpeg_version": self.ffmpeg_version,
+            "encoders": self.encoders,
+            "hwaccels": self.hwaccels,
+            "working_encoders": self.working_encoders,
+            "profile_trials": self.profile_trials,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Capabilities":
+        return cls(
+            data["fingerprint"], data["ffmpeg_version"], data["encoders"],
+            data["hwaccels"], data["working_encoders"], data["profile_trials"],
+        )
+
+def _run_ffmpeg(ffmpeg: str, args: list, timeout: int = 20) -> subprocess.CompletedProcess:
+    return subprocess.run([ffmpeg, "-hide_banner"] + args, capture_output=True, text=True, timeout=timeout)
+
+def _ffmpeg_fingerprint(ffmpeg: str) -> tuple:
+    """Identifica o binário (versão + caminho + tamanho/mtime) para invalidar o cache"""
+    version = _run_ffmpeg(ffmpeg, ["-version"], timeout=10).stdout.splitlines()[0].strip()
+    try:
+        stat = Path(ffmpeg).stat()
+        identity = f"{Path(ffmpeg).resolve()}:{stat.st_size}:{int(stat.st_mtime)}"
+    except OSError:
+        identity = ffmpeg
+    return f"{platform.node()}|{version}|{identity}", version
+
+def _trial_encode(ffmpeg: str, profile_name: str) -> bool:
+    """
+    Codifica alguns frames sintéticos (rgb24, como o MoviePy entrega) num MP4
+    com exatamente os argumentos de saída que o render usará para o perfil,
+    para confirmar que a combinação encoder + parâmetros funciona de fato
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            result = _run_ffmpeg(ffmpeg, [
+                "-y", "-loglevel", "error",
+                "-f", "lavfi", "-i", "testsrc=size=256x144:rate=30",
+                "-frames:v", "5",
+            ] + moviepy_video_args(profile_write_params(profile_name)) + [str(Path(tmp) / "trial.mp4")])
+            return result.returncode == 0
+        except (subprocess.TimeoutExpired, OSError):
+            return False
+
+def probe_capabilities() -> Capabilities:
+    """Executa o probe completo (ffmpeg -encoders/-hwaccels + teste de cada candidato)"""
+    ffmpeg = get_ffmpeg_binary()
+    fingerprint, version = _ffmpeg_fingerprint(ffmpeg)
+
+    encoders = []
+    for line in _run_ffmpeg(ffmpeg, ["-encoders"]).stdout.splitlines():
+        parts = line.split()
+        # Linhas de encoder de vídeo: " V....D libx264  descrição"
+        if len(parts) >= 2 and parts[0].startswith("V") and len(parts[0]) == 6:
+            encoders.append(parts[1])
+
+    hwaccels = []
+    hw_lines = _run_ffmpeg(ffmpeg, ["-hwaccels"]).stdout.splitlines()
+    for line in hw_lines[1:]:  # primeira linha é o cabeçalho
+        if line.strip():
+            hwaccels.append(line.strip())
+
+    profile_trials = {
+        name: profile["encoder"] in encoders and _trial_encode(ffmpeg, name)
+        for name, profile in ENCODER_PROFILES.items()
+    }
+    working = sorted({ENCODER_PROFILES[name]["encoder"] for name, ok in profile_trials.items() if ok})
+    return Capabilities(fingerprint, version, encoders, hwaccels, working, profile_trials)
+
+def get_capabilities(refresh: bool = False) -> Capabilities:
+    """
+    Retorna as capacidades do host, memorizadas no processo e em disco.
+    O probe só roda de novo se o binário do FFmpeg mudar ou com refresh=True.
+    """
+    global _capabilities
+    if _capabilities is not None and not refresh:
+        return _capabilities
+
+    ffmpeg = get_ffmpeg_binary()
+    try:
+        fingerprint, _ = _ffmpeg_fingerprint(ffmpeg)
+    except (subprocess.TimeoutExpired, OSError, IndexError) as e:
+        print(f"⚠️ FFmpeg não encontrado para o probe de capacidades: {e}")
+        _capabilities = Capabilities("", "", [], [], ["libx264"])
+        return _capabilities
+
+    if not refresh and CAPABILITIES_CACHE.exists():
+        try:
+            with open(CAPABILITIES_CACHE, "r", encoding="utf-8") as f:
+                cached = Capabilities.from_dict(json.load(f))
+            if cached.fingerprint == fingerprint:
+                _capabilities = cached
+                return _capabilities
+        except (OSError, ValueError, KeyError):
+            pass
+
+    print("🔍 Detectando encoders disponíveis (executado uma vez por host)...")
+    _capabilities = probe_capabilities()
+    try:
+        CAPABILITIES_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        with open(CAPABILITIES_CACHE, "w", encoding="utf-8") as f:
+            json.dump(_capabilities.to_dict(), f, indent=2)
+    except OSError as e:
+        print(f"⚠️ Não foi possível salvar o cache de capacidades: {e}")
+    print(f"   Encoders funcionais: {', '.join(_capabilities.working_encoders) or 'nenhum'}")
+    return _capabilities
+
 def detect_amd_gpu():
     """
-    Detecta se há uma GPU AMD disponível
+    Detecta se há uma GPU AMD utilizável (h264_amf passou no teste de codificação)
     """
+    return get_capabilities().amd_gpu
+
+# Perfis de codificação nomeados. "preset" vai para o write_videofile (o MoviePy
+# sempre envia -preset, "medium" por padrão; o h264_vaapi não tem essa opção e o
+# FFmpeg só avisa); "params" são os argumentos específicos do encoder. "pix_fmt"
+# é o formato de saída (padrão yuv420p); None deixa o formato para o filtro do
+# perfil, como no VAAPI, onde o hwupload entrega frames na GPU e um -pix_fmt
+# yuv420p quebraria a cadeia. Cada perfil passa por um teste de codificação com
+# o argv real no probe. Novos perfis podem ser adicionados com
+# register_encoder_profile().
+ENCODER_PROFILES = {
+    "amf_fast": {"encoder": "h264_amf", "params": [
+        "-profile:v", "main", "-quality", "speed", "-rc", "vbr_peak",
+        "-b:v", "3M", "-maxrate", "6M", "-bufsize", "6M"]},
+    "amf_balanced": {"encoder": "h264_amf", "params": [
+        "-profile:v", "main", "-quality", "speed", "-rc", "vbr_peak",
+        "-b:v", "5M", "-maxrate", "10M", "-bufsize", "10M"]},
+    "amf_high": {"encoder": "h264_amf", "params": [
+        "-profile:v", "main", "-quality", "balanced", "-rc", "vbr_peak",
+        "-b:v", "8M", "-maxrate", "15M", "-bufsize", "15M"]},
+    "vaapi_h264": {"encoder": "h264_vaapi", "pix_fmt": None, "params": [
+        "-vaapi_device", "/dev/dri/renderD128", "-vf", "format=nv12,hwupload", "-qp", "23"]},
+    "x264_ultrafast": {"encoder": "libx264", "preset": "ultrafast", "params": [
+        "-profile:v", "main", "-crf", "28", "-tune", "fastdecode"]},
+    "x264_faster": {"encoder": "libx264", "preset": "faster", "params": [
+        "-profile:v", "main", "-crf", "23", "-tune", "fastdecode"]},
+    "x264_veryfast": {"encoder": "libx264", "preset": "veryfast", "params": [
+        "-profile:v", "main", "-crf", "23"]},
+    "x264_fast": {"encoder": "libx264", "preset": "fast", "params": [
+        "-profile:v", "main", "-crf", "20"]},
+    "x264_medium": {"encoder": "libx264", "preset": "medium", "params": [
+        "-profile:v", "main", "-crf", "21"]},
+    "x265_medium": {"encoder": "libx265", "preset": "medium", "params": [
+        "-crf", "26", "-tag:v", "hvc1"]},
+    "svtav1_8": {"encoder": "libsvtav1", "preset": "8", "params": [
+        "-crf", "35"]},
+}
+
+# Mapeamento do parâmetro legado "quality" para perfis
+QUALITY_PROFILES = {
+    "cpu": {"fast": "x264_ultrafast", "balanced": "x264_faster", "high": "x264_fast"},
+    "gpu": {"fast": "amf_fast", "balanced": "amf_balanced", "high": "amf_high"},
+}
+
+# Tabela velocidade/qualidade medida por `python -m modules.video_optimizer --calibrate`
+ENCODER_TABLE_CACHE = CAPABILITIES_CACHE.parent / "encoder_table.json"
+
+def register_encoder_profile(name: str, encoder: str, params: list, preset: str = None,
+                             pix_fmt: str = "yuv420p"):
+    """Registra (ou substitui) um perfil de codificação"""
+    profile = {"encoder": encoder, "params": list(params)}
+    if preset:
+        profile["preset"] = preset
+    if pix_fmt != "yuv420p":
+        profile["pix_fmt"] = pix_fmt
+    ENCODER_PROFILES[name] = profile
+
+def available_profiles() -> list:
+    """Perfis cujo encoder passou no teste de codificação deste host"""
+    caps = get_capabilities()
+    return [name for name in ENCODER_PROFILES if caps.has_profile(name)]
+
+def load_encoder_table() -> dict:
+    """Carrega a tabela de calibração se ela for deste FFmpeg/host"""
     try:
-        # Windows - verifica via PowerShell
-        if platform.system() == "Windows":
-            result = subprocess.run(
-                ["powershell", "Get-WmiObject -Class Win32_VideoController | Where-Object {$_.Name -like '*AMD*' -or $_.Name -like '*Radeon*'} | Select-Object Name"],
-                capture_output=True, text=True, timeout=10
-            )
-            if "AMD" in result.stdout or "Radeon" in result.stdout:
-                return True
-        
-        # Linux - verifica via lspci
-        elif platform.system() == "Linux":
-            result = subprocess.run(
-                ["lspci", "-v"], capture_output=True, text=True, timeout=10
-            )
-            if "AMD" in result.stdout or "Radeon" in result.stdout:
-                return True
-        
-        # macOS - verifica via system_profiler
-        elif platform.system() == "Darwin":
-            result = subprocess.run(
-                ["system_profiler", "SPDisplaysDataType"], capture_output=True, text=True, timeout=10
-            )
-            if "AMD" in result.stdout or "Radeon" in result.stdout:
-                return True
-                
-    except Exception as e:
-        print(f"Erro ao detectar GPU AMD: {e}")
-    
-    return False
+        with open(ENCODER_TABLE_CACHE, "r", encoding="utf-8") as f:
+            table = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if table.get("fingerprint") != get_capabilities().fingerprint:
+        return {}
+    return table.get("profiles", {})
+
+def select_encoder_profile(use_gpu=True, quality="balanced", profile=None, max_seconds_per_minute=None) -> str:
+    """
+    Escolhe o perfil de codificação.
+
+    Prioridade: perfil nomeado (se o encoder funcionar) → meta de velocidade
+    (`max_seconds_per_minute`, usando a tabela calibrada: o perfil de menor
+    bitrate que cumpre a meta, ou o mais rápido se nenhum cumprir) → mapeamento
+    legado de `quality`.
+    """
+    available = available_profiles()
+    if profile:
+        if profile in available:
+            return profile
+        print(f"⚠️ Perfil '{profile}' indisponível neste host, usando seleção automática")
+
+    if max_seconds_per_minute:
+        table = {name: row for name, row in load_encoder_table().items() if name in available}
+        if table:
+            within = [name for name, row in table.items() if row["seconds_per_minute"] <= max_seconds_per_minute]
+            if within:
+                return min(within, key=lambda name: table[name]["kbps"])
+            return min(table, key=lambda name: table[name]["seconds_per_minute"])
+        print("⚠️ Sem tabela de calibração; execute 'python -m modules.video_optimizer --calibrate'")
 
-def get_optimal_ffmpeg_params(use_gpu=True, quality="balanced"):
+    quality = quality if quality in QUALITY_PROFILES["cpu"] else "balanced"
+    if use_gpu:
+        gpu_profile = QUALITY_PROFILES["gpu"][quality]
+        if gpu_profile in available:
+            return gpu_profile
+    return QUALITY_PROFILES["cpu"][quality]
+
+def get_optimal_ffmpeg_params(use_gpu=True, quality="balanced", profile=None):
     """
     Retorna parâmetros otimizados do FFmpeg baseado na configuração
     """
-    base_params = [
-        "-profile:v", "main",
-        "-pix_fmt", "yuv420p",
+    name = profile or select_encoder_profile(use_gpu, quality)
+    encoder_profile = ENCODER_PROFILES[name]
+    pix_fmt = encoder_profile.get("pix_fmt", "yuv420p")
+    base_params = ["-pix_fmt", pix_fmt] if pix_fmt else []
+    base_params += [
         "-movflags", "+faststart",  # Otimiza para streaming
         "-g", "30",  # GOP size otimizado para 30fps
     ]
-    
-    if use_gpu and detect_amd_gpu():
-        # Parâmetros para GPU AMD (AMF - AMD Media Framework)
-        gpu_params = [
-            "-c:v", "h264_amf",  # Codec AMD
-            "-quality", "speed",  # Prioriza velocidade
-            "-rc", "vbr_peak",  # Rate control otimizado
-            "-b:v", "5M",  # Bitrate base
-            "-maxrate", "10M",  # Bitrate máximo
-            "-bufsize", "10M",  # Buffer size
-            "-profile:v", "main",  # Perfil de codificação
-        ]
-        
-        if quality == "high":
-            gpu_params.extend(["-b:v", "8M", "-maxrate", "15M"])
-        elif quality == "fast":
-            gpu_params.extend(["-b:v", "3M", "-maxrate", "6M"])
-            
-        return gpu_params  # Retorna apenas parâmetros AMD, sem base_params
-    
-    else:
-        # Parâmetros otimizados para CPU
-        cpu_params = [
-            "-c:v", "libx264",
-            "-preset", "faster",  # Mais rápido que 'fast'
-            "-crf", "23",  # Qualidade constante
-            "-tune", "fastdecode",  # Otimizado para decodificação rápida
-        ]
-        
-        if quality == "high":
-            cpu_params.extend(["-preset", "fast", "-crf", "20"])
-        elif quality == "fast":
-            cpu_params.extend(["-preset", "ultrafast", "-crf", "28"])
-            
-        return base_params + cpu_params
+    return base_params + encoder_profile["params"]
 
 def get_optimal_audio_params():
     """
@@ -126,31 +321,55 @@ def get_ffmpeg_threads_param():
         threads = 8
     return ["-threads", str(threads)]
 
-def create_optimized_write_params(use_gpu=True, quality="balanced"):
+def create_optimized_write_params(use_gpu=True, quality="balanced", profile=None, max_seconds_per_minute=None):
     """
     Cria parâmetros otimizados para write_videofile
     """
-    settings = optimize_video_processing_settings()
-    
-    # Parâmetros base
+    name = select_encoder_profile(use_gpu, quality, profile, max_seconds_per_minute)
+    return profile_write_params(name)
+
+def profile_write_params(name: str) -> dict:
+    """Parâmetros de write_videofile de um perfil já escolhido"""
+    encoder_profile = ENCODER_PROFILES[name]
     params = {
-        "codec": "h264_amf" if (use_gpu and settings["use_gpu"]) else "libx264",
+        "codec": encoder_profile["encoder"],
         "fps": 30,
         "audio_codec": "aac",
-        "ffmpeg_params": get_optimal_ffmpeg_params(use_gpu, quality) + get_optimal_audio_params() + get_ffmpeg_threads_param(),
+        "ffmpeg_params": get_optimal_ffmpeg_params(profile=name) + get_optimal_audio_params() + get_ffmpeg_threads_param(),
     }
-    
-    # Ajusta preset apenas para libx264 (AMD não usa preset)
-    if params["codec"] == "libx264":
-        if quality == "fast":
-            params["preset"] = "ultrafast"
-        elif quality == "high":
-            params["preset"] = "fast"
-        else:
-            params["preset"] = "faster"
+    if encoder_profile.get("preset"):
+        params["preset"] = encoder_profile["preset"]
     
     return params
 
+def moviepy_video_args(write_params: dict) -> list:
+    """
+    Argumentos de saída que o FFMPEG_VideoWriter do MoviePy 1.0.3 monta para
+    estes write_params (-vcodec, -preset, ffmpeg_params e o -pix_fmt que ele
+    acrescenta para libx264), para testar/calibrar com o mesmo argv do render
+    """
+    codec = write_params["codec"]
+    args = ["-vcodec", codec, "-preset", write_params.get("preset", "medium")]
+    args += write_params.get("ffmpeg_params", [])
+    if codec == "libx264":
+        args += ["-pix_fmt", "yuv420p"]
+    return args
+
+def write_videofile_with_fallback(clip, outfile: str, write_params: dict):
+    """
+    Renderiza o clip; se um encoder diferente do libx264 falhar, refaz com o
+    fallback de CPU
+    """
+    try:
+        clip.write_videofile(str(outfile), **write_params)
+    except Exception as e:
+        if write_params.get("codec") == "libx264":
+            raise
+        print(f"⚠️ Erro no codec {write_params.get('codec')} ({e}), usando fallback para CPU...")
+        fallback_params = create_fallback_params()
+        print(f"🔄 Renderizando com fallback: {fallback_params['codec']}")
+        clip.write_videofile(str(outfile), **fallback_params)
+
 def print_optimization_info():
     """
     Imprime informações sobre as otimizações aplicadas
@@ -187,4 +406,62 @@ def create_fallback_params():
             "-ar", "44100",
             "-ac", "2",
         ] + get_ffmpeg_threads_param()
-    } 
\ No newline at end of file
+    }
+
+def calibrate_encoders(duration: float = 4.0, size: str = "1080x1920") -> dict:
+    """
+    Mede cada perfil disponível num vídeo sintético (testsrc2) e grava a tabela
+    velocidade/qualidade: segundos por minuto de saída, bitrate e SSIM.
+    """
+    import time
+
+    ffmpeg = get_ffmpeg_binary()
+    source = f"testsrc2=size={size}:rate=30"
+    rows = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in available_profiles():
+            out = Path(tmp) / f"{name}.mp4"
+            cmd = ["-y", "-loglevel", "error", "-f", "lavfi", "-i", source, "-t", str(duration)]
+            cmd += moviepy_video_args(profile_write_params(name)) + [str(out)]
+            print(f"⏱️ Calibrando {name}...")
+            started = time.perf_counter()
+            result = _run_ffmpeg(ffmpeg, cmd, timeout=600)
+            elapsed = time.perf_counter() - started
+            if result.returncode != 0 or not out.exists():
+                print(f"   ❌ Falhou: {result.stderr.strip()[-200:]}")
+                continue
+
+            ssim = None
+            ssim_run = _run_ffmpeg(ffmpeg, ["-i", str(out), "-f", "lavfi", "-i", source, "-t", str(duration),
+                                            "-lavfi", "[0:v][1:v]ssim", "-f", "null", "-"], timeout=600)
+            for line in ssim_run.stderr.splitlines():
+                if "All:" in line:
+                    ssim = float(line.split("All:")[1].split()[0])
+
+            rows[name] = {
+                "seconds_per_minute": round(elapsed * 60 / duration, 2),
+                "kbps": round(out.stat().st_size * 8 / duration / 1000, 1),
+                "ssim": ssim,
+            }
+            print(f"   ✅ {rows[name]['seconds_per_minute']}s/min, {rows[name]['kbps']} kbps, SSIM {ssim}")
+
+    table = {"fingerprint": get_capabilities().fingerprint, "size": size, "profiles": rows}
+    ENCODER_TABLE_CACHE.parent.mkdir(parents=True, exist_ok=True)
+    with open(ENCODER_TABLE_CACHE, "w", encoding="utf-8") as f:
+        json.dump(table, f, indent=2)
+    print(f"✅ Tabela salva em {ENCODER_TABLE_CACHE}")
+    return rows
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Capacidades e calibração de encoders")
+    parser.add_argument("--calibrate", action="store_true",
+                        help="Mede velocidade/qualidade de cada perfil e salva a tabela")
+    args = parser.parse_args()
+
+    # Refaz o probe e mostra as capacidades
+    caps = get_capabilities(refresh=True)
+    print(json.dumps(caps.to_dict(), indent=2))
+    print(f"Perfis disponíveis: {', '.join(available_profiles())}")
+    if args.calibrate:
+        calibrate_encoders()
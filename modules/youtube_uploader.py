@@ -1,12 +1,12 @@
 import os
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google.auth.exceptions import RefreshError
 from pathlib import Path
 import json
+from modules.resumable_upload import ResumableUpload, DEFAULT_CHUNK_SIZE
 
 # Escopos mais específicos para reduzir problemas de verificação
 SCOPES = [
@@ -14,6 +14,10 @@ SCOPES = [
     "https://www.googleapis.com/auth/youtube"
 ]
 TOKEN_CACHE = "token.json"
+# Aponta o cliente para outro servidor (ex.: python -m modules.fake_youtube), sem OAuth
+API_ENDPOINT = os.environ.get("YOUTUBE_API_ENDPOINT")
+API_ROOT = API_ENDPOINT or "https://www.googleapis.com/"
+INSERT_URL = API_ROOT.rstrip("/") + "/upload/youtube/v3/videos?uploadType=resumable&part=snippet,status&fields=id"
 
 def load_cached_token():
     """Carrega o token salvo do cache"""
@@ -44,15 +48,15 @@ def save_token_to_cache(creds):
     except Exception as e:
         print(f"⚠️  Erro ao salvar token: {e}")
 
-def youtube_service(secret_json="client_secret.json"):
-    """Inicializa o serviço do YouTube com autenticação OAuth2 e cache de token"""
+def youtube_credentials(secret_json="client_secret.json"):
+    """Credenciais OAuth2 do YouTube (token do cache, renovado ou nova autenticação)"""
     try:
         # Tenta carregar token do cache
         creds = load_cached_token()
         
         if creds and creds.valid:
             print("✅ Usando token salvo do cache")
-            return build("youtube", "v3", credentials=creds)
+            return creds
         
         # Se o token expirou, tenta renovar
         if creds and creds.expired and creds.refresh_token:
@@ -60,7 +64,7 @@ def youtube_service(secret_json="client_secret.json"):
                 print("🔄 Renovando token expirado...")
                 creds.refresh(Request())
                 save_token_to_cache(creds)
-                return build("youtube", "v3", credentials=creds)
+                return creds
             except RefreshError:
                 print("⚠️  Token expirado e não foi possível renovar")
                 # Remove token inválido
@@ -84,7 +88,7 @@ def youtube_service(secret_json="client_secret.json"):
         # Salva o token no cache
         save_token_to_cache(creds)
         
-        return build("youtube", "v3", credentials=creds)
+        return creds
         
     except Exception as e:
         print(f"Erro na autenticação: {e}")
@@ -95,20 +99,47 @@ def youtube_service(secret_json="client_secret.json"):
         print("4. Adicione o email da conta que você está usando")
         raise
 
+def youtube_service(secret_json="client_secret.json"):
+    """Inicializa o serviço do YouTube com autenticação OAuth2 e cache de token"""
+    if API_ENDPOINT:
+        from google.auth.credentials import AnonymousCredentials
+        print(f"🧪 Usando endpoint alternativo do YouTube: {API_ENDPOINT}")
+        return build("youtube", "v3", credentials=AnonymousCredentials(),
+                     client_options={"api_endpoint": API_ENDPOINT}, static_discovery=True)
+    return build("youtube", "v3", credentials=youtube_credentials(secret_json))
+
+def _auth_headers(secret_json: str):
+    """Callback de autenticação do ResumableUpload (sem OAuth no endpoint alternativo)"""
+    if API_ENDPOINT:
+        print(f"🧪 Usando endpoint alternativo do YouTube: {API_ENDPOINT}")
+        return None
+    creds = youtube_credentials(secret_json)
+
+    def headers(refresh: bool) -> dict:
+        if refresh or not creds.valid:
+            creds.refresh(Request())
+            save_token_to_cache(creds)
+        return {"Authorization": f"Bearer {creds.token}"}
+    return headers
+
 def upload(
         video_path: str, 
         title: str, 
         description: str, 
         tags=None,
-        secret_json="client_secret.json"
+        secret_json="client_secret.json",
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        session_store=None
     ):
-    """Faz upload de um vídeo para o YouTube"""
+    """
+    Faz upload de um vídeo para o YouTube em pedaços de `chunk_size` bytes.
+    Com `session_store`, a sessão resumível sobrevive a reinícios: o próximo
+    upload do mesmo arquivo continua do último byte confirmado.
+    """
     
     tags = tags or ["podcast", "cortes", "clipverso"]
     
     try:
-        yt = youtube_service(secret_json)
-        
         body = {
             "snippet": {
                 "title": title,
@@ -118,22 +149,19 @@ def upload(
             "status": {"privacyStatus": "public"}
         }
         
-        media = MediaFileUpload(video_path, chunksize=-1, resumable=True)
-        request = yt.videos().insert(
-            part="snippet,status",
-            body=body,
-            media_body=media,
-            fields="id"
-        )
+        request = ResumableUpload(INSERT_URL, video_path, body, content_type="video/mp4",
+                                  chunk_size=chunk_size, store=session_store,
+                                  auth=_auth_headers(secret_json))
+        
+        def progress(offset, total):
+            print(f"Upload progresso: {int(offset * 100 / total) if total else 100}%")
         
-        response = None
-        while response is None:
-            status, response = request.next_chunk()
-            if status:
-                print(f"Upload progresso: {int(status.progress() * 100)}%")
+        response = request.run(on_progress=progress)
         
         video_id = response.get("id")
         print(f"Upload concluído! ID do vídeo: {video_id}")
+        if request.bytes_sent > request.size:
+            print(f"   • Reenviados após falhas: {(request.bytes_sent - request.size) / 1024 / 1024:.1f} MB")
         return video_id
         
     except Exception as e:
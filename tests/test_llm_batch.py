@@ -0,0 +1,189 @@
+# tests/test_llm_batch.py
+"""
+LLMBatch contra a Batch API falsa de modules/fake_openai_batch.py.
+
+O fluxo completo (submit/wait) usa o cliente `openai` e é pulado quando ele
+não está instalado; estado local, descarte e o próprio servidor falso só
+usam a biblioteca padrão.
+"""
+import importlib.util
+import json
+import os
+import tempfile
+import unittest
+import uuid
+from pathlib import Path
+from urllib.request import Request, urlopen
+
+from modules import llm_utils
+from modules.fake_openai_batch import start_fake_openai_batch
+from modules.llm_utils import LLMBatch
+
+HAS_OPENAI = all(importlib.util.find_spec(name) for name in ("openai", "dotenv"))
+MESSAGES = [{"role": "user", "content": "Escolha os highlights"}]
+
+class BatchStateTest(unittest.TestCase):
+    """Estado local do lote (sem API)"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.batch_dir = Path(self.tmp.name) / "batches"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_state_is_written_only_on_submit(self):
+        batch = LLMBatch(str(self.batch_dir), "lote")
+        batch.add("ep1", "highlighter", MESSAGES)
+        batch.set_extra("ep1", {"episode_url": "https://youtu.be/1"})
+        self.assertTrue(batch.requests_path.exists())
+        self.assertFalse(batch.state_path.exists())
+
+    def test_discard_unsubmitted_keeps_submitted(self):
+        orphan = LLMBatch(str(self.batch_dir), "batch_1_orfao")
+        orphan.add("ep1", "highlighter", MESSAGES)
+        sent = LLMBatch(str(self.batch_dir), "batch_2_enviado")
+        sent.add("ep2", "highlighter", MESSAGES)
+        sent.batch_id = "batch_abc"
+        sent.save_state()
+
+        self.assertEqual(LLMBatch.discard_unsubmitted(str(self.batch_dir)), 1)
+        self.assertFalse(orphan.requests_path.exists())
+        self.assertTrue(sent.requests_path.exists() and sent.state_path.exists())
+
+    def test_find_pending_returns_latest_submitted_with_progress(self):
+        for name, batch_id in (("batch_1", "batch_old"), ("batch_2", "batch_new"), ("batch_3", None)):
+            batch = LLMBatch(str(self.batch_dir), name)
+            batch.add("ep1", "highlighter", MESSAGES, extra={"episode_url": "https://youtu.be/1"})
+            batch.batch_id = batch_id
+            batch.save_state()
+        pending = LLMBatch.find_pending(str(self.batch_dir))
+        self.assertEqual(pending.batch_id, "batch_new")
+
+        pending.collected = ["ep1"]
+        pending.mark_consumed("ep1")
+        reloaded = LLMBatch.load(pending.state_path)
+        self.assertEqual(reloaded.consumed, ["ep1"])
+        self.assertEqual(reloaded.collected, ["ep1"])
+        self.assertEqual(reloaded.entries["ep1"]["extra"]["episode_url"], "https://youtu.be/1")
+
+class FakeBatchServerTest(unittest.TestCase):
+    """Rotas do servidor falso, com urllib"""
+
+    def setUp(self):
+        self.server = start_fake_openai_batch(polls_until_complete=1)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def call(self, method: str, path: str, body: bytes = None, content_type: str = "application/json"):
+        request = Request(f"{self.server.endpoint}{path}", data=body, method=method,
+                          headers={"Content-Type": content_type})
+        with urlopen(request) as response:
+            return response.read()
+
+    def test_upload_create_retrieve_and_download(self):
+        lines = "".join(json.dumps({"custom_id": cid, "method": "POST", "url": "/v1/chat/completions",
+                                    "body": {"model": "gpt-4o", "messages": MESSAGES}}) + "\n"
+                        for cid in ("ep1", "ep2"))
+        boundary = uuid.uuid4().hex
+        multipart = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"purpose\"\r\n\r\nbatch\r\n"
+                     f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"in.jsonl\"\r\n"
+                     f"Content-Type: application/octet-stream\r\n\r\n{lines}\r\n--{boundary}--\r\n").encode()
+        uploaded = json.loads(self.call("POST", "/files", multipart, f"multipart/form-data; boundary={boundary}"))
+        self.assertEqual(uploaded["purpose"], "batch")
+        self.assertEqual(uploaded["bytes"], len(lines.encode()))
+
+        self.server.responses["ep1"] = '{"highlights": [{"idx": 0}]}'
+        self.server.fail_requests("ep2")
+        job = json.loads(self.call("POST", "/batches", json.dumps({
+            "input_file_id": uploaded["id"], "endpoint": "/v1/chat/completions", "completion_window": "24h"}).encode()))
+        self.assertEqual(json.loads(self.call("GET", f"/batches/{job['id']}"))["status"], "in_progress")
+        done = json.loads(self.call("GET", f"/batches/{job['id']}"))
+        self.assertEqual(done["status"], "completed")
+        self.assertEqual(done["request_counts"], {"total": 2, "completed": 1, "failed": 1})
+
+        output = [json.loads(l) for l in self.call("GET", f"/files/{done['output_file_id']}/content").splitlines()]
+        errors = [json.loads(l) for l in self.call("GET", f"/files/{done['error_file_id']}/content").splitlines()]
+        self.assertEqual(output[0]["custom_id"], "ep1")
+        self.assertEqual(output[0]["response"]["body"]["choices"][0]["message"]["content"],
+                         self.server.responses["ep1"])
+        self.assertEqual(errors[0]["custom_id"], "ep2")
+        self.assertEqual(errors[0]["response"]["status_code"], 400)
+
+@unittest.skipUnless(HAS_OPENAI, "cliente openai não instalado")
+class BatchFlowTest(unittest.TestCase):
+    """prepare → submit → wait → coleta, contra o servidor falso"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.batch_dir = str(Path(self.tmp.name) / "batches")
+        self.server = start_fake_openai_batch(polls_until_complete=1)
+        self._env = {k: os.environ.get(k) for k in ("OPENAI_BASE_URL", "OPENAI_API_KEY")}
+        os.environ["OPENAI_BASE_URL"] = self.server.endpoint
+        os.environ["OPENAI_API_KEY"] = "fake"
+        llm_utils.LLM_STATS.clear()
+
+    def tearDown(self):
+        for key, value in self._env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        llm_utils.LLM_STATS.clear()
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def prepare(self) -> LLMBatch:
+        batch = LLMBatch(self.batch_dir)
+        for cid in ("ep1", "ep2"):
+            llm_utils.call_llm(role="highlighter", messages=MESSAGES, batch=batch, custom_id=cid)
+            batch.set_extra(cid, {"episode_url": f"https://youtu.be/{cid}"})
+        return batch
+
+    def test_submit_wait_collect(self):
+        batch = self.prepare()
+        self.server.responses["ep1"] = '{"highlights": [{"idx": 3}]}'
+        batch.submit()
+        self.assertTrue(batch.state_path.exists())
+
+        results = batch.wait(poll_interval=0)
+        self.assertEqual(results, {"ep1": '{"highlights": [{"idx": 3}]}', "ep2": '{"highlights": []}'})
+        self.assertEqual(self.server.retrievals, 2)
+        self.assertEqual(llm_utils.LLM_STATS["highlighter"]["calls"], 2)
+        self.assertEqual(sorted(LLMBatch.load(batch.state_path).collected), ["ep1", "ep2"])
+
+    def test_failed_request_yields_none(self):
+        batch = self.prepare()
+        self.server.fail_requests("ep2")
+        batch.submit()
+        error_log = Path(self.tmp.name) / "erros.log"
+        original = llm_utils.ERROR_LOG
+        llm_utils.ERROR_LOG = str(error_log)
+        try:
+            results = batch.wait(poll_interval=0)
+        finally:
+            llm_utils.ERROR_LOG = original
+        self.assertIsNone(results["ep2"])
+        self.assertIn("ep2", error_log.read_text(encoding="utf-8"))
+
+    def test_resumed_batch_records_usage_once_and_skips_consumed(self):
+        batch = self.prepare()
+        batch.submit()
+        batch.wait(poll_interval=0)
+        batch.mark_consumed("ep1")
+        usd = llm_utils.LLM_STATS["highlighter"]["usd"]
+
+        # Novo processo: retoma o lote pelo estado em disco
+        resumed = LLMBatch.find_pending(self.batch_dir)
+        self.assertEqual(resumed.batch_id, batch.batch_id)
+        results = resumed.wait(poll_interval=0)
+        self.assertEqual(set(results), {"ep1", "ep2"})
+        self.assertEqual(resumed.consumed, ["ep1"])
+        self.assertEqual(llm_utils.LLM_STATS["highlighter"]["calls"], 2)
+        self.assertEqual(llm_utils.LLM_STATS["highlighter"]["usd"], usd)
+
+if __name__ == "__main__":
+    unittest.main()
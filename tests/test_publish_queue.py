@@ -0,0 +1,299 @@
+# tests/test_publish_queue.py
+"""
+Fila de publicação (enqueue/claim_due/fail) e o UploadScheduler, com o envio
+real contra o YouTube falso de modules/fake_youtube.py. O teste do
+youtube_uploader padrão é pulado quando o cliente Google não está instalado.
+"""
+import importlib.util
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from modules import publish_queue, resumable_upload, state_db, storage
+from modules.fake_youtube import INSERT_PATH, start_fake_youtube
+from modules.publish_queue import UploadScheduler, UploadSessionStore
+from modules.resumable_upload import CHUNK_GRANULARITY, ResumableUpload
+
+CHUNK = CHUNK_GRANULARITY
+HAS_GOOGLE = all(importlib.util.find_spec(name) for name in ("googleapiclient", "google_auth_oauthlib"))
+
+class QueueTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.clips_dir = str(Path(self.tmp.name) / "clips")
+        self.video_dir = Path(self.clips_dir) / "episodio"
+        self.video_dir.mkdir(parents=True)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def clip(self, name: str, size: int = None) -> dict:
+        """Corte com o arquivo criado (`size` bytes) ou ausente (size=None)"""
+        path = self.video_dir / f"{name}.mp4"
+        if size is not None:
+            path.write_bytes(os.urandom(size))
+        return {"clip_path": str(path), "video_dir": str(self.video_dir), "hook": f"Gancho {name}",
+                "description": "Descrição", "tags": ["podcast"], "episode_url": "https://youtu.be/ep",
+                "video_info": {"title": "Episódio", "channel": "Canal"}}
+
+    def row(self, clip: dict) -> dict:
+        row = state_db.connect(self.clips_dir).execute(
+            "SELECT * FROM publish_queue WHERE clip_path = ?", (clip["clip_path"],)).fetchone()
+        return dict(row) if row else None
+
+class QueueTest(QueueTestCase):
+    """enqueue, claim_due e fail direto no banco"""
+
+    def test_enqueue_spaces_clips_by_delay(self):
+        delay = {"min_seconds": 600, "max_seconds": 600}
+        clips = [self.clip(f"c{i}") for i in range(3)]
+        before = time.time()
+        self.assertEqual(publish_queue.enqueue(self.clips_dir, clips, delay), 3)
+        times = [self.row(c)["publish_at"] for c in clips]
+        self.assertGreaterEqual(times[0], before)
+        self.assertLessEqual(times[0], time.time())
+        self.assertEqual([b - a for a, b in zip(times, times[1:])], [600, 600])
+
+        # Já na fila ou já enviado: não entra de novo; um novo continua depois do último
+        late = self.clip("c3")
+        sent = dict(self.clip("c4"), uploaded=True)
+        self.assertEqual(publish_queue.enqueue(self.clips_dir, clips + [late, sent], delay), 1)
+        self.assertEqual(self.row(late)["publish_at"], times[2] + 600)
+        self.assertIsNone(self.row(sent))
+
+    def test_claim_due_takes_over_expired_lease(self):
+        clip = self.clip("c0", size=10)
+        publish_queue.enqueue(self.clips_dir, [clip])
+        now = time.time() + 1
+        self.assertEqual([r["clip_path"] for r in publish_queue.claim_due(self.clips_dir, now)], [clip["clip_path"]])
+        self.assertEqual(self.row(clip)["status"], "uploading")
+
+        # Outro processo não pega o corte enquanto o lease vale
+        self.assertEqual(publish_queue.claim_due(self.clips_dir, now + 60), [])
+        # Processo que morreu no meio: depois de LEASE_S o corte volta a ser reivindicado
+        retaken = publish_queue.claim_due(self.clips_dir, now + publish_queue.LEASE_S + 1)
+        self.assertEqual([r["clip_path"] for r in retaken], [clip["clip_path"]])
+        self.assertEqual(self.row(clip)["claimed_at"], now + publish_queue.LEASE_S + 1)
+
+    def test_claim_due_skips_future_clips(self):
+        clips = [self.clip("c0"), self.clip("c1")]
+        publish_queue.enqueue(self.clips_dir, clips, {"min_seconds": 3600, "max_seconds": 3600})
+        self.assertEqual([r["clip_path"] for r in publish_queue.claim_due(self.clips_dir)], [clips[0]["clip_path"]])
+        self.assertEqual(publish_queue.next_due(self.clips_dir), self.row(clips[1])["publish_at"])
+
+    def test_fail_backs_off_exponentially_until_failed(self):
+        clip = self.clip("c0", size=10)
+        publish_queue.enqueue(self.clips_dir, [clip])
+        for attempt in range(1, publish_queue.MAX_ATTEMPTS + 1):
+            (row,) = publish_queue.claim_due(self.clips_dir, time.time() + 10 ** 6)
+            before = time.time()
+            publish_queue.fail(self.clips_dir, row, "HTTP 503")
+            row = self.row(clip)
+            self.assertEqual(row["attempts"], attempt)
+            self.assertEqual(row["last_error"], "HTTP 503")
+            wait = publish_queue.RETRY_BASE_S * 2 ** (attempt - 1)
+            self.assertGreaterEqual(row["publish_at"], before + wait)
+            self.assertLessEqual(row["publish_at"], time.time() + wait)
+        self.assertEqual(row["status"], "failed")
+        self.assertEqual(publish_queue.claim_due(self.clips_dir, time.time() + 10 ** 6), [])
+
+    def test_failed_clip_is_requeued_keeping_attempts(self):
+        clip = self.clip("c0", size=10)
+        publish_queue.enqueue(self.clips_dir, [clip])
+        for _ in range(publish_queue.MAX_ATTEMPTS):
+            (row,) = publish_queue.claim_due(self.clips_dir, time.time() + 10 ** 6)
+            publish_queue.fail(self.clips_dir, row, "HTTP 503")
+
+        self.assertEqual(publish_queue.enqueue(self.clips_dir, [clip]), 1)
+        row = self.row(clip)
+        self.assertEqual((row["status"], row["attempts"]), ("scheduled", publish_queue.MAX_ATTEMPTS))
+        # Uma tentativa a mais: se falhar, volta direto para 'failed'
+        (row,) = publish_queue.claim_due(self.clips_dir)
+        publish_queue.fail(self.clips_dir, row, "HTTP 503")
+        self.assertEqual(self.row(clip)["status"], "failed")
+
+    def test_rejected_clip_waits_for_the_file(self):
+        clip = self.clip("c0")
+        publish_queue.enqueue(self.clips_dir, [clip])
+        (row,) = publish_queue.claim_due(self.clips_dir)
+        publish_queue.fail(self.clips_dir, row, "Arquivo não encontrado", permanent=True)
+        self.assertEqual(self.row(clip)["status"], "rejected")
+
+        self.assertEqual(publish_queue.enqueue(self.clips_dir, [clip]), 0)
+        Path(clip["clip_path"]).write_bytes(b"")
+        self.assertEqual(publish_queue.enqueue(self.clips_dir, [clip]), 0)
+        Path(clip["clip_path"]).write_bytes(b"mp4")
+        self.assertEqual(publish_queue.enqueue(self.clips_dir, [clip]), 1)
+        row = self.row(clip)
+        self.assertEqual((row["status"], row["attempts"]), ("scheduled", 0))
+
+class SchedulerTest(QueueTestCase):
+    """UploadScheduler enviando para o YouTube falso"""
+
+    def setUp(self):
+        super().setUp()
+        self._waits = resumable_upload.BACKOFF_BASE_S, publish_queue.ERROR_WAIT_S
+        resumable_upload.BACKOFF_BASE_S = 0
+        publish_queue.ERROR_WAIT_S = 0
+        self.server = start_fake_youtube()
+        self.init_url = f"{self.server.endpoint.rstrip('/')}{INSERT_PATH}?uploadType=resumable"
+        self.errors = []
+        self.scheduler = None
+
+    def tearDown(self):
+        if self.scheduler:
+            self.scheduler.stop()
+        resumable_upload.BACKOFF_BASE_S, publish_queue.ERROR_WAIT_S = self._waits
+        self.server.shutdown()
+        self.server.server_close()
+        super().tearDown()
+
+    def uploader(self, clip_info: dict) -> str:
+        store = UploadSessionStore(self.clips_dir, clip_info["clip_path"])
+        upload = ResumableUpload(self.init_url, clip_info["clip_path"], {"snippet": {"title": clip_info["hook"]}},
+                                 chunk_size=CHUNK, store=store)
+        return upload.run()["id"]
+
+    def start(self, clips: list, uploader=None, workers: int = 2) -> UploadScheduler:
+        with mock.patch("builtins.print"):
+            storage.save_upload_checkpoint(self.clips_dir, str(self.video_dir), "https://youtu.be/ep", clips)
+        publish_queue.enqueue(self.clips_dir, clips)
+        self.scheduler = UploadScheduler(self.clips_dir, uploader=uploader or self.uploader, workers=workers,
+                                         on_error=lambda message, url: self.errors.append(message)).start()
+        return self.scheduler
+
+    def test_publishes_due_clips_and_clears_checkpoint(self):
+        clips = [self.clip("c0", size=2 * CHUNK + 10), self.clip("c1", size=CHUNK)]
+        self.server.fail_next(1, status=503, keep_bytes=1000)
+        scheduler = self.start(clips)
+        self.assertTrue(scheduler.wait_idle(timeout=30))
+
+        self.assertEqual(sorted(u["size"] for u in self.server.uploads), [CHUNK, 2 * CHUNK + 10])
+        ids = {u["id"] for u in self.server.uploads}
+        self.assertEqual({self.row(c)["video_id"] for c in clips}, ids)
+        self.assertEqual({self.row(c)["status"] for c in clips}, {"done"})
+        self.assertEqual(scheduler.uploaded, 2)
+        self.assertIsNone(state_db.load_clips(self.clips_dir, str(self.video_dir)))
+        self.assertIsNone(state_db.load_upload_session(self.clips_dir, clips[0]["clip_path"]))
+        self.assertEqual(self.errors, [])
+
+    def test_upload_error_reschedules_with_backoff(self):
+        clip = self.clip("c0", size=CHUNK)
+        self.server.fail_next(1, status=403)
+        self.start([clip])
+        # Reagendado para daqui a RETRY_BASE_S: a fila não esvazia, então espera pelo estado
+        deadline = time.time() + 10
+        while self.row(clip)["status"] != "scheduled" or not self.errors:
+            self.assertLess(time.time(), deadline)
+            time.sleep(0.05)
+        row = self.row(clip)
+        self.assertEqual(row["attempts"], 1)
+        self.assertIn("403", row["last_error"])
+        self.assertGreater(row["publish_at"], time.time() + publish_queue.RETRY_BASE_S / 2)
+        self.assertEqual(self.server.uploads, [])
+
+    def test_missing_file_is_rejected(self):
+        clip = self.clip("c0")
+        scheduler = self.start([clip])
+        self.assertTrue(scheduler.wait_idle(timeout=30))
+        self.assertEqual(self.row(clip)["status"], "rejected")
+        self.assertEqual(scheduler.failed, 1)
+
+    def test_error_after_upload_keeps_scheduler_alive(self):
+        clips = [self.clip("c0", size=CHUNK), self.clip("c1", size=CHUNK)]
+        real = storage.mark_clip_uploaded
+        calls = []
+
+        def flaky(clips_dir, clip_info, video_id=None):
+            calls.append(clip_info["clip_path"])
+            if len(calls) == 1:
+                raise sqlite3.OperationalError("database is locked")
+            real(clips_dir, clip_info, video_id)
+
+        with mock.patch.object(storage, "mark_clip_uploaded", side_effect=flaky):
+            scheduler = self.start(clips, workers=1)
+            self.assertTrue(scheduler.wait_idle(timeout=30))
+
+        self.assertTrue(scheduler._thread.is_alive())
+        self.assertEqual(len(self.errors), 1)
+        self.assertIn("database is locked", self.errors[0])
+        # O corte já publicado não volta para a fila (nada de vídeo duplicado)
+        self.assertEqual(len(self.server.uploads), 2)
+        self.assertEqual({self.row(c)["status"] for c in clips}, {"done"})
+
+    def test_loop_error_is_reported_and_retried(self):
+        clip = self.clip("c0", size=CHUNK)
+        real = publish_queue.claim_due
+        calls = []
+
+        def flaky(clips_dir, now=None):
+            calls.append(clips_dir)
+            if len(calls) == 1:
+                raise sqlite3.OperationalError("database is locked")
+            return real(clips_dir, now)
+
+        with mock.patch.object(publish_queue, "claim_due", side_effect=flaky):
+            scheduler = self.start([clip])
+            self.assertTrue(scheduler.wait_idle(timeout=30))
+
+        self.assertTrue(scheduler._thread.is_alive())
+        self.assertIn("Erro no agendador de uploads", self.errors[0])
+        self.assertEqual(self.row(clip)["status"], "done")
+
+    def test_notify_wakes_scheduler_for_new_clips(self):
+        first = self.clip("c0", size=CHUNK)
+        scheduler = self.start([first])
+        self.assertTrue(scheduler.wait_idle(timeout=30))
+        second = self.clip("c1", size=CHUNK)
+        publish_queue.enqueue(self.clips_dir, [second])
+        scheduler.notify()
+        self.assertTrue(scheduler.wait_idle(timeout=30))
+        self.assertEqual(self.row(second)["status"], "done")
+        self.assertEqual(len(self.server.uploads), 2)
+
+@unittest.skipUnless(HAS_GOOGLE, "cliente Google não instalado")
+class YoutubeUploaderTest(QueueTestCase):
+    """Uploader padrão (youtube_uploader.upload) com YOUTUBE_API_ENDPOINT no servidor falso"""
+
+    def setUp(self):
+        super().setUp()
+        self.server = start_fake_youtube()
+        self._endpoint = os.environ.get("YOUTUBE_API_ENDPOINT")
+        os.environ["YOUTUBE_API_ENDPOINT"] = self.server.endpoint
+        # INSERT_URL é lido do ambiente na importação
+        sys.modules.pop("modules.youtube_uploader", None)
+
+    def tearDown(self):
+        if self._endpoint is None:
+            os.environ.pop("YOUTUBE_API_ENDPOINT", None)
+        else:
+            os.environ["YOUTUBE_API_ENDPOINT"] = self._endpoint
+        sys.modules.pop("modules.youtube_uploader", None)
+        self.server.shutdown()
+        self.server.server_close()
+        super().tearDown()
+
+    def test_scheduler_with_default_uploader(self):
+        clips = [self.clip("c0", size=2 * CHUNK + 10), self.clip("c1", size=CHUNK)]
+        with mock.patch("builtins.print"):
+            storage.save_upload_checkpoint(self.clips_dir, str(self.video_dir), "https://youtu.be/ep", clips)
+        publish_queue.enqueue(self.clips_dir, clips)
+        uploader = lambda clip_info: publish_queue.youtube_uploader(clip_info, self.clips_dir, chunk_size=CHUNK)
+        scheduler = UploadScheduler(self.clips_dir, uploader=uploader).start()
+        try:
+            self.assertTrue(scheduler.wait_idle(timeout=30))
+        finally:
+            scheduler.stop()
+
+        self.assertEqual(sorted(u["size"] for u in self.server.uploads), [CHUNK, 2 * CHUNK + 10])
+        self.assertEqual({self.row(c)["status"] for c in clips}, {"done"})
+        self.assertEqual({self.row(c)["video_id"] for c in clips}, {u["id"] for u in self.server.uploads})
+
+if __name__ == "__main__":
+    unittest.main()
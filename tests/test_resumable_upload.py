@@ -0,0 +1,176 @@
+# tests/test_resumable_upload.py
+"""
+Upload resumível contra o YouTube falso de modules/fake_youtube.py (só
+biblioteca padrão: roda sem Google, numpy ou MoviePy).
+"""
+import os
+import tempfile
+import unittest
+
+from modules import resumable_upload
+from modules.fake_youtube import INSERT_PATH, start_fake_youtube
+from modules.resumable_upload import CHUNK_GRANULARITY, ResumableUpload, ResumableUploadError
+
+CHUNK = CHUNK_GRANULARITY
+METADATA = {"snippet": {"title": "Corte de teste"}, "status": {"privacyStatus": "private"}}
+
+class MemoryStore:
+    """Mesmo contrato do UploadSessionStore, em memória"""
+
+    def __init__(self):
+        self.session = None
+
+    def load(self):
+        return self.session
+
+    def save(self, session):
+        self.session = dict(session)
+
+    def clear(self):
+        self.session = None
+
+class Crash(Exception):
+    """Simula o processo morrendo no meio do upload"""
+
+def crash(offset, total):
+    raise Crash()
+
+class ResumableUploadTest(unittest.TestCase):
+
+    def setUp(self):
+        # Sem espera real entre tentativas
+        self._backoff = resumable_upload.BACKOFF_BASE_S, resumable_upload.MAX_RETRIES
+        resumable_upload.BACKOFF_BASE_S = 0
+        self.server = start_fake_youtube()
+        self.init_url = f"{self.server.endpoint.rstrip('/')}{INSERT_PATH}?uploadType=resumable"
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        resumable_upload.BACKOFF_BASE_S, resumable_upload.MAX_RETRIES = self._backoff
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def make_file(self, size: int) -> str:
+        path = os.path.join(self.tmp.name, f"corte_{size}.mp4")
+        with open(path, "wb") as f:
+            f.write(os.urandom(size))
+        return path
+
+    def upload(self, path: str, store=None) -> ResumableUpload:
+        return ResumableUpload(self.init_url, path, METADATA, chunk_size=CHUNK, store=store)
+
+    def received_data(self) -> bytes:
+        (session,) = self.server.sessions.values()
+        return bytes(session["data"])
+
+    def assert_uploaded(self, path: str):
+        with open(path, "rb") as f:
+            content = f.read()
+        self.assertEqual(len(self.server.uploads), 1)
+        self.assertEqual(self.server.uploads[0]["size"], len(content))
+        self.assertEqual(self.received_data(), content)
+
+    def test_upload_in_chunks(self):
+        path = self.make_file(3 * CHUNK + 1000)
+        store = MemoryStore()
+        progress = []
+        response = self.upload(path, store).run(on_progress=lambda offset, total: progress.append(offset))
+        self.assert_uploaded(path)
+        self.assertEqual(response["id"], self.server.uploads[0]["id"])
+        self.assertEqual(progress, [CHUNK, 2 * CHUNK, 3 * CHUNK, 3 * CHUNK + 1000])
+        self.assertIsNone(store.session)
+
+    def test_retries_5xx_and_resumes_from_partial_bytes(self):
+        size = 3 * CHUNK + 1000
+        path = self.make_file(size)
+        self.server.fail_next(1, status=503, keep_bytes=100_000)
+        self.server.fail_next(1, status=502, keep_bytes=50_000)
+        upload = self.upload(path)
+        upload.run()
+        self.assert_uploaded(path)
+        # Cada falha reenvia só o que o servidor não confirmou, não o pedaço inteiro
+        self.assertEqual(upload.bytes_sent, size + (CHUNK - 100_000) + (CHUNK - 50_000))
+
+    def test_resumes_saved_session_after_crash(self):
+        size = 4 * CHUNK
+        path = self.make_file(size)
+        store = MemoryStore()
+
+        def crash_after_two_chunks(offset, total):
+            if offset >= 2 * CHUNK:
+                raise Crash()
+
+        with self.assertRaises(Crash):
+            self.upload(path, store).run(on_progress=crash_after_two_chunks)
+        self.assertEqual(store.session["offset"], 2 * CHUNK)
+
+        resumed = self.upload(path, store)
+        resumed.run()
+        self.assert_uploaded(path)
+        self.assertEqual(resumed.bytes_sent, size - 2 * CHUNK)
+        self.assertEqual(self.server.received, size)
+        self.assertIsNone(store.session)
+
+    def test_expired_session_restarts_upload(self):
+        size = 3 * CHUNK
+        path = self.make_file(size)
+        store = MemoryStore()
+        with self.assertRaises(Crash):
+            self.upload(path, store).run(on_progress=crash)
+        expired_id = store.session["session_uri"].rsplit("/", 1)[1]
+        self.server.sessions.clear()
+
+        restarted = self.upload(path, store)
+        restarted.run()
+        self.assert_uploaded(path)
+        self.assertEqual(restarted.bytes_sent, size)
+        self.assertNotIn(expired_id, self.server.sessions)
+
+    def test_changed_file_does_not_resume_old_session(self):
+        path = self.make_file(2 * CHUNK)
+        store = MemoryStore()
+        with self.assertRaises(Crash):
+            self.upload(path, store).run(on_progress=crash)
+        with open(path, "ab") as f:
+            f.write(b"x" * 10)
+
+        restarted = self.upload(path, store)
+        restarted.run()
+        self.assertEqual(restarted.bytes_sent, 2 * CHUNK + 10)
+        self.assertEqual(self.server.uploads[0]["size"], 2 * CHUNK + 10)
+
+    def test_non_retriable_4xx_fails_immediately(self):
+        path = self.make_file(2 * CHUNK)
+        self.server.fail_next(1, status=403)
+        upload = self.upload(path)
+        with self.assertRaises(ResumableUploadError) as ctx:
+            upload.run()
+        self.assertIn("403", str(ctx.exception))
+        self.assertEqual(upload.bytes_sent, CHUNK)
+        self.assertEqual(self.server.uploads, [])
+
+    def test_gives_up_after_max_retries(self):
+        resumable_upload.MAX_RETRIES = 2
+        path = self.make_file(2 * CHUNK)
+        self.server.fail_next(10, status=503)
+        upload = self.upload(path)
+        with self.assertRaises(ResumableUploadError) as ctx:
+            upload.run()
+        self.assertIn("Tentativas esgotadas", str(ctx.exception))
+        self.assertEqual(upload.bytes_sent, 3 * CHUNK)
+        self.assertEqual(len(self.server.faults), 10 - 3)
+        self.assertEqual(self.server.uploads, [])
+
+    def test_zero_byte_file(self):
+        path = self.make_file(0)
+        store = MemoryStore()
+        progress = []
+        response = self.upload(path, store).run(on_progress=lambda offset, total: progress.append((offset, total)))
+        self.assertEqual(self.server.uploads[0]["size"], 0)
+        self.assertEqual(response["id"], self.server.uploads[0]["id"])
+        self.assertEqual(progress, [(0, 0)])
+        self.assertIsNone(store.session)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,115 +1,85 @@
 # upload_clips.py
 """
 Script de upload para YouTube: python upload_clips.py
-Faz upload dos cortes gerados respeitando delays e checkpoints
+Agenda os cortes gerados na fila de publicação (modules/publish_queue.py)
+e publica nos horários calculados a partir de upload_delay
 """
-import sys, time, random
+import sys
+from functools import partial
 from dotenv import load_dotenv
-from modules import youtube_uploader, editor
-from modules.llm_utils import print_llm_report, save_cost_log, save_error_log
+from modules import storage, tracing, publish_queue
+from modules.llm_utils import print_llm_report, save_cost_log, save_error_log, prefetch_usd_brl
 from modules.config import load_cfg, process_payload_config
-from pathlib import Path
-from datetime import datetime
 
 load_dotenv()
 
+DEFAULT_UPLOAD_DELAY = {"min_seconds": 1800, "max_seconds": 3600}
+DEFAULT_UPLOAD_CHUNK_MB = 8
+
+def start_scheduler(cfg: dict) -> publish_queue.UploadScheduler:
+    """Sobe o agendador de publicação do diretório de clips de `cfg`"""
+    upload_mode = cfg.get("upload_mode", False)
+    if not upload_mode:
+        print("⚠️ MODO DE UPLOAD DESATIVADO - Uploads serão simulados")
+        print("   Configure upload_mode: true no config.json para upload real")
+    if upload_mode:
+        chunk_size = int(cfg.get("upload_chunk_mb", DEFAULT_UPLOAD_CHUNK_MB) * 1024 * 1024)
+        uploader = partial(publish_queue.youtube_uploader, clips_dir=cfg["paths"]["clips"], chunk_size=chunk_size)
+    else:
+        uploader = publish_queue.simulated_uploader
+    return publish_queue.UploadScheduler(cfg["paths"]["clips"], uploader=uploader,
+                                         workers=cfg.get("upload_workers", 2),
+                                         on_error=save_error_log).start()
+
+def upload_delay(cfg: dict) -> dict:
+    """Espaçamento entre publicações (uploads simulados não esperam)"""
+    if not cfg.get("upload_mode", False):
+        return {"min_seconds": 0, "max_seconds": 0}
+    return cfg.get("upload_delay", DEFAULT_UPLOAD_DELAY)
+
 def run_uploads():
-    """Executa o upload de todos os cortes"""
+    """Agenda os cortes pendentes na fila de publicação e espera a fila esvaziar"""
     payload = load_cfg()
     cfgs = process_payload_config(payload)
-    
+
+    # Uma varredura por diretório de clips, não uma por vídeo configurado
+    by_clips_dir = {}
     for cfg in cfgs:
-        # Listar todos os diretórios de vídeos em clips/
-        base_clips_dir = cfg["paths"]["clips"]
-        for video_dir in Path(base_clips_dir).iterdir():
-            if not video_dir.is_dir():
-                continue
-            # Carrega checkpoint de upload do diretório do vídeo
-            upload_checkpoint = editor.load_upload_checkpoint(str(video_dir))
-            if not upload_checkpoint:
-                continue
-            generated_clips = upload_checkpoint["generated_clips"]
-            episode_url = upload_checkpoint["episode_url"]
-            print(f"\n📤 INICIANDO UPLOAD DE {len(generated_clips)} CORTES PARA: {video_dir.name}")
-            print("=" * 60)
-            # Configurações de delay
-            upload_delay_config = cfg.get("upload_delay", {"min_seconds": 1800, "max_seconds": 3600})
-            if not cfg.get("upload_mode", False):
-                print("⚠️ MODO DE UPLOAD DESATIVADO - Uploads serão simulados")
-                print("   Configure upload_mode: true no config.json para upload real")
-            uploaded_count = 0
-            failed_count = 0
-            # Filtra apenas cortes não enviados
-            clips_to_upload = [c for c in generated_clips if not c.get("uploaded", False)]
-            for i, clip_info in enumerate(clips_to_upload, 1):
-                clip_path = clip_info["clip_path"]
-                hook = clip_info["hook"]
-                description = clip_info["description"]
-                tags = clip_info["tags"]
-                video_info = clip_info["video_info"]
-                print(f"\n📤 Upload {i}/{len(clips_to_upload)}: {hook}")
-                print(f"   Arquivo: {Path(clip_path).name}")
-                if not Path(clip_path).exists():
-                    print(f"   ❌ Arquivo não encontrado: {clip_path}")
-                    failed_count += 1
-                    continue
-                original_title = video_info.get('title', 'Vídeo Original')
-                original_channel = video_info.get('channel', 'Canal Original')
-                desc = f"""{description}\n\n🎬 Trecho extraído do episódio: \"{original_title}\"\n📺 Canal original: {original_channel}"""
-                tags_string = "#" + " #".join(tags)
-                desc += f"\n\n{tags_string}"
-                try:
-                    if cfg.get("upload_mode", True):
-                        # Delay antes do upload (exceto para o primeiro)
-                        if i > 1:
-                            random_time = random.randint(
-                                upload_delay_config["min_seconds"], 
-                                upload_delay_config["max_seconds"]
-                            )
-                            print(f"   ⏳ Aguardando {random_time}s antes do upload...")
-                            for remaining in range(random_time, 0, -1):
-                                minutes = remaining // 60
-                                seconds = remaining % 60
-                                print(f"\r   ⏳ Aguardando {minutes:02d}:{seconds:02d} antes do upload...", end="", flush=True)
-                                time.sleep(1)
-                            print()  # Nova linha após a contagem
-                        # Faz o upload
-                        youtube_uploader.upload(clip_path, hook, desc, tags=tags)
-                        print(f"   ✅ Upload concluído")
-                        uploaded_count += 1
-                        # Marca como enviado
-                        clip_info["uploaded"] = True
-                        clip_info["uploaded_at"] = datetime.now().isoformat()
-                        # Salva checkpoint atualizado
-                        editor.save_upload_checkpoint(str(video_dir), episode_url, generated_clips)
-                    else:
-                        print(f"   🧪 [TESTE] Upload simulado para: {hook}")
-                        print(f"   🧪 [TESTE] Descrição: {description[:50]}...")
-                        uploaded_count += 1
-                        clip_info["uploaded"] = True
-                        clip_info["uploaded_at"] = datetime.now().isoformat()
-                        editor.save_upload_checkpoint(str(video_dir), episode_url, generated_clips)
-                except Exception as e:
-                    print(f"   ❌ Erro no upload: {e}")
-                    failed_count += 1
-                    error_msg = f"Erro no upload do corte {i}: {hook} - {e}"
-                    save_error_log(error_msg, episode_url)
-            # Resumo final
-            print(f"\n" + "=" * 60)
-            print(f"📊 RESUMO DO UPLOAD PARA: {video_dir.name}")
-            print(f"   • Total de cortes: {len(generated_clips)}")
-            print(f"   • Uploads realizados: {uploaded_count}")
-            print(f"   • Falhas: {failed_count}")
-            # Se todos os cortes foram enviados, remove o checkpoint
-            if all(c.get("uploaded", False) for c in generated_clips):
-                print(f"   ✅ Todos os uploads concluídos com sucesso!")
-                editor.clear_upload_checkpoint(str(video_dir))
-            else:
-                print(f"   ⚠️ Ainda há cortes não enviados para este vídeo")
-            print("=" * 60)
+        by_clips_dir.setdefault(cfg["paths"]["clips"], cfg)
+
+    for clips_dir, cfg in by_clips_dir.items():
+        storage.migrate_upload_checkpoints(clips_dir)
+        pending = storage.pending_uploads(clips_dir)
+        added = publish_queue.enqueue(clips_dir, pending, upload_delay(cfg))
+        queued = publish_queue.pending_count(clips_dir)
+        print(f"\n📤 FILA DE PUBLICAÇÃO: {clips_dir}")
+        print("=" * 60)
+        print(f"   • Cortes pendentes: {len(pending)} ({added} agendados agora)")
+        print(f"   • Na fila: {queued}")
+        if not queued:
+            continue
+
+        scheduler = start_scheduler(cfg)
+        try:
+            scheduler.wait_idle()
+        except KeyboardInterrupt:
+            print("\n⏸️ Interrompido - a fila continua salva; rode upload_clips.py para retomar")
+        finally:
+            scheduler.stop()
+
+        print(f"\n" + "=" * 60)
+        print(f"📊 RESUMO DO UPLOAD: {clips_dir}")
+        print(f"   • Uploads realizados: {scheduler.uploaded}")
+        print(f"   • Falhas: {scheduler.failed}")
+        remaining = publish_queue.pending_count(clips_dir)
+        if remaining:
+            print(f"   ⚠️ Ainda há {remaining} cortes na fila")
+        print("=" * 60)
 
 def main():
     """Função principal"""
+    prefetch_usd_brl()
+    tracing.start_run("upload")
     try:
         run_uploads()
     except Exception as e:
@@ -118,6 +88,7 @@ def main():
         print("Erro durante o upload. Veja logs/erros.log para detalhes.")
     finally:
         print_llm_report()
+        tracing.print_trace_summary()
         save_cost_log("upload_clips.py")
 
 if __name__ == "__main__":